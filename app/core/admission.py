@@ -0,0 +1,256 @@
+"""
+Priority-aware admission control.
+
+Requests are sorted into classes (ADMISSION_CLASSES, highest priority
+first): product integrations, brand management, the admin site. Each
+class may run at most `limit` requests at a time in this worker process;
+others wait for a slot for at most the class's `queue_ms`, then get a
+503 with Retry-After. They get it at once when:
+
+- the wait expected from the queue length and recent latency exceeds
+  `queue_ms` (so an overloaded class sheds quickly instead of tying up
+  threads that would time out anyway), or
+- a higher class has requests waiting (lower classes give way).
+
+Every ADMISSION_ADJUST_SECONDS the limits adapt to the latency observed
+over the last interval: a class shrinks its limit when it or any class
+above it is over its `target_ms`, so a burst of lookups backs off as
+soon as activations slow down; a class that was short of slots while
+all is within target grows its limit by one.
+
+Limits are per process, so they need workers that serve many requests
+at once: threaded WSGI workers (gunicorn gthread, runserver) or ASGI.
+A WSGI worker that serves one request at a time never reaches a limit,
+so skip_on_single_threaded_workers turns admission control off in such
+a worker and logs a warning once.
+"""
+
+import threading
+import time
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from core.logging_utils import get_logger
+
+# Limit multiplier applied when a class or one above it is over target.
+_DECREASE = 0.8
+
+_SHED_BODY = {"error": "Server is overloaded, please retry shortly."}
+
+
+class _Class:
+    def __init__(self, name, rank, limit, min_limit, max_limit, target_ms, queue_ms):
+        self.name = name
+        self.rank = rank
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target = target_ms / 1000
+        self.queue = queue_ms / 1000
+        self.running = 0
+        self.waiting = 0
+        # Mean latency of the last interval, seeded with the target.
+        self.latency = self.target
+        # Current interval.
+        self.elapsed = 0.0
+        self.completed = 0
+        self.saturated = False
+        # Since startup.
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+
+    def has_slot(self):
+        return self.running < int(self.limit)
+
+    def expected_wait(self):
+        return (self.waiting + 1) * self.latency / int(self.limit)
+
+
+class AdmissionController:
+    def __init__(self, classes):
+        self.classes = {
+            name: _Class(name, rank, **options)
+            for rank, (name, options) in enumerate(classes.items())
+        }
+        self.ranked = sorted(self.classes.values(), key=lambda c: c.rank)
+        self.condition = threading.Condition()
+        self.next_adjust = time.monotonic() + settings.ADMISSION_ADJUST_SECONDS
+        # Set in single-threaded WSGI workers, where no limit is reached.
+        self.bypassed = False
+
+    def acquire(self, name):
+        """
+        Takes a slot of class `name`, waiting if need be. Returns the start
+        time to pass to release(), or None if the request is shed.
+        """
+        cls = self.classes[name]
+        with self.condition:
+            if self._higher_waiting(cls):
+                cls.shed += 1
+                return None
+            if cls.has_slot() and not cls.waiting:
+                return self._admit(cls)
+            cls.saturated = True
+            if cls.expected_wait() > cls.queue:
+                cls.shed += 1
+                return None
+            cls.waiting += 1
+            cls.queued += 1
+            deadline = time.monotonic() + cls.queue
+            try:
+                while not cls.has_slot() or self._higher_waiting(cls):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        cls.shed += 1
+                        return None
+                    self.condition.wait(remaining)
+            finally:
+                cls.waiting -= 1
+            return self._admit(cls)
+
+    def release(self, name, started):
+        cls = self.classes[name]
+        now = time.monotonic()
+        with self.condition:
+            cls.running -= 1
+            cls.elapsed += now - started
+            cls.completed += 1
+            if now >= self.next_adjust:
+                self._adjust(now)
+            self.condition.notify_all()
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                cls.name: {
+                    "limit": int(cls.limit),
+                    "running": cls.running,
+                    "waiting": cls.waiting,
+                    "latency_ms": round(cls.latency * 1000, 1),
+                    "admitted": cls.admitted,
+                    "queued": cls.queued,
+                    "shed": cls.shed,
+                }
+                for cls in self.ranked
+            }
+
+    def _admit(self, cls):
+        cls.running += 1
+        cls.admitted += 1
+        return time.monotonic()
+
+    def _higher_waiting(self, cls):
+        return any(other.waiting for other in self.ranked[: cls.rank])
+
+    def _adjust(self, now):
+        self.next_adjust = now + settings.ADMISSION_ADJUST_SECONDS
+        for cls in self.ranked:
+            if cls.completed:
+                cls.latency = cls.elapsed / cls.completed
+        changes = {}
+        for cls in self.ranked:
+            # Only classes that completed requests this interval count.
+            over = any(
+                other.completed and other.latency > other.target
+                for other in self.ranked[: cls.rank + 1]
+            )
+            before = int(cls.limit)
+            if over:
+                cls.limit = max(cls.min_limit, cls.limit * _DECREASE)
+            elif cls.saturated:
+                cls.limit = min(cls.max_limit, cls.limit + 1)
+            if int(cls.limit) != before:
+                changes[cls.name] = int(cls.limit)
+        for cls in self.ranked:
+            cls.elapsed, cls.completed, cls.saturated = 0.0, 0, False
+        if changes:
+            get_logger(__name__, {}).info(
+                "Admission limits adjusted",
+                extra={"limits": changes, "action": "ADMISSION_ADJUST"},
+            )
+
+
+controller = AdmissionController(settings.ADMISSION_CLASSES)
+
+
+def request_class(resolver_match):
+    """
+    The admission class of a resolved request, or None if it is not
+    limited.
+    """
+    if resolver_match.url_name in settings.ADMISSION_EXEMPT_ENDPOINTS:
+        return None
+    if "admin" in resolver_match.namespaces:
+        return "admin"
+    if resolver_match.url_name in settings.ADMISSION_PRODUCT_ENDPOINTS:
+        return "product"
+    return "brand"
+
+
+def skip_on_single_threaded_workers(application):
+    """
+    Wraps the WSGI application so that a worker serving one request at a
+    time runs without admission control instead of queueing requests it
+    could never run together. WSGI says how the worker runs with the
+    first request.
+    """
+    checked = False
+
+    def checked_application(environ, start_response):
+        nonlocal checked
+        if not checked:
+            checked = True
+            if not environ.get("wsgi.multithread"):
+                controller.bypassed = True
+                if settings.ADMISSION_CONTROL_ENABLED:
+                    get_logger(__name__, {}).warning(
+                        "Admission control skipped: this worker serves one "
+                        "request at a time; run threaded or ASGI workers "
+                        "to limit requests",
+                        extra={"action": "ADMISSION_SKIPPED"},
+                    )
+        return application(environ, start_response)
+
+    return checked_application
+
+
+class AdmissionMiddleware:
+    """
+    Admits each request before its view runs and frees the slot once the
+    response is built. Goes right after tracing, so shed responses still
+    carry a request id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.admission = None
+        try:
+            return self.get_response(request)
+        finally:
+            if request.admission is not None:
+                controller.release(*request.admission)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.ADMISSION_CONTROL_ENABLED or controller.bypassed:
+            return None
+        name = request_class(request.resolver_match)
+        if name is None:
+            return None
+        started = controller.acquire(name)
+        if started is None:
+            response = JsonResponse(_SHED_BODY, status=503)
+            response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+            return response
+        request.admission = (name, started)
+        return None
+
+
+@staff_member_required
+def admission_stats(request):
+    """
+    Admission counters of the worker process that serves this request.
+    """
+    return JsonResponse(controller.snapshot())
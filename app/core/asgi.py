@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_asgi_application()
+
+from licenses.invalidation import start_on_startup  # noqa: E402
+from licenses.keyfilter import warm_on_startup  # noqa: E402
+
+warm_on_startup()
+start_on_startup()
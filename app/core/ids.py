@@ -0,0 +1,46 @@
+"""
+Time-ordered UUIDs (version 7, RFC 9562) for primary keys.
+
+The first 48 bits are the Unix time in milliseconds and the next 12 the
+sub-millisecond fraction, so ids generated later sort later and new rows
+are appended at the right edge of the primary key index instead of at a
+random leaf. The remaining 62 bits are random. The text form is an
+ordinary UUID, so nothing that reads ids can tell the difference.
+"""
+
+import os
+import time
+import uuid
+
+_VERSION = 0x7 << 76
+_VARIANT = 0b10 << 62
+_RAND_B_MASK = (1 << 62) - 1
+
+
+def uuid7_from(ns, rand_b):
+    """
+    Builds the UUID for Unix time `ns` (nanoseconds) and 62 random bits.
+    """
+    ms, sub_ms = divmod(ns, 1_000_000)
+    rand_a = sub_ms * 4096 // 1_000_000
+    return uuid.UUID(
+        int=(ms & 0xFFFFFFFFFFFF) << 80
+        | _VERSION
+        | rand_a << 64
+        | _VARIANT
+        | (rand_b & _RAND_B_MASK)
+    )
+
+
+def uuid7():
+    """
+    New time-ordered UUID; the default for model primary keys.
+    """
+    return uuid7_from(time.time_ns(), int.from_bytes(os.urandom(8), "big"))
+
+
+def uuid7_time(value):
+    """
+    Creation time of a version 7 UUID, in Unix milliseconds.
+    """
+    return value.int >> 80
@@ -0,0 +1,100 @@
+"""
+OpenAPI schema serving and optional API docs.
+
+The schema is generated once at deploy time (`manage.py spectacular
+--format openapi-json --file $API_SCHEMA_FILE`, see entrypoint.sh) and
+served from memory with an ETag, so workers never run the generator.
+With API_DOCS_ENABLED off, drf-spectacular is not imported at all: the
+schema decorators used by the views below become no-ops.
+"""
+
+import hashlib
+from functools import lru_cache
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import condition, require_GET
+
+__all__ = [
+    "extend_schema",
+    "extend_schema_view",
+    "OpenApiParameter",
+    "OpenApiTypes",
+    "openapi_schema",
+    "load_schema",
+]
+
+SCHEMA_CONTENT_TYPE = "application/vnd.oai.openapi+json"
+
+if settings.API_DOCS_ENABLED:
+    from drf_spectacular.utils import (
+        extend_schema,
+        extend_schema_view,
+        OpenApiParameter,
+        OpenApiTypes,
+    )
+else:
+
+    def extend_schema(*args, **kwargs):
+        return lambda view: view
+
+    extend_schema_view = extend_schema
+
+    class OpenApiParameter:
+        QUERY = "query"
+        PATH = "path"
+        HEADER = "header"
+        COOKIE = "cookie"
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+    class _OpenApiTypes:
+        def __getattr__(self, name):
+            return name
+
+    OpenApiTypes = _OpenApiTypes()
+
+
+def _generate():
+    from drf_spectacular.drainage import GENERATOR_STATS
+    from drf_spectacular.renderers import OpenApiJsonRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    # Generator warnings are reported by the build step, not per worker.
+    with GENERATOR_STATS.silence():
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        schema = generator.get_schema(request=None, public=True)
+    return OpenApiJsonRenderer().render(schema, renderer_context={})
+
+
+@lru_cache(maxsize=None)
+def load_schema():
+    """
+    (body, etag) of the schema, read from API_SCHEMA_FILE on first use.
+    Without the file, it is generated once if the docs stack is enabled;
+    otherwise returns None.
+    """
+    try:
+        with open(settings.API_SCHEMA_FILE, "rb") as f:
+            body = f.read()
+    except FileNotFoundError:
+        if not settings.API_DOCS_ENABLED:
+            return None
+        body = _generate()
+    return body, f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def _schema_etag(request):
+    schema = load_schema()
+    return schema[1] if schema else None
+
+
+@require_GET
+@condition(etag_func=_schema_etag)
+def openapi_schema(request):
+    schema = load_schema()
+    if schema is None:
+        raise Http404("No API schema has been built.")
+    response = HttpResponse(schema[0], content_type=SCHEMA_CONTENT_TYPE)
+    response["Cache-Control"] = "public, max-age=0, must-revalidate"
+    return response
@@ -0,0 +1,184 @@
+"""
+On-demand profiling of live requests.
+
+`manage.py profile_requests start` writes a rule (URL name, optional
+brand, sample rate, expiry) to PROFILE_CONTROL_FILE. Every worker
+re-reads that file at most every PROFILE_CONTROL_CHECK_SECONDS, so rules
+take effect without a restart and lapse on their own. While no rule is
+active a request costs one clock read and a check of an empty tuple.
+
+A sampled matching request runs the view (and the middleware after this
+one) under cProfile. Profiles are added up per endpoint in memory and
+dumped to PROFILE_DIR every PROFILE_FLUSH_REQUESTS requests or
+PROFILE_FLUSH_SECONDS, when the endpoint's rule is stopped or expires,
+and at exit, as "<endpoint>.<pid>.<time_ns>.<requests>.prof";
+`manage.py profile_requests report` merges them.
+"""
+
+import atexit
+import cProfile
+import hashlib
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+
+def api_key_digest(api_key):
+    """
+    How rules name a brand authenticating by API key, so the control file
+    never holds the key itself.
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def read_rules(path=None):
+    """
+    The rules in the control file that have not expired yet.
+    """
+    try:
+        with open(path or settings.PROFILE_CONTROL_FILE) as control:
+            rules = json.load(control)["rules"]
+    except FileNotFoundError:
+        return []
+    now = time.time()
+    return [rule for rule in rules if rule["until"] > now]
+
+
+def write_rules(rules, path=None):
+    path = path or settings.PROFILE_CONTROL_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Written aside and renamed, so workers never read half a file.
+    with open(f"{path}.tmp", "w") as control:
+        json.dump({"rules": rules}, control, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+class _RuleSwitch:
+    """
+    Per-process view of the control file.
+    """
+
+    def __init__(self):
+        self.rules = ()
+        self.next_check = 0.0
+
+    def active(self):
+        now = time.monotonic()
+        if now >= self.next_check:
+            self.next_check = now + settings.PROFILE_CONTROL_CHECK_SECONDS
+            before = {rule["endpoint"] for rule in self.rules}
+            try:
+                self.rules = tuple(read_rules())
+            except (OSError, ValueError, KeyError):
+                self.rules = ()
+            # Stopped or expired: no request will complete their batches.
+            gone = before - {rule["endpoint"] for rule in self.rules}
+            if gone:
+                collector.flush(gone)
+        return self.rules
+
+
+class _Collector:
+    """
+    Adds up profiles per endpoint and dumps them in batches.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def add(self, endpoint, profile):
+        with self.lock:
+            entry = self.pending.get(endpoint)
+            if entry is None:
+                entry = self.pending[endpoint] = [
+                    pstats.Stats(profile),
+                    0,
+                    time.monotonic(),
+                ]
+            else:
+                entry[0].add(profile)
+            entry[1] += 1
+            stats, requests, started = entry
+            if (
+                requests >= settings.PROFILE_FLUSH_REQUESTS
+                or time.monotonic() - started >= settings.PROFILE_FLUSH_SECONDS
+            ):
+                del self.pending[endpoint]
+                self._dump(endpoint, stats, requests)
+
+    def flush(self, endpoints=None):
+        """
+        Dumps the pending profiles of `endpoints`, or of every endpoint.
+        """
+        with self.lock:
+            for endpoint in list(endpoints or self.pending):
+                entry = self.pending.pop(endpoint, None)
+                if entry is not None:
+                    self._dump(endpoint, entry[0], entry[1])
+
+    @staticmethod
+    def _dump(endpoint, stats, requests):
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        name = f"{endpoint}.{os.getpid()}.{time.time_ns()}.{requests}.prof"
+        stats.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+
+
+rule_switch = _RuleSwitch()
+collector = _Collector()
+# Partial batches are not lost when the worker exits.
+atexit.register(collector.flush)
+
+
+def _matching_rule(rules, request):
+    try:
+        endpoint = resolve(request.path_info).url_name
+    except Resolver404:
+        return None
+    for rule in rules:
+        if rule["endpoint"] != endpoint:
+            continue
+        brand = rule.get("brand")
+        if brand is None:
+            return rule
+        if request.headers.get("X-Brand-Slug") == brand["slug"]:
+            return rule
+        api_key = request.headers.get("X-Brand-API-Key")
+        if api_key and api_key_digest(api_key) == brand["api_key_sha256"]:
+            return rule
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles sampled requests matching an active rule. Goes last, so the
+    profile covers the view rather than the middleware stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rules = rule_switch.active()
+        if not rules:
+            return self.get_response(request)
+        rule = _matching_rule(rules, request)
+        if rule is None or random.random() >= rule["rate"]:
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler per process; this request is
+            # skipped while another one is being profiled.
+            return self.get_response(request)
+        try:
+            return self.get_response(request)
+        finally:
+            profile.disable()
+            collector.add(rule["endpoint"], profile)
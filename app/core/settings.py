@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,12 +38,20 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
-    "drf_spectacular",
     "licenses",
 ]
 
+# API docs (Swagger UI, ReDoc) and schema generation. Off, drf-spectacular
+# is never imported and only the prebuilt schema file is served.
+API_DOCS_ENABLED = config("API_DOCS_ENABLED", default=True, cast=bool)
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append("drf_spectacular")
+
 MIDDLEWARE = [
+    "core.tracing.TracingMiddleware",
+    "core.admission.AdmissionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -51,6 +59,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "licenses.sharding.ShardContextMiddleware",
+    "core.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -87,6 +97,26 @@ DATABASES = {
     }
 }
 
+# brand sharding
+# "default" always holds the brand directory and is itself a shard. Extra
+# shards are listed in LICENSE_SHARDS (e.g. "shard1,shard2"); each reads
+# SHARD_<ALIAS>_DB/_HOST/_PORT/_USER/_PASSWORD and defaults to the
+# default server with a database named license_<alias>.
+LICENSE_SHARDS = ["default", *config("LICENSE_SHARDS", default="", cast=Csv())]
+for _alias in LICENSE_SHARDS[1:]:
+    _prefix = f"SHARD_{_alias.upper()}"
+    DATABASES[_alias] = {
+        **DATABASES["default"],
+        "NAME": config(f"{_prefix}_DB", f"license_{_alias}"),
+        "USER": config(f"{_prefix}_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": config(f"{_prefix}_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        "HOST": config(f"{_prefix}_HOST", DATABASES["default"]["HOST"]),
+        "PORT": config(f"{_prefix}_PORT", DATABASES["default"]["PORT"], cast=int),
+    }
+DATABASE_ROUTERS = ["licenses.routers.BrandShardRouter"]
+# Parallel shard queries for cross-brand (scatter-gather) lookups.
+SHARD_SCATTER_WORKERS = config("SHARD_SCATTER_WORKERS", default=8, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -107,9 +137,9 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 # rest framework configuration
-REST_FRAMEWORK = {
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-}
+REST_FRAMEWORK = {}
+if API_DOCS_ENABLED:
+    REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = "drf_spectacular.openapi.AutoSchema"
 
 # logging configuration
 LOGGING = {
@@ -133,7 +163,203 @@ LOGGING = {
     },
 }
 
+# request tracing
+# Fraction of requests traced as span trees (0 disables, 1 traces all).
+# Every request gets a request id either way.
+TRACE_SAMPLE_RATE = config("TRACE_SAMPLE_RATE", default=0.01, cast=float)
+# Finished traces are appended here as JSON lines; empty logs them instead.
+TRACE_EXPORT_FILE = config("TRACE_EXPORT_FILE", default="")
+# Spans recorded per trace; further spans are only counted as dropped.
+TRACE_MAX_SPANS = config("TRACE_MAX_SPANS", default=500, cast=int)
+
+# request profiling
+# Profiles of sampled requests are dumped here; rules are switched on and
+# off at runtime with `manage.py profile_requests`.
+PROFILE_DIR = config("PROFILE_DIR", default=str(BASE_DIR / "profiles"))
+PROFILE_CONTROL_FILE = config(
+    "PROFILE_CONTROL_FILE", default=str(Path(PROFILE_DIR) / "rules.json")
+)
+# How often each worker re-reads the rules file.
+PROFILE_CONTROL_CHECK_SECONDS = config(
+    "PROFILE_CONTROL_CHECK_SECONDS", default=5, cast=float
+)
+# Profiles are added up in memory and dumped after this many requests or
+# seconds, whichever comes first.
+PROFILE_FLUSH_REQUESTS = config("PROFILE_FLUSH_REQUESTS", default=20, cast=int)
+PROFILE_FLUSH_SECONDS = config("PROFILE_FLUSH_SECONDS", default=60, cast=float)
+
+# background jobs
+# Attempts per job; failures other than validation errors are retried
+# after JOB_RETRY_BASE_SECONDS, doubling each time.
+JOB_MAX_ATTEMPTS = config("JOB_MAX_ATTEMPTS", default=5, cast=int)
+JOB_RETRY_BASE_SECONDS = config("JOB_RETRY_BASE_SECONDS", default=10, cast=float)
+# A running job not finished within this long is handed to another worker.
+JOB_VISIBILITY_TIMEOUT_SECONDS = config(
+    "JOB_VISIBILITY_TIMEOUT_SECONDS", default=300, cast=float
+)
+# Idle workers look for due jobs this often.
+JOB_POLL_SECONDS = config("JOB_POLL_SECONDS", default=1.0, cast=float)
+# Finished jobs, with their results, are kept this long.
+JOB_RETENTION_DAYS = config("JOB_RETENTION_DAYS", default=7, cast=int)
+
+# cache invalidation
+# Workers keep brands and status documents in memory while their listener
+# for invalidations (LISTEN/NOTIFY, licenses/invalidation.py) is connected.
+INVALIDATION_BUS_ENABLED = config("INVALIDATION_BUS_ENABLED", default=True, cast=bool)
+INVALIDATION_RECONNECT_SECONDS = config(
+    "INVALIDATION_RECONNECT_SECONDS", default=2.0, cast=float
+)
+# An idle listener checks its connections this often.
+INVALIDATION_PING_SECONDS = config(
+    "INVALIDATION_PING_SECONDS", default=30.0, cast=float
+)
+BRAND_CACHE_SIZE = config("BRAND_CACHE_SIZE", default=10000, cast=int)
+BRAND_CACHE_SECONDS = config("BRAND_CACHE_SECONDS", default=300, cast=float)
+STATUS_CACHE_SIZE = config("STATUS_CACHE_SIZE", default=50000, cast=int)
+# Also bounds how long an expired lease still counts as a used seat.
+STATUS_CACHE_SECONDS = config("STATUS_CACHE_SECONDS", default=5, cast=float)
+
+# admission control (core.admission)
+ADMISSION_CONTROL_ENABLED = config("ADMISSION_CONTROL_ENABLED", default=True, cast=bool)
+# Per worker process, so limits only apply in threaded (or ASGI)
+# workers; single-threaded WSGI workers skip them, see core.admission. Highest priority first. "limit" is the starting
+# number of concurrent requests, adapted between "min_limit" and
+# "max_limit"; above "target_ms" of latency the class (and every class
+# below it) backs off; "queue_ms" bounds the wait for a slot.
+ADMISSION_CLASSES = {
+    "product": {
+        "limit": 32,
+        "min_limit": 4,
+        "max_limit": 128,
+        "target_ms": 100,
+        "queue_ms": 500,
+    },
+    "brand": {
+        "limit": 16,
+        "min_limit": 2,
+        "max_limit": 64,
+        "target_ms": 500,
+        "queue_ms": 200,
+    },
+    "admin": {
+        "limit": 4,
+        "min_limit": 1,
+        "max_limit": 16,
+        "target_ms": 2000,
+        "queue_ms": 100,
+    },
+}
+# URL names of the product integration endpoints; the admin site is
+# "admin", every other endpoint "brand" unless exempt.
+ADMISSION_PRODUCT_ENDPOINTS = (
+    "license-activation",
+    "lease-renewal",
+    "license-deactivation",
+    "license-status",
+    "license-status-batch",
+)
+ADMISSION_EXEMPT_ENDPOINTS = ("schema", "swagger-ui", "redoc", "admission-stats")
+ADMISSION_ADJUST_SECONDS = config("ADMISSION_ADJUST_SECONDS", default=1.0, cast=float)
+ADMISSION_RETRY_AFTER_SECONDS = config(
+    "ADMISSION_RETRY_AFTER_SECONDS", default=1, cast=int
+)
+
+# status request coalescing
+# Concurrent status requests for one key share a single computation.
+STATUS_COALESCE_ENABLED = config("STATUS_COALESCE_ENABLED", default=True, cast=bool)
+# Alias in CACHES of a cache shared by all workers (memcached, Redis) to
+# also coalesce across workers, at one round trip to it per status
+# request; empty coalesces within each worker only.
+STATUS_COALESCE_CACHE = config("STATUS_COALESCE_CACHE", default="")
+# Lifetime of a cross-worker flight's lock and result, and how long
+# other workers wait for it before computing themselves.
+STATUS_COALESCE_LOCK_SECONDS = config(
+    "STATUS_COALESCE_LOCK_SECONDS", default=2.0, cast=float
+)
+
+# usage reports
+# Deltas folded into the daily rollups per transaction by rollup_usage.
+USAGE_ROLLUP_BATCH_SIZE = config("USAGE_ROLLUP_BATCH_SIZE", default=5000, cast=int)
+# Longest date range one usage report may cover.
+USAGE_REPORT_MAX_DAYS = config("USAGE_REPORT_MAX_DAYS", default=366, cast=int)
+
+# brand change feed
+# Changes per page when the client does not ask for a size, and the cap.
+CHANGE_FEED_PAGE_SIZE = config("CHANGE_FEED_PAGE_SIZE", default=500, cast=int)
+CHANGE_FEED_MAX_PAGE_SIZE = config("CHANGE_FEED_MAX_PAGE_SIZE", default=5000, cast=int)
+
+# entitlement document rendering
+# "python" renders status and global lookup JSON from flat rows
+# (licenses/payloads.py); "database" assembles it inside PostgreSQL, then
+# re-lays it out like DRF's renderer so response bodies stay identical.
+ENTITLEMENT_RENDER_MODE = config("ENTITLEMENT_RENDER_MODE", default="python")
+# Global lookup lists every key unless the client asks for a page.
+GLOBAL_LOOKUP_PAGE_SIZE = config("GLOBAL_LOOKUP_PAGE_SIZE", default=100, cast=int)
+GLOBAL_LOOKUP_MAX_PAGE_SIZE = config(
+    "GLOBAL_LOOKUP_MAX_PAGE_SIZE", default=500, cast=int
+)
+STATUS_BATCH_MAX_KEYS = config("STATUS_BATCH_MAX_KEYS", default=1000, cast=int)
+# Instances one machine deactivation request may release.
+MACHINE_DEACTIVATION_MAX_INSTANCES = config(
+    "MACHINE_DEACTIVATION_MAX_INSTANCES", default=100, cast=int
+)
+# Batches larger than this are streamed instead of buffered.
+STATUS_BATCH_STREAM_THRESHOLD = config(
+    "STATUS_BATCH_STREAM_THRESHOLD", default=100, cast=int
+)
+
+# floating seat leases (reclaim_leases command)
+LEASE_RECLAIM_BATCH_SIZE = config("LEASE_RECLAIM_BATCH_SIZE", default=1000, cast=int)
+LEASE_RECLAIM_PAUSE_SECONDS = config(
+    "LEASE_RECLAIM_PAUSE_SECONDS", default=0.1, cast=float
+)
+
+# per-customer global lookup summaries (refresh/rebuild/check commands)
+CUSTOMER_SUMMARY_BATCH_SIZE = config(
+    "CUSTOMER_SUMMARY_BATCH_SIZE", default=1000, cast=int
+)
+
+# admin changelists: filtered counts stop here, larger tables are estimated
+ADMIN_COUNT_LIMIT = config("ADMIN_COUNT_LIMIT", default=10000, cast=int)
+
+# cold storage archival (archive_cold_data command)
+# Keys whose licenses all ended longer ago than this move to the archive.
+ARCHIVE_LICENSE_RETENTION_DAYS = config(
+    "ARCHIVE_LICENSE_RETENTION_DAYS", default=730, cast=int
+)
+ARCHIVE_IDEMPOTENCY_RETENTION_DAYS = config(
+    "ARCHIVE_IDEMPOTENCY_RETENTION_DAYS", default=30, cast=int
+)
+ARCHIVE_BATCH_SIZE = config("ARCHIVE_BATCH_SIZE", default=500, cast=int)
+ARCHIVE_PAUSE_SECONDS = config("ARCHIVE_PAUSE_SECONDS", default=0.5, cast=float)
+
+# license key Bloom filter (front door for unknown keys)
+LICENSE_KEY_FILTER_ENABLED = config(
+    "LICENSE_KEY_FILTER_ENABLED", default=True, cast=bool
+)
+LICENSE_KEY_FILTER_WARM_ON_STARTUP = config(
+    "LICENSE_KEY_FILTER_WARM_ON_STARTUP", default=True, cast=bool
+)
+LICENSE_KEY_FILTER_FP_RATE = config(
+    "LICENSE_KEY_FILTER_FP_RATE", default=0.01, cast=float
+)
+# Upper bound per brand filter; 16 MiB holds ~14M keys at 1% false positives.
+LICENSE_KEY_FILTER_MAX_BYTES = config(
+    "LICENSE_KEY_FILTER_MAX_BYTES", default=16 * 1024 * 1024, cast=int
+)
+LICENSE_KEY_FILTER_REBUILD_SECONDS = config(
+    "LICENSE_KEY_FILTER_REBUILD_SECONDS", default=3600, cast=int
+)
+LICENSE_KEY_FILTER_REFRESH_SECONDS = config(
+    "LICENSE_KEY_FILTER_REFRESH_SECONDS", default=1, cast=float
+)
+LICENSE_KEY_FILTER_REFRESH_OVERLAP_SECONDS = config(
+    "LICENSE_KEY_FILTER_REFRESH_OVERLAP_SECONDS", default=120, cast=int
+)
+
 # drf-spectacular settings
+# Prebuilt OpenAPI JSON served at /api/schema/ (see core.openapi).
+API_SCHEMA_FILE = config("API_SCHEMA_FILE", default=str(BASE_DIR / "openapi.json"))
 SPECTACULAR_SETTINGS = {
     "TITLE": "group.one Centralized License Service API",
     "DESCRIPTION": "Single source of truth for licenses and entitlements across brands.",
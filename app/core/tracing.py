@@ -0,0 +1,206 @@
+"""
+Request tracing.
+
+Every request gets a request id, taken from the X-Request-ID header when
+the caller sends a usable one, otherwise generated; it is echoed on the
+response and reaches the logs and audit entries through the views' ctx.
+
+A sampled fraction of requests (TRACE_SAMPLE_RATE) is also traced: the
+request is the root span, each public method of a @traced service class
+and each SQL statement on any database alias become child spans, and the
+finished tree is written as one compact JSON document, to
+TRACE_EXPORT_FILE when set or to the log otherwise. Untraced requests
+pay one context variable lookup per service call and nothing per query.
+"""
+
+import functools
+import json
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from core.ids import uuid7
+from core.logging_utils import get_logger
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Stored in AuditLog.request_id (64 characters) and logged verbatim.
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}\Z")
+_SQL_PREVIEW = 200
+
+_current_span = ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    __slots__ = ("request_id", "spans", "dropped")
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.spans = 1
+        self.dropped = 0
+
+
+class Span:
+    __slots__ = ("trace", "name", "attrs", "start", "duration", "children")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.duration = None
+        self.start = time.perf_counter()
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+    def to_dict(self, origin):
+        node = {
+            "name": self.name,
+            "at_ms": round((self.start - origin) * 1000, 3),
+            "ms": round(self.duration * 1000, 3),
+        }
+        if self.attrs:
+            node["attrs"] = self.attrs
+        if self.children:
+            node["children"] = [child.to_dict(origin) for child in self.children]
+        return node
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times the block as a child of the current span. Does nothing outside a
+    trace, or once the trace holds TRACE_MAX_SPANS spans.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    trace = parent.trace
+    if trace.spans >= settings.TRACE_MAX_SPANS:
+        trace.dropped += 1
+        yield None
+        return
+    child = Span(trace, name, attrs)
+    trace.spans += 1
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def _traced_function(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return func(*args, **kwargs)
+        with span(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def traced(cls):
+    """
+    Class decorator: each public static method of a service class runs in
+    a span named "Class.method". Methods returning iterators are timed
+    until they return, not until the iterator is consumed.
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not isinstance(attr, staticmethod):
+            continue
+        span_name = f"{cls.__name__}.{name}"
+        setattr(cls, name, staticmethod(_traced_function(span_name, attr.__func__)))
+    return cls
+
+
+def _sql_span(execute, sql, params, many, context):
+    attrs = {
+        "db": context["connection"].alias,
+        "sql": " ".join(sql.split())[:_SQL_PREVIEW],
+    }
+    if many:
+        attrs["many"] = True
+    with span("sql", **attrs):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def trace(name, request_id, **attrs):
+    """
+    Runs the block as the root span of a new trace, with every statement
+    on every database alias timed, and exports the tree when it ends.
+    """
+    root = Span(Trace(request_id), name, attrs)
+    token = _current_span.set(root)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_sql_span))
+            yield root
+    finally:
+        root.finish()
+        _current_span.reset(token)
+        export(root)
+
+
+def export(root):
+    trace = root.trace
+    document = {
+        "request_id": trace.request_id,
+        "ms": round(root.duration * 1000, 3),
+        "spans": trace.spans,
+        "dropped": trace.dropped,
+        "root": root.to_dict(root.start),
+    }
+    if not settings.TRACE_EXPORT_FILE:
+        get_logger(__name__, {"request_id": trace.request_id}).info(
+            "Trace", extra={"trace": document, "action": "TRACE"}
+        )
+        return
+    line = json.dumps(document, separators=(",", ":"), default=str) + "\n"
+    with _export_lock, open(settings.TRACE_EXPORT_FILE, "a") as exported:
+        exported.write(line)
+
+
+def request_id_for(request):
+    """
+    The caller's X-Request-ID if it is safe to log and store, else a new id.
+    """
+    candidate = request.headers.get(REQUEST_ID_HEADER, "")
+    if _REQUEST_ID.match(candidate):
+        return candidate
+    return uuid7().hex
+
+
+class TracingMiddleware:
+    """
+    Assigns request.request_id, echoes it on the response, and traces a
+    sampled fraction of requests. Goes first, so the trace covers every
+    other middleware. Streamed bodies are produced after the trace ends.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.request_id = request_id_for(request)
+        if random.random() >= settings.TRACE_SAMPLE_RATE:
+            response = self.get_response(request)
+        else:
+            with trace(request.method, request.request_id) as root:
+                response = self.get_response(request)
+                # The route pattern, not the path: paths carry license keys.
+                match = request.resolver_match
+                root.name = f"{request.method} {match.route if match else '?'}"
+                root.attrs["status"] = response.status_code
+        response[REQUEST_ID_HEADER] = request.request_id
+        return response
@@ -15,22 +15,31 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from core.admission import admission_stats
+from core.openapi import openapi_schema
 
 url_prefix = "api/v1"
 
 urlpatterns = [
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/doc/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"
-    ),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    path("api/schema/", openapi_schema, name="schema"),
+    path("api/admission/", admission_stats, name="admission-stats"),
     path("admin/", admin.site.urls),
     path(f"{url_prefix}/licenses/", include("licenses.urls")),
 ]
+
+if settings.API_DOCS_ENABLED:
+    from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+    urlpatterns += [
+        path(
+            "api/doc/",
+            SpectacularSwaggerView.as_view(url_name="schema"),
+            name="swagger-ui",
+        ),
+        path(
+            "api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"
+        ),
+    ]
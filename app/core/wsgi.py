@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_wsgi_application()
+
+from core.admission import skip_on_single_threaded_workers  # noqa: E402
+from licenses.invalidation import start_on_startup  # noqa: E402
+from licenses.keyfilter import warm_on_startup  # noqa: E402
+
+application = skip_on_single_threaded_workers(application)
+
+warm_on_startup()
+start_on_startup()
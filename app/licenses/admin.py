@@ -1,6 +1,148 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .compact import key_prefix_ranges
 from .models import LicenseKey, License, Brand, Product, Activation
 
+# Query parameter holding the primary key the next page starts after.
+CURSOR_VAR = "after"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Avoids exact COUNT(*) over large tables: an unfiltered changelist uses
+    the planner's row estimate, and a filtered one counts at most
+    ADMIN_COUNT_LIMIT + 1 rows, so "more than the limit" is all it learns.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = self._estimate(queryset)
+            if estimate > limit:
+                return estimate
+        return queryset.order_by()[: limit + 1].count()
+
+    @property
+    def approximate(self):
+        return self.count > settings.ADMIN_COUNT_LIMIT
+
+    @staticmethod
+    def _estimate(queryset):
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 until the table is first analyzed.
+        return row[0] if row else -1
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Pages by primary key (?after=<pk>) instead of OFFSET, so every page
+    is one short index range scan however deep the admin browses.
+    """
+
+    keyset = True
+
+    def __init__(self, request, *args, **kwargs):
+        self.after = request.GET.get(CURSOR_VAR) or None
+        super().__init__(request, *args, **kwargs)
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None)
+        return params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.after is not None:
+            try:
+                after = self.model._meta.pk.to_python(self.after)
+            except ValidationError as e:
+                raise IncorrectLookupParameters(e)
+            queryset = queryset.filter(pk__lt=after)
+        return queryset
+
+    def get_ordering(self, request, queryset):
+        return ["-pk"]
+
+    def get_results(self, request):
+        paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        rows = list(self.queryset[: self.list_per_page + 1])
+        self.result_list = rows[: self.list_per_page]
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = self.after is not None or len(rows) > self.list_per_page
+        self.paginator = paginator
+        self.next_page_url = (
+            self.get_query_string({CURSOR_VAR: self.result_list[-1].pk}, [PAGE_VAR])
+            if len(rows) > self.list_per_page
+            else None
+        )
+        self.first_page_url = (
+            self.get_query_string(remove=[CURSOR_VAR, PAGE_VAR])
+            if self.after is not None
+            else None
+        )
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    Changelists for tables too large to count or OFFSET through: keyset
+    pages, estimated counts, no column sorting (every order needs an
+    index), and search restricted to indexed prefix lookups. A search
+    field naming a key_bytes column matches license keys by prefix.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    sortable_by = ()
+    list_per_page = 50
+    # Upper-case the search term before matching. Keys are stored upper
+    # case and e-mails are searched on UPPER(), so with this one term can
+    # use both case-sensitive indexes.
+    search_upper_case = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        if self.search_upper_case:
+            search_term = search_term.upper()
+        search_fields = self.get_search_fields(request)
+        if not any(field.endswith("key_bytes") for field in search_fields):
+            return super().get_search_results(request, queryset, search_term)
+        # Key prefixes become key_bytes range scans. The whole term is one
+        # prefix: keys never contain spaces.
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = Q()
+        for field in search_fields:
+            if field.endswith("key_bytes"):
+                for low, high in key_prefix_ranges(term):
+                    query |= Q(**{f"{field}__range": (low, high)})
+            else:
+                query |= Q(**{field: term})
+        return queryset.filter(query), False
+
 
 @admin.register(Brand)
 class BrandAdmin(admin.ModelAdmin):
@@ -9,7 +151,46 @@ class BrandAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
-admin.site.register(Product)
-admin.site.register(LicenseKey)
-admin.site.register(License)
-admin.site.register(Activation)
+@admin.register(Product)
+class ProductAdmin(ScalableModelAdmin):
+    list_display = ("name", "slug", "brand", "is_active", "created_at")
+    list_select_related = ("brand",)
+    raw_id_fields = ("brand",)
+    search_fields = ("slug__startswith",)
+
+
+@admin.register(LicenseKey)
+class LicenseKeyAdmin(ScalableModelAdmin):
+    list_display = ("key_string", "customer_email", "brand", "created_at")
+    list_select_related = ("brand",)
+    raw_id_fields = ("brand",)
+    search_fields = ("key_bytes", "customer_email__istartswith")
+    search_upper_case = True
+
+
+@admin.register(License)
+class LicenseAdmin(ScalableModelAdmin):
+    list_display = (
+        "license_key",
+        "product",
+        "status",
+        "expiration_date",
+        "seat_limit",
+        "lease_ttl",
+    )
+    list_select_related = ("license_key", "product")
+    raw_id_fields = ("license_key", "product")
+    search_fields = (
+        "license_key__key_bytes",
+        "license_key__customer_email__istartswith",
+    )
+    search_upper_case = True
+
+
+@admin.register(Activation)
+class ActivationAdmin(ScalableModelAdmin):
+    list_display = ("instance_identifier", "license", "lease_expires_at", "created_at")
+    list_select_related = ("license__license_key", "license__product")
+    raw_id_fields = ("license",)
+    search_fields = ("license__license_key__key_bytes",)
+    search_upper_case = True
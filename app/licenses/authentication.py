@@ -1,5 +1,6 @@
 from rest_framework import authentication, exceptions
 from .models import Brand
+from .sharding import resolve_brand
 
 
 class BrandApiKeyAuthentication(authentication.BaseAuthentication):
@@ -9,7 +10,7 @@ class BrandApiKeyAuthentication(authentication.BaseAuthentication):
             return None
 
         try:
-            brand = Brand.objects.get(api_key=api_key)
+            brand = resolve_brand(request, api_key=api_key)
         except (Brand.DoesNotExist, ValueError):
             raise exceptions.AuthenticationFailed("Invalid Brand API Key.")
         return (brand, None)
@@ -22,7 +23,7 @@ class ProductPublicAuthentication(authentication.BaseAuthentication):
             return None
 
         try:
-            brand = Brand.objects.get(slug=brand_slug)
+            brand = resolve_brand(request, slug=brand_slug)
         except Brand.DoesNotExist:
             raise exceptions.AuthenticationFailed("Invalid Brand identifier.")
         return (brand, None)
@@ -0,0 +1,117 @@
+"""
+Single-flight coalescing of identical concurrent computations.
+
+Within a process, calls sharing a key while one of them is running wait
+for it and return its result (or raise its exception) instead of
+running again. A flight subscribed to an invalidation topic detaches
+when its key is published: callers arriving after a write start a new
+computation rather than join one that may have read the old rows.
+
+Across processes, flights can meet through a shared Django cache: the
+first process to add a short-lived lock computes and leaves the result
+under the lock's nonce; the others poll for that result and fall back to
+computing themselves if the leader does not deliver before the lock
+expires. Only callers that arrived while the flight was running read
+its result, as within a process. Callers put the key's invalidation
+generation in the flight key, so a process that has seen a write to it
+starts a new flight.
+"""
+
+import threading
+import time
+import uuid
+from django.core.cache import caches
+from licenses.invalidation import bus
+
+# How often processes waiting on another process's flight check for its
+# result: first after POLL_SECONDS, then twice as long each time, up to
+# MAX_POLL_SECONDS.
+POLL_SECONDS = 0.005
+MAX_POLL_SECONDS = 0.1
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, topic=None):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0
+        if topic is not None:
+            bus.subscribe(topic, self)
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+            call.done.set()
+
+    # Invalidation bus subscriber interface.
+    def evict(self, keys):
+        with self.lock:
+            for key in keys:
+                self.calls.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.calls.clear()
+
+
+def shared_flight(cache_alias, key, fn, lock_seconds):
+    """
+    Runs `fn` in at most one process at a time for `key`, sharing its
+    result through the `cache_alias` cache with processes that asked
+    meanwhile. The result must be picklable.
+    """
+    cache = caches[cache_alias]
+    lock_key = f"flight:{key}"
+    nonce = uuid.uuid4().hex
+    if cache.add(lock_key, nonce, lock_seconds):
+        try:
+            result = fn()
+            cache.set(f"{lock_key}:{nonce}", (result,), lock_seconds)
+            return result
+        finally:
+            cache.delete(lock_key)
+    leader = cache.get(lock_key)
+    deadline = time.monotonic() + lock_seconds
+    delay = POLL_SECONDS
+    while leader is not None and time.monotonic() < deadline:
+        delivered = cache.get(f"{lock_key}:{leader}")
+        if delivered is not None:
+            return delivered[0]
+        time.sleep(max(0, min(delay, deadline - time.monotonic())))
+        delay = min(delay * 2, MAX_POLL_SECONDS)
+        if cache.get(lock_key) != leader:
+            # Finished (or failed) since the last check: one final look.
+            delivered = cache.get(f"{lock_key}:{leader}")
+            if delivered is not None:
+                return delivered[0]
+            break
+    return fn()
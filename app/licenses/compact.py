@@ -0,0 +1,78 @@
+"""
+Compact forms of license keys and instance identifiers, used as the
+indexed lookup columns in place of the text.
+
+Keys in the format the service issues (``G1-`` followed by 24 uppercase
+hex digits) are stored as a tag byte and the 12 bytes they spell, 13
+bytes instead of 27 characters; any other key is stored as a different
+tag byte followed by its UTF-8 text, so every key round-trips exactly.
+Instance identifiers are client-chosen strings of any length, so they
+are indexed by a 64-bit hash and rechecked against the text on lookup.
+
+Database triggers compute both columns on every write with the SQL
+functions of migration 0013; these are the same encodings in Python,
+for building lookup parameters.
+"""
+
+import hashlib
+import re
+
+TAG_TEXT = 0
+TAG_G1 = 1
+
+G1_PREFIX = "G1-"
+G1_HEX_DIGITS = 24
+_G1_PATTERN = re.compile(r"G1-[0-9A-F]{24}\Z")
+
+
+def encode_key(key_string):
+    """
+    The key_bytes value stored for `key_string`.
+    """
+    if _G1_PATTERN.match(key_string):
+        return bytes([TAG_G1]) + bytes.fromhex(key_string.removeprefix(G1_PREFIX))
+    return bytes([TAG_TEXT]) + key_string.encode("utf-8")
+
+
+def decode_key(key_bytes):
+    """
+    The key_string that `key_bytes` was encoded from.
+    """
+    key_bytes = bytes(key_bytes)
+    if key_bytes[0] == TAG_G1:
+        return G1_PREFIX + key_bytes[1:].hex().upper()
+    return key_bytes[1:].decode("utf-8")
+
+
+def instance_hash(instance_identifier):
+    """
+    Signed 64-bit hash of an instance identifier: the first 8 bytes of its
+    SHA-256, as PostgreSQL's ``('x' || hex)::bit(64)::bigint`` reads them.
+    """
+    digest = hashlib.sha256(instance_identifier.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def key_prefix_ranges(prefix):
+    """
+    Inclusive (low, high) key_bytes ranges holding every key that starts
+    with `prefix`, so prefix searches stay index range scans.
+    """
+    ranges = []
+    if G1_PREFIX.startswith(prefix):
+        # Could be the start of any issued key.
+        ranges.append((bytes([TAG_G1]), bytes([TAG_G1]) + b"\xff" * 12))
+    elif prefix.startswith(G1_PREFIX):
+        digits = prefix.removeprefix(G1_PREFIX)
+        if len(digits) <= G1_HEX_DIGITS and re.fullmatch(r"[0-9A-F]*", digits):
+            padding = G1_HEX_DIGITS - len(digits)
+            ranges.append(
+                (
+                    bytes([TAG_G1]) + bytes.fromhex(digits + "0" * padding),
+                    bytes([TAG_G1]) + bytes.fromhex(digits + "F" * padding),
+                )
+            )
+    # UTF-8 never contains 0xff, so no longer key sorts above this bound.
+    text = bytes([TAG_TEXT]) + prefix.encode("utf-8")
+    ranges.append((text, text + b"\xff"))
+    return ranges
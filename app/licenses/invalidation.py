@@ -0,0 +1,352 @@
+"""
+Cross-worker invalidation of in-process caches over LISTEN/NOTIFY.
+
+Writers call `bus.publish(topic, keys)` inside their transaction. The
+publishing worker evicts the keys at once; every other worker is told by
+a NOTIFY, which PostgreSQL delivers on commit (and drops on rollback) to
+the listener thread each worker runs, one connection per database alias.
+
+Each NOTIFY takes a number from licenses_invalidation_seq. A listener
+remembers the highest number it has seen per alias; after a reconnect it
+compares that with the sequence, and if numbers were handed out while it
+was away it clears every cache instead of trusting them. The highest
+number is also kept per key, in stripes by hash of topic and key, for
+callers that must tell whether a given key was written. While the
+listener is down the caches are bypassed. A transaction that straddles
+a reconnect can still slip through, so entries also expire after their
+cache's TTL.
+"""
+
+import os
+import select
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from django.conf import settings
+from django.db import connections
+from core.logging_utils import get_logger
+
+CHANNEL = "licenses_invalidation"
+SEQUENCE = "licenses_invalidation_seq"
+# NOTIFY payloads must stay below 8000 bytes.
+MAX_PAYLOAD_BYTES = 7000
+
+# Topics. Brand entries are evicted by brand id, status documents by
+# status_key(brand id, key string). New license keys are announced to the
+# key filters by status_key too.
+BRAND_TOPIC = "brand"
+STATUS_TOPIC = "status"
+KEY_TOPIC = "key"
+
+PUBLISH_SQL = f"SELECT pg_notify('{CHANNEL}', nextval('{SEQUENCE}') || ' ' || %s)"
+GENERATION_SQL = (
+    f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {SEQUENCE}"
+)
+# Stripes of per-key generations, per alias.
+KEY_STRIPES = 1024
+
+
+def status_key(brand_id, key_string):
+    return f"{brand_id}:{key_string}"
+
+
+def _key_stripe(topic, key):
+    return zlib.crc32(f"{topic}\n{key}".encode()) % KEY_STRIPES
+
+
+def _payloads(topic, keys):
+    """
+    "<topic>\\n<key>\\n<key>...", split to fit the payload limit.
+    """
+    payload, size = [topic], len(topic)
+    for key in keys:
+        if size + len(key) + 1 > MAX_PAYLOAD_BYTES and len(payload) > 1:
+            yield "\n".join(payload)
+            payload, size = [topic], len(topic)
+        payload.append(key)
+        size += len(key) + 1
+    yield "\n".join(payload)
+
+
+class LocalCache:
+    """
+    Per-process LRU of at most `size` entries, each kept at most `ttl`
+    seconds (names of settings), evicted through the bus by key or by tag.
+
+    Fill with a token taken before reading the database:
+
+        token = cache.token(key)
+        value = load()
+        cache.put(key, value, token)
+
+    The put is dropped if an eviction that could concern the key arrived
+    meanwhile, so a value read before a concurrent commit is not kept.
+    Evictions are tracked in `stripes` counters by hash of the key or tag;
+    use one stripe when entries are evicted by tags unknown before loading.
+    """
+
+    def __init__(self, topic, size, ttl, stripes=64):
+        self.topic = topic
+        self.size = size
+        self.ttl = ttl
+        self.stripes = stripes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.tagged = defaultdict(set)
+        self.counters = [0] * stripes
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        bus.subscribe(topic, self)
+
+    def _stripe(self, key):
+        return zlib.crc32(str(key).encode()) % self.stripes
+
+    def get(self, key):
+        if not bus.active():
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def token(self, key):
+        return (self.epoch, self.counters[self._stripe(key)])
+
+    def put(self, key, value, token, tag=None):
+        if not bus.active():
+            return
+        with self.lock:
+            if token != self.token(key):
+                return
+            self._remove(key)
+            expires = time.monotonic() + getattr(settings, self.ttl)
+            self.entries[key] = (value, expires, tag)
+            if tag is not None:
+                self.tagged[tag].add(key)
+            while len(self.entries) > getattr(settings, self.size):
+                self._remove(next(iter(self.entries)))
+
+    def evict(self, keys):
+        with self.lock:
+            for key in keys:
+                self.counters[self._stripe(key)] += 1
+                self._remove(key)
+                for tagged_key in list(self.tagged.get(key, ())):
+                    self._remove(tagged_key)
+
+    def clear(self):
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+            self.tagged.clear()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None and entry[2] is not None:
+            keys = self.tagged[entry[2]]
+            keys.discard(key)
+            if not keys:
+                del self.tagged[entry[2]]
+
+
+class InvalidationBus:
+    def __init__(self):
+        self.caches = defaultdict(list)
+        self.connected = False
+        self.pid = None
+        self.thread = None
+        self.stopping = None
+        # Written to by stop() to wake the listener out of select().
+        self.wakeup = None
+        # alias -> highest generation seen
+        self.generations = {}
+        # alias -> highest generation seen per key stripe
+        self.key_generations = {}
+        self.received = 0
+        self.flushes = 0
+
+    @property
+    def enabled(self):
+        return settings.INVALIDATION_BUS_ENABLED
+
+    def subscribe(self, topic, cache):
+        self.caches[topic].append(cache)
+
+    def active(self):
+        """
+        Whether caches may be used: this process's listener is connected.
+        A forked worker restarts the listener its parent started.
+        """
+        if self.pid is not None and self.pid != os.getpid():
+            self.start()
+        return self.connected
+
+    def generation(self, alias):
+        """
+        Highest invalidation number this process has received for `alias`;
+        it grows with every committed publish.
+        """
+        return self.generations.get(alias, 0)
+
+    def key_generation(self, alias, topic, key):
+        """
+        Highest invalidation number this process has received for `key`
+        of `topic` on `alias` (or for a key sharing its stripe), and at
+        least the number its listener started from, as invalidations
+        before that may have been missed. Unlike generation(), it only
+        grows with writes to the key, and workers that were listening
+        when a key was written agree on it.
+        """
+        stripes = self.key_generations.get(alias)
+        return stripes[_key_stripe(topic, key)] if stripes else 0
+
+    def publish(self, topic, keys, using=None):
+        """
+        Evicts `keys` of `topic` here and, once the surrounding
+        transaction on `using` commits, in every other worker.
+        """
+        keys = [str(key) for key in keys]
+        if not keys:
+            return
+        self._evict(topic, keys)
+        if not self.enabled:
+            return
+        from licenses.sharding import current_alias
+
+        with connections[using or current_alias()].cursor() as cursor:
+            for payload in _payloads(topic, keys):
+                cursor.execute(PUBLISH_SQL, [payload])
+
+    def start(self):
+        """
+        Starts the listener thread of this process; a no-op if it runs.
+        """
+        if not self.enabled:
+            return
+        if self.pid == os.getpid() and self.thread is not None:
+            return
+        self.pid = os.getpid()
+        self.connected = False
+        self.stopping = threading.Event()
+        self.wakeup = os.pipe()
+        self.thread = threading.Thread(
+            target=self._run,
+            args=(self.stopping, self.wakeup[0]),
+            name="invalidation-listener",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopping.set()
+            os.write(self.wakeup[1], b"x")
+            self.thread.join()
+            for fd in self.wakeup:
+                os.close(fd)
+        self.thread = None
+        self.wakeup = None
+        self.pid = None
+        self.connected = False
+
+    def _evict(self, topic, keys):
+        for cache in self.caches.get(topic, ()):
+            cache.evict(keys)
+
+    def _clear(self):
+        self.flushes += 1
+        for caches in self.caches.values():
+            for cache in caches:
+                cache.clear()
+
+    def _receive(self, alias, payload):
+        generation, body = payload.split(" ", 1)
+        topic, *keys = body.split("\n")
+        self._evict(topic, keys)
+        generation = int(generation)
+        self.generations[alias] = max(self.generations[alias], generation)
+        stripes = self.key_generations[alias]
+        for key in keys:
+            stripe = _key_stripe(topic, key)
+            stripes[stripe] = max(stripes[stripe], generation)
+        self.received += 1
+
+    def _connect(self):
+        """
+        Opens a listening connection per alias. Clears the caches if any
+        invalidation may have been missed since the last connection.
+        """
+        listeners = {}
+        missed = False
+        for alias in settings.LICENSE_SHARDS:
+            wrapper = connections[alias]
+            conn = wrapper.Database.connect(**wrapper.get_connection_params())
+            conn.autocommit = True
+            listeners[alias] = conn
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+                cursor.execute(GENERATION_SQL)
+                generation = cursor.fetchone()[0]
+            if generation != self.generations.get(alias):
+                missed = True
+                self.key_generations[alias] = [generation] * KEY_STRIPES
+            self.generations[alias] = generation
+        if missed:
+            self._clear()
+        return listeners
+
+    def _run(self, stopping, wakeup):
+        log = get_logger(__name__, {})
+        listeners = {}
+        while not stopping.is_set():
+            try:
+                if not listeners:
+                    listeners = self._connect()
+                    self.connected = True
+                aliases = {conn: alias for alias, conn in listeners.items()}
+                readable, _, _ = select.select(
+                    [*aliases, wakeup], [], [], settings.INVALIDATION_PING_SECONDS
+                )
+                if wakeup in readable:
+                    break
+                if not readable:
+                    # Quiet for a while: make sure the connections are alive.
+                    for conn in aliases:
+                        with conn.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                for conn in readable:
+                    conn.poll()
+                    while conn.notifies:
+                        self._receive(aliases[conn], conn.notifies.pop(0).payload)
+            except Exception as e:
+                self.connected = False
+                for conn in listeners.values():
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                listeners = {}
+                log.warning(
+                    "Invalidation listener disconnected", extra={"error": str(e)}
+                )
+                stopping.wait(settings.INVALIDATION_RECONNECT_SECONDS)
+        self.connected = False
+        for conn in listeners.values():
+            conn.close()
+
+
+bus = InvalidationBus()
+
+
+def start_on_startup():
+    """
+    Called by the WSGI/ASGI entry points. Caches stay bypassed until the
+    listener has connected.
+    """
+    bus.start()
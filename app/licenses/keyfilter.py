@@ -0,0 +1,330 @@
+import hashlib
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.utils import timezone
+from licenses.compact import encode_key
+from licenses.invalidation import KEY_TOPIC, bus
+from licenses.models import ArchivedLicenseKey, LicenseKey
+from licenses.sharding import current_alias, shard_aliases, use_shard
+from core.logging_utils import get_logger
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings using double hashing of a single
+    BLAKE2b digest. Sized for `capacity` items at `fp_rate`, but never
+    larger than `max_bytes`; past that the false-positive rate degrades
+    instead of memory growing.
+    """
+
+    def __init__(self, capacity, fp_rate, max_bytes):
+        capacity = max(capacity, 1)
+        bits = math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+        self.size = max(64, min(bits, max_bytes * 8))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item)
+        )
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+
+# Archived keys stay in the filter so status checks can fall back to the
+# archive for them. They were hot before, so refreshes only scan LicenseKey.
+KEY_SOURCES = (LicenseKey, ArchivedLicenseKey)
+
+
+class _BrandFilter:
+    def __init__(self, bloom, watermark):
+        self.bloom = bloom
+        self.watermark = watermark
+        self.built_at = time.monotonic()
+        self.refreshed_at = self.built_at
+        # Keys added while a replacement is being built, replayed into it.
+        self.added = None
+
+    def add(self, key_string):
+        self.bloom.add(key_string)
+        if self.added is not None:
+            self.added.append(key_string)
+
+
+class _MintedKeys:
+    """
+    Subscriber to KEY_TOPIC: keys minted by any worker reach every filter
+    when their transaction commits.
+    """
+
+    def __init__(self, key_filter):
+        self.key_filter = key_filter
+
+    def evict(self, keys):
+        for key in keys:
+            brand_id, key_string = key.split(":", 1)
+            self.key_filter.add(uuid.UUID(brand_id), key_string)
+
+    def clear(self):
+        # Announcements may have been missed: catch up on the next miss.
+        self.key_filter.expire_refreshes()
+
+
+class LicenseKeyFilter:
+    """
+    Per-brand in-memory Bloom filters of every key_string, used to reject
+    unknown keys without touching the database.
+
+    Filters are built from a streaming scan (at worker startup via
+    `warm()`, or lazily on first use) and rebuilt in the background every
+    LICENSE_KEY_FILTER_REBUILD_SECONDS, the old filter answering until the
+    new one replaces it. Keys minted by any worker are announced over the
+    invalidation bus, but an announcement may still be on its way (or
+    lost while the listener is down) when the new key is first used: a
+    miss also looks the key up among those created since the filter's
+    last refresh, one index probe instead of the full key query, and an
+    incremental refresh runs at most once per
+    LICENSE_KEY_FILTER_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self._filters = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.refreshes = 0
+        bus.subscribe(KEY_TOPIC, _MintedKeys(self))
+
+    @property
+    def enabled(self):
+        return settings.LICENSE_KEY_FILTER_ENABLED
+
+    def might_exist(self, brand, key_string):
+        """
+        False only if the key does not exist for this brand.
+        """
+        if not self.enabled:
+            return True
+        brand_filter = self._filter_for(brand.id)
+        if key_string not in brand_filter.bloom:
+            # Another worker may have minted it since our last refresh.
+            if self._refresh_due(brand_filter):
+                self._refresh(brand.id, brand_filter)
+            if key_string not in brand_filter.bloom and not self._minted_since(
+                brand.id, brand_filter, key_string
+            ):
+                self.misses += 1
+                return False
+        self.hits += 1
+        return True
+
+    def add(self, brand_id, key_string):
+        with self._lock:
+            brand_filter = self._filters.get(brand_id)
+            if brand_filter is not None:
+                brand_filter.add(key_string)
+
+    def warm(self):
+        """
+        Builds filters for every brand up front, from one streaming scan
+        per shard.
+        """
+        if not self.enabled:
+            return
+        for alias in shard_aliases():
+            with use_shard(alias):
+                self._warm_shard()
+        self._log_stats("License key filters warmed")
+
+    def _warm_shard(self):
+        counts = defaultdict(int)
+        for model in KEY_SOURCES:
+            for brand_id, total in (
+                model.objects.order_by()
+                .values_list("brand_id")
+                .annotate(total=Count("id"))
+            ):
+                counts[brand_id] += total
+        blooms = {brand_id: self._new_bloom(n) for brand_id, n in counts.items()}
+        watermark = timezone.now()
+        for model in KEY_SOURCES:
+            keys = model.objects.order_by().values_list("brand_id", "key_string")
+            for brand_id, key_string in keys.iterator(chunk_size=10000):
+                blooms[brand_id].add(key_string)
+        with self._lock:
+            for brand_id, bloom in blooms.items():
+                self._filters[brand_id] = _BrandFilter(bloom, watermark)
+            self.rebuilds += len(blooms)
+
+    def stats(self):
+        return {
+            "brands": len(self._filters),
+            "bytes": sum(f.bloom.nbytes for f in self._filters.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._filters.clear()
+
+    def expire_refreshes(self):
+        """
+        Makes every filter refresh on its next miss.
+        """
+        for brand_filter in list(self._filters.values()):
+            brand_filter.refreshed_at = float("-inf")
+
+    def _filter_for(self, brand_id):
+        brand_filter = self._filters.get(brand_id)
+        if brand_filter is None:
+            # Nothing to answer from yet: build it here, once per brand.
+            with self._build_lock(brand_id):
+                brand_filter = self._filters.get(brand_id)
+                if brand_filter is None:
+                    brand_filter = self._build(brand_id)
+                    self._filters[brand_id] = brand_filter
+        elif (
+            time.monotonic() - brand_filter.built_at
+            > settings.LICENSE_KEY_FILTER_REBUILD_SECONDS
+        ):
+            self._rebuild_in_background(brand_id, brand_filter)
+        return brand_filter
+
+    def _build_lock(self, brand_id):
+        with self._lock:
+            return self._build_locks.setdefault(brand_id, threading.Lock())
+
+    def _rebuild_in_background(self, brand_id, stale):
+        with self._lock:
+            if stale.added is not None:
+                return
+            stale.added = []
+        threading.Thread(
+            target=self._rebuild,
+            args=(brand_id, stale, current_alias()),
+            name="license-key-filter-rebuild",
+            daemon=True,
+        ).start()
+
+    def _rebuild(self, brand_id, stale, alias):
+        try:
+            with use_shard(alias):
+                fresh = self._build(brand_id)
+            with self._lock:
+                # Keys added during the scan may have committed after it.
+                for key_string in stale.added:
+                    fresh.bloom.add(key_string)
+                if self._filters.get(brand_id) is stale:
+                    self._filters[brand_id] = fresh
+        except Exception as e:
+            stale.added = None
+            get_logger(__name__, {}).warning(
+                "License key filter rebuild failed",
+                extra={"brand_id": brand_id, "error": str(e)},
+            )
+        finally:
+            connections.close_all()
+
+    def _new_bloom(self, expected):
+        # Headroom for keys minted before the next rebuild.
+        return BloomFilter(
+            capacity=int(expected * 1.25) + 1000,
+            fp_rate=settings.LICENSE_KEY_FILTER_FP_RATE,
+            max_bytes=settings.LICENSE_KEY_FILTER_MAX_BYTES,
+        )
+
+    def _build(self, brand_id):
+        sources = [
+            model.objects.filter(brand_id=brand_id).order_by() for model in KEY_SOURCES
+        ]
+        bloom = self._new_bloom(sum(keys.count() for keys in sources))
+        watermark = timezone.now()
+        for keys in sources:
+            for key_string in keys.values_list("key_string", flat=True).iterator(
+                chunk_size=10000
+            ):
+                bloom.add(key_string)
+        self.rebuilds += 1
+        self._log_stats("License key filter rebuilt", brand_id=brand_id)
+        return _BrandFilter(bloom, watermark)
+
+    def _since(self, brand_filter):
+        # Overlap the window so keys whose transactions committed after a
+        # previous refresh, but were stamped before it, are not missed.
+        return brand_filter.watermark - timezone.timedelta(
+            seconds=settings.LICENSE_KEY_FILTER_REFRESH_OVERLAP_SECONDS
+        )
+
+    def _minted_since(self, brand_id, brand_filter, key_string):
+        """
+        For a miss: whether the key is among those created since the
+        filter's last refresh, which the filter may not have heard of yet.
+        """
+        found = LicenseKey.objects.filter(
+            brand_id=brand_id,
+            key_bytes=encode_key(key_string),
+            created_at__gt=self._since(brand_filter),
+        ).exists()
+        if found:
+            brand_filter.add(key_string)
+        return found
+
+    def _refresh_due(self, brand_filter):
+        elapsed = time.monotonic() - brand_filter.refreshed_at
+        return elapsed >= settings.LICENSE_KEY_FILTER_REFRESH_SECONDS
+
+    def _refresh(self, brand_id, brand_filter):
+        since = self._since(brand_filter)
+        watermark = timezone.now()
+        brand_filter.refreshed_at = time.monotonic()
+        for key_string in LicenseKey.objects.filter(
+            brand_id=brand_id, created_at__gt=since
+        ).values_list("key_string", flat=True):
+            brand_filter.add(key_string)
+        brand_filter.watermark = watermark
+        self.refreshes += 1
+
+    def _log_stats(self, message, **extra):
+        get_logger(__name__, {}).info(message, extra={**self.stats(), **extra})
+
+
+key_filter = LicenseKeyFilter()
+
+
+def warm_on_startup():
+    """
+    Called by the WSGI/ASGI entry points. A failure only means filters
+    are built lazily on first use instead.
+    """
+    if not settings.LICENSE_KEY_FILTER_WARM_ON_STARTUP:
+        return
+    try:
+        key_filter.warm()
+    except Exception as e:
+        get_logger(__name__, {}).warning(
+            "License key filter warm-up failed", extra={"error": str(e)}
+        )
@@ -0,0 +1,93 @@
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from licenses.services.archive import ArchiveService
+from licenses.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves license keys whose licenses all ended before the retention "
+        "window to the archive table, and purges old idempotency records. "
+        "Works in small throttled batches so it can run next to live traffic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ARCHIVE_BATCH_SIZE,
+            help="Keys scanned (and at most archived) per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.ARCHIVE_PAUSE_SECONDS,
+            help="Seconds to sleep between batches, to limit write load.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop each shard after this many batches.",
+        )
+        parser.add_argument(
+            "--reindex",
+            action="store_true",
+            help="Rebuild hot-table indexes afterwards (CONCURRENTLY) to reclaim space.",
+        )
+
+    def handle(self, *args, **options):
+        ctx = {"request_id": "archive_cold_data"}
+        cutoffs = ArchiveService.cutoffs()
+        for alias in shard_aliases():
+            with use_shard(alias):
+                before = ArchiveService.index_sizes()
+                moved = self._archive(cutoffs["licenses"], options, ctx)
+                moved["idempotencyrecord"] += self._purge(
+                    cutoffs["idempotency"], options, ctx
+                )
+                if options["reindex"]:
+                    ArchiveService.reindex()
+                after = ArchiveService.index_sizes()
+            self._report(alias, moved, before, after)
+
+    def _archive(self, cutoff, options, ctx):
+        moved = Counter()
+        after, batches = None, 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            key_ids, after = ArchiveService.archivable_keys(
+                after, options["batch_size"], cutoff
+            )
+            if key_ids:
+                moved.update(ArchiveService.archive_keys(key_ids, cutoff, ctx))
+            if after is None:
+                break
+            batches += 1
+            time.sleep(options["pause"])
+        return moved
+
+    def _purge(self, cutoff, options, ctx):
+        total, batches = 0, 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            purged = ArchiveService.purge_idempotency_records(
+                cutoff, options["batch_size"], ctx
+            )
+            total += purged
+            if purged < options["batch_size"]:
+                break
+            batches += 1
+            time.sleep(options["pause"])
+        return total
+
+    def _report(self, alias, moved, before, after):
+        self.stdout.write(f"Shard {alias}:")
+        for table, count in sorted(moved.items()):
+            self.stdout.write(f"  {table}: {count} rows moved")
+        for table in sorted(before):
+            reclaimed = before[table] - after.get(table, 0)
+            self.stdout.write(
+                f"  {table}: index {before[table]} -> {after.get(table, 0)} bytes "
+                f"({reclaimed} reclaimed)"
+            )
@@ -0,0 +1,127 @@
+import io
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+from core.ids import uuid7
+
+GENERATORS = {
+    "uuid4": uuid.uuid4,
+    "uuid7": uuid7,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares random (uuid4) and time-ordered (uuid7) primary keys: "
+        "loads the same number of activation-shaped rows into a scratch "
+        "table per generator, one transaction per batch, and reports insert "
+        "throughput as the index grows, the final index size and how many "
+        "index blocks had to be read from outside shared buffers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--generators",
+            nargs="+",
+            choices=sorted(GENERATORS),
+            default=sorted(GENERATORS),
+        )
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the scratch tables."
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW shared_buffers")
+            self.stdout.write(
+                f"{options['rows']:,} rows in batches of {options['batch_size']:,}, "
+                f"shared_buffers {cursor.fetchone()[0]}"
+            )
+        results = {}
+        for name in options["generators"]:
+            table = f"benchmark_pk_{name}"
+            try:
+                results[name] = self._run(connection, table, GENERATORS[name], options)
+            finally:
+                if not options["keep"]:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        self._report(results)
+
+    def _run(self, connection, table, generate, options):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(
+                f"CREATE TABLE {table} ("
+                "id uuid PRIMARY KEY, "
+                "created_at timestamptz NOT NULL, "
+                "instance_identifier varchar(255) NOT NULL)"
+            )
+        rows, batch_size = options["rows"], options["batch_size"]
+        # Throughput per tenth of the load, to show the slowdown as the
+        # index outgrows the cache.
+        deciles = [0.0] * 10
+        loaded = 0
+        while loaded < rows:
+            count = min(batch_size, rows - loaded)
+            buffer = self._batch(generate, loaded, count)
+            started = time.perf_counter()
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.cursor.copy_expert(
+                        f"COPY {table} (id, created_at, instance_identifier) "
+                        "FROM STDIN",
+                        buffer,
+                    )
+            deciles[min(9, loaded * 10 // rows)] += time.perf_counter() - started
+            loaded += count
+            self.stdout.write(f"  {table}: {loaded:,}", ending="\r")
+        self.stdout.write("")
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_stat_force_next_flush()")
+            cursor.execute(
+                "SELECT pg_relation_size(%s), pg_relation_size(%s), "
+                "idx_blks_read, idx_blks_hit "
+                "FROM pg_statio_user_indexes WHERE indexrelname = %s",
+                [table, f"{table}_pkey", f"{table}_pkey"],
+            )
+            table_bytes, index_bytes, blocks_read, blocks_hit = cursor.fetchone()
+        return {
+            "seconds": sum(deciles),
+            "rows_per_second": rows / max(sum(deciles), 1e-9),
+            "last_decile_rows_per_second": (rows / 10) / max(deciles[-1], 1e-9),
+            "table_bytes": table_bytes,
+            "index_bytes": index_bytes,
+            "index_bytes_per_row": index_bytes / rows,
+            "index_blocks_read": blocks_read,
+            "index_hit_ratio": blocks_hit / max(blocks_hit + blocks_read, 1),
+        }
+
+    @staticmethod
+    def _batch(generate, first, count):
+        now = timezone.now().isoformat()
+        buffer = io.StringIO()
+        for n in range(first, first + count):
+            buffer.write(f"{generate()}\t{now}\thost-{n}.example\n")
+        buffer.seek(0)
+        return buffer
+
+    def _report(self, results):
+        self.stdout.write(
+            f"{'':<8}{'seconds':>9}{'rows/s':>11}{'last 10% rows/s':>17}"
+            f"{'index MB':>10}{'B/row':>7}{'idx blocks read':>17}{'hit %':>7}"
+        )
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<8}{r['seconds']:>9.1f}{r['rows_per_second']:>11,.0f}"
+                f"{r['last_decile_rows_per_second']:>17,.0f}"
+                f"{r['index_bytes'] / 2**20:>10.0f}{r['index_bytes_per_row']:>7.1f}"
+                f"{r['index_blocks_read']:>17,}{r['index_hit_ratio'] * 100:>7.1f}"
+            )
@@ -0,0 +1,144 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from licenses.models import Activation, Brand, License, LicenseKey, Product
+from licenses.payloads import entitlement_rows, render_license_status
+from licenses.serializers import (
+    GlobalLicenseKeySerializer,
+    LicenseStatusResponseSerializer,
+)
+from licenses.services.lookups import GlobalLookupService
+from licenses.services.status import StatusService
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmarks the DRF entitlement serializers against the fast "
+        "payload path. Seeds data inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[1, 100, 10000],
+            help="Entitlement counts per license key (default: 1 100 10000).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per measurement; the median is reported.",
+        )
+
+    def handle(self, *args, **options):
+        self.ctx = {"request_id": "benchmark"}
+        self.repeat = options["repeat"]
+        self.stdout.write(
+            f"{'entitlements':>12}  {'measurement':<24}{'drf ms':>10}"
+            f"{'fast ms':>10}{'speedup':>9}"
+        )
+        for size in options["sizes"]:
+            with transaction.atomic():
+                brand, key = self._seed(size)
+                self._compare(size, brand, key)
+                transaction.set_rollback(True)
+
+    def _seed(self, size):
+        run = uuid.uuid4().hex[:8]
+        brand = Brand.objects.create(name=f"Benchmark {run}", slug=f"bench-{run}")
+        products = Product.objects.bulk_create(
+            Product(brand=brand, name=f"Product {i}", slug=f"bench-{run}-{i}")
+            for i in range(size)
+        )
+        key = LicenseKey.objects.create(
+            brand=brand, key_string=f"BENCH-{run}", customer_email=f"{run}@bench.io"
+        )
+        expiration_date = timezone.now() + timezone.timedelta(days=365)
+        licenses = License.objects.bulk_create(
+            License(
+                license_key=key,
+                product=product,
+                expiration_date=expiration_date,
+                seat_limit=5,
+            )
+            for product in products
+        )
+        Activation.objects.bulk_create(
+            Activation(license=lic, instance_identifier=f"site-{i}.example")
+            for i, lic in enumerate(licenses)
+        )
+        # Give the planner real statistics for the freshly seeded rows.
+        with connection.cursor() as cursor:
+            for model in (Product, LicenseKey, License, Activation):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+        return brand, key
+
+    def _time(self, func):
+        samples = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples), result
+
+    def _report(self, size, name, drf, fast):
+        drf_ms, drf_data = drf
+        fast_ms, fast_data = fast
+        renderer = JSONRenderer()
+        if renderer.render(drf_data) != renderer.render(fast_data):
+            raise CommandError(f"{name}: fast path output differs from DRF")
+        self.stdout.write(
+            f"{size:>12}  {name:<24}{drf_ms:>10.2f}{fast_ms:>10.2f}"
+            f"{drf_ms / fast_ms:>8.1f}x"
+        )
+
+    def _compare(self, size, brand, key):
+        # Serialization only: both sides start from already loaded data.
+        loaded = StatusService.get_license_status(brand, key.key_string, self.ctx)
+        key_row = {"key_string": key.key_string, "customer_email": key.customer_email}
+        rows = list(entitlement_rows(license_key_id=key.id))
+        self._report(
+            size,
+            "status serialize",
+            self._time(lambda: LicenseStatusResponseSerializer(loaded).data),
+            self._time(lambda: render_license_status(key_row, rows)),
+        )
+
+        # End to end: queries plus serialization, as the views run them.
+        self._report(
+            size,
+            "status end-to-end",
+            self._time(
+                lambda: LicenseStatusResponseSerializer(
+                    StatusService.get_license_status(brand, key.key_string, self.ctx)
+                ).data
+            ),
+            self._time(
+                lambda: StatusService.get_license_status_payload(
+                    brand, key.key_string, self.ctx
+                )
+            ),
+        )
+        self._report(
+            size,
+            "global lookup end-to-end",
+            self._time(
+                lambda: GlobalLicenseKeySerializer(
+                    GlobalLookupService.get_all_licenses_by_email(
+                        key.customer_email, self.ctx
+                    ),
+                    many=True,
+                ).data
+            ),
+            self._time(
+                lambda: GlobalLookupService.get_license_payloads_by_email(
+                    key.customer_email, self.ctx
+                )
+            ),
+        )
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from licenses.services.summaries import CustomerSummaryService
+from licenses.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares every per-customer license summary with a fresh render "
+        "and reports missing, stale and orphaned rows. Exits non-zero if any "
+        "are found, unless --fix repaired them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.CUSTOMER_SUMMARY_BATCH_SIZE,
+            help="License keys compared per query.",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Refresh the inconsistent summaries that are found.",
+        )
+
+    def handle(self, *args, **options):
+        ctx = {"request_id": "check_customer_summaries"}
+        inconsistent = 0
+        for alias in shard_aliases():
+            with use_shard(alias):
+                result = CustomerSummaryService.check(
+                    options["batch_size"], ctx, fix=options["fix"]
+                )
+            self.stdout.write(
+                f"{alias}: {result['checked']} checked, "
+                f"{len(result['stale'])} missing or stale, "
+                f"{len(result['orphaned'])} orphaned."
+            )
+            for key_id in result["stale"]:
+                self.stdout.write(f"  stale {key_id}")
+            for key_id in result["orphaned"]:
+                self.stdout.write(f"  orphaned {key_id}")
+            inconsistent += len(result["stale"]) + len(result["orphaned"])
+        if inconsistent and not options["fix"]:
+            raise CommandError(f"{inconsistent} customer summaries are inconsistent.")
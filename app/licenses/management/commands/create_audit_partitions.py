@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from licenses.services.audit import AuditLogService
+from licenses.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates monthly audit log partitions ahead of time. Run from cron so "
+        "new rows never land in the default partition."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of future months to prepare (default: 3).",
+        )
+
+    def handle(self, *args, **options):
+        for alias in shard_aliases():
+            names = AuditLogService.ensure_partitions(
+                options["months_ahead"], using=alias
+            )
+            for name in names:
+                self.stdout.write(f"Partition ready: {alias}.{name}")
@@ -0,0 +1,208 @@
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from licenses.models import Brand, BrandShard, Product
+from licenses.sharding import shard_aliases
+from licenses.synthetic import (
+    COPY_COLUMNS,
+    DatasetSpec,
+    Distribution,
+    brand_weights,
+    generate_chunk,
+    seeded_uuid,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a deterministic multi-brand dataset for benchmarking and "
+        "loads it with COPY from parallel worker processes. The same seed "
+        "and options always produce the same rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--brands", type=int, default=5)
+        parser.add_argument("--products-per-brand", type=int, default=10)
+        parser.add_argument(
+            "--customers",
+            type=int,
+            default=10000,
+            help="Distinct customer e-mails; the main scale knob.",
+        )
+        parser.add_argument(
+            "--keys-per-customer",
+            default="1:70,2:20,3:7,10:3",
+            help="value:weight distribution of license keys per e-mail.",
+        )
+        parser.add_argument(
+            "--products-per-key",
+            default="1:80,2:15,3:5",
+            help="value:weight distribution of licenses per key.",
+        )
+        parser.add_argument(
+            "--seats-per-license",
+            default="1:50,3:25,10:15,100:10",
+            help="value:weight distribution of seat limits.",
+        )
+        parser.add_argument(
+            "--activation-fill",
+            type=float,
+            default=0.6,
+            help="Probability that each seat is activated.",
+        )
+        parser.add_argument(
+            "--brand-skew",
+            type=float,
+            default=1.0,
+            help="Zipf exponent of brand popularity (0 = uniform).",
+        )
+        parser.add_argument("--expired-ratio", type=float, default=0.1)
+        parser.add_argument("--cancelled-ratio", type=float, default=0.05)
+        parser.add_argument(
+            "--history-days",
+            type=int,
+            default=730,
+            help="Keys are created uniformly over this many days before --as-of.",
+        )
+        parser.add_argument(
+            "--as-of",
+            default=None,
+            help="ISO date all timestamps are relative to (default: today, UTC). "
+            "Pin it to compare runs across days.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Customers per COPY batch. Part of the dataset's identity.",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        try:
+            distributions = [
+                Distribution(options[name])
+                for name in (
+                    "keys_per_customer",
+                    "products_per_key",
+                    "seats_per_license",
+                )
+            ]
+        except ValueError as e:
+            raise CommandError(e)
+        spec = DatasetSpec(
+            seed=options["seed"],
+            customers=options["customers"],
+            keys_per_customer=options["keys_per_customer"],
+            products_per_key=options["products_per_key"],
+            seats_per_license=options["seats_per_license"],
+            activation_fill=options["activation_fill"],
+            expired_ratio=options["expired_ratio"],
+            cancelled_ratio=options["cancelled_ratio"],
+            history_days=options["history_days"],
+            chunk_size=options["chunk_size"],
+            as_of=self._as_of(options["as_of"]),
+        )
+        keys = spec.customers * distributions[0].mean
+        licenses = keys * min(distributions[1].mean, options["products_per_brand"])
+        activations = licenses * distributions[2].mean * spec.activation_fill
+        self.stdout.write(
+            f"Seed {spec.seed} as of {spec.as_of:%Y-%m-%d}: about {keys:,.0f} keys, "
+            f"{licenses:,.0f} licenses, {activations:,.0f} activations."
+        )
+
+        brands = self._create_brands(spec, options)
+        weights = brand_weights(len(brands), options["brand_skew"])
+        started = time.monotonic()
+        counts = self._load(spec, brands, weights, options["workers"])
+        elapsed = time.monotonic() - started
+
+        for alias in shard_aliases():
+            with connections[alias].cursor() as cursor:
+                for table in COPY_COLUMNS:
+                    cursor.execute(f"ANALYZE {table}")
+        for table, count in counts.items():
+            self.stdout.write(f"  {table}: {count:,} rows")
+        total = sum(counts.values())
+        self.stdout.write(
+            f"Loaded {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)."
+        )
+
+    def _as_of(self, value):
+        if value is None:
+            today = timezone.now().date()
+            return datetime(today.year, today.month, today.day, tzinfo=dt_timezone.utc)
+        try:
+            day = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid --as-of date {value!r}.")
+        return day.replace(tzinfo=day.tzinfo or dt_timezone.utc)
+
+    def _create_brands(self, spec, options):
+        """
+        Brands and products, with ids drawn from the seed. Returns
+        [(alias, brand_id, [product ids])] in popularity order.
+        """
+        slug = f"synthetic-{spec.seed}"
+        if BrandShard.objects.filter(slug__startswith=f"{slug}-").exists():
+            raise CommandError(f"A dataset for seed {spec.seed} is already loaded.")
+        rng = random.Random(f"{spec.seed}:brands")
+        # Catalog rows predate all generated history.
+        created_at = spec.as_of - timedelta(days=spec.history_days)
+        brands = []
+        for b in range(options["brands"]):
+            brand = Brand(
+                id=seeded_uuid(rng, created_at),
+                name=f"Synthetic {spec.seed}-{b}",
+                slug=f"{slug}-{b}",
+                api_key=f"sk_synthetic_{spec.seed}_{b}",
+            )
+            brand.save()
+            alias = brand._state.db
+            products = Product.objects.using(alias).bulk_create(
+                Product(
+                    id=seeded_uuid(rng, created_at),
+                    brand=brand,
+                    name=f"Product {p}",
+                    slug=f"{brand.slug}-p{p}",
+                )
+                for p in range(options["products_per_brand"])
+            )
+            brands.append((alias, brand.id, [product.id for product in products]))
+        return brands
+
+    def _load(self, spec, brands, weights, workers):
+        counts = Counter()
+        chunks = spec.chunks()
+        if workers <= 1:
+            for chunk in chunks:
+                counts.update(generate_chunk(spec, chunk, brands, weights))
+                self._progress(counts)
+            return counts
+        # Forked workers must open their own connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            futures = [
+                pool.submit(generate_chunk, spec, chunk, brands, weights)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                counts.update(future.result())
+                self._progress(counts)
+        return counts
+
+    def _progress(self, counts):
+        self.stdout.write(
+            "  " + ", ".join(f"{t}={n:,}" for t, n in sorted(counts.items())),
+            ending="\r",
+        )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from licenses.services.shard_moves import BrandMoveService
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves a brand to another shard online. The brand keeps serving "
+        "reads throughout; writes are refused (503) only while the final "
+        "delta is copied."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("brand_id", help="Id of the brand to move.")
+        parser.add_argument("target", help="Database alias of the target shard.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows copied per INSERT (default: 1000).",
+        )
+        parser.add_argument(
+            "--drain-seconds",
+            type=float,
+            default=2.0,
+            help="Wait for workers to drop cached directory entries before "
+            "deleting the source rows (default: 2).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = BrandMoveService.move(
+                options["brand_id"],
+                options["target"],
+                context={"request_id": "move_brand"},
+                batch_size=options["batch_size"],
+                drain_seconds=options["drain_seconds"],
+            )
+        except ValidationError as e:
+            raise CommandError(e.detail[0] if isinstance(e.detail, list) else e.detail)
+        self.stdout.write(
+            f"Moved brand to {options['target']}: {result['copied']} rows copied, "
+            f"{result['changed']} changed and {result['removed']} removed "
+            f"during the switch."
+        )
@@ -0,0 +1,145 @@
+import glob
+import io
+import os
+import pstats
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import get_resolver
+from core.profiling import api_key_digest, read_rules, write_rules
+from licenses.models import Brand, BrandShard
+from licenses.sharding import sharding_enabled
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+
+class Command(BaseCommand):
+    help = (
+        "Switches sampled cProfile profiling of live requests on and off per "
+        "endpoint (URL name) and optionally per brand, and merges the "
+        "profiles the workers dumped into one summary."
+    )
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest="action", required=True)
+
+        start = actions.add_parser("start", help="Profile an endpoint.")
+        start.add_argument("endpoint", help="URL name, e.g. license-activation.")
+        start.add_argument("--brand", help="Only requests of this brand (slug).")
+        start.add_argument(
+            "--rate",
+            type=float,
+            default=0.05,
+            help="Fraction of matching requests profiled (default: 0.05).",
+        )
+        start.add_argument(
+            "--minutes",
+            type=float,
+            default=10,
+            help="The rule lapses after this long (default: 10).",
+        )
+
+        stop = actions.add_parser("stop", help="Stop profiling.")
+        stop.add_argument(
+            "endpoint", nargs="?", help="Only this endpoint (default: all)."
+        )
+
+        actions.add_parser("list", help="Show the active rules.")
+
+        report = actions.add_parser("report", help="Merge and summarize profiles.")
+        report.add_argument(
+            "endpoint", nargs="?", help="Only this endpoint (default: all)."
+        )
+        report.add_argument("--sort", choices=SORT_KEYS, default="cumulative")
+        report.add_argument("--limit", type=int, default=25)
+        report.add_argument(
+            "--output", help="Also write the merged profile of one endpoint here."
+        )
+        report.add_argument(
+            "--clear", action="store_true", help="Delete the profiles afterwards."
+        )
+
+    def handle(self, *args, **options):
+        getattr(self, f"_{options['action']}")(options)
+
+    def _start(self, options):
+        endpoint = options["endpoint"]
+        if endpoint not in get_resolver().reverse_dict:
+            raise CommandError(f"No URL is named {endpoint!r}.")
+        if not 0 < options["rate"] <= 1:
+            raise CommandError("--rate must be in (0, 1].")
+        rule = {
+            "endpoint": endpoint,
+            "brand": self._brand(options["brand"]) if options["brand"] else None,
+            "rate": options["rate"],
+            "until": time.time() + options["minutes"] * 60,
+        }
+        rules = [
+            r
+            for r in read_rules()
+            if (r["endpoint"], r["brand"]) != (endpoint, rule["brand"])
+        ]
+        write_rules(rules + [rule])
+        self.stdout.write(
+            f"Profiling {options['rate']:.0%} of {endpoint} requests"
+            f"{' of ' + options['brand'] if options['brand'] else ''} for "
+            f"{options['minutes']:g} minutes; workers pick this up within "
+            f"{settings.PROFILE_CONTROL_CHECK_SECONDS:g}s."
+        )
+
+    @staticmethod
+    def _brand(slug):
+        model = BrandShard if sharding_enabled() else Brand
+        try:
+            api_key = model.objects.values_list("api_key", flat=True).get(slug=slug)
+        except model.DoesNotExist:
+            raise CommandError(f"No brand with slug {slug!r}.")
+        return {"slug": slug, "api_key_sha256": api_key_digest(api_key)}
+
+    def _stop(self, options):
+        rules = read_rules()
+        kept = [r for r in rules if options["endpoint"] not in (None, r["endpoint"])]
+        write_rules(kept)
+        self.stdout.write(f"Stopped {len(rules) - len(kept)} rule(s).")
+
+    def _list(self, options):
+        rules = read_rules()
+        if not rules:
+            self.stdout.write("Profiling is off.")
+        for rule in rules:
+            brand = rule["brand"]["slug"] if rule["brand"] else "all brands"
+            self.stdout.write(
+                f"{rule['endpoint']} ({brand}): {rule['rate']:.0%} for another "
+                f"{(rule['until'] - time.time()) / 60:.1f} minutes"
+            )
+
+    def _report(self, options):
+        files = defaultdict(list)
+        for path in glob.glob(os.path.join(settings.PROFILE_DIR, "*.prof")):
+            endpoint, _pid, _time, requests, _ = os.path.basename(path).rsplit(".", 4)
+            if options["endpoint"] in (None, endpoint):
+                files[endpoint].append((path, int(requests)))
+        if not files:
+            raise CommandError(f"No profiles in {settings.PROFILE_DIR}.")
+        if options["output"] and len(files) > 1:
+            raise CommandError("--output needs a single endpoint.")
+
+        for endpoint, entries in sorted(files.items()):
+            requests = sum(count for _, count in entries)
+            # pstats prints in fragments; OutputWrapper would end each one.
+            printed = io.StringIO()
+            stats = pstats.Stats(*(path for path, _ in entries), stream=printed)
+            self.stdout.write(
+                f"{endpoint}: {requests} requests in {len(entries)} profiles, "
+                f"{stats.total_tt * 1000 / requests:.2f} ms profiled per request"
+            )
+            if options["output"]:
+                stats.dump_stats(options["output"])
+            stats.strip_dirs().sort_stats(options["sort"])
+            stats.print_stats(options["limit"])
+            self.stdout.write(printed.getvalue(), ending="")
+        if options["clear"]:
+            for entries in files.values():
+                for path, _ in entries:
+                    os.remove(path)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from licenses.services.summaries import CustomerSummaryService
+from licenses.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-renders every per-customer license summary from the license "
+        "tables. The triggers keep them current; use this after restoring "
+        "data or changing the summary document."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.CUSTOMER_SUMMARY_BATCH_SIZE,
+            help="License keys re-rendered per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        ctx = {"request_id": "rebuild_customer_summaries"}
+        for alias in shard_aliases():
+            with use_shard(alias):
+                total = CustomerSummaryService.rebuild(options["batch_size"], ctx)
+            self.stdout.write(f"Rebuilt {total} customer summaries on {alias}.")
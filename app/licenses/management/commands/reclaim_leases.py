@@ -0,0 +1,53 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from licenses.services.activation import ActivationService
+from licenses.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired seat leases in batches. Expired leases already hold "
+        "no seat; this only removes the rows. Run from cron, or with "
+        "--interval as a long-running worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.LEASE_RECLAIM_BATCH_SIZE,
+            help="Leases deleted per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.LEASE_RECLAIM_PAUSE_SECONDS,
+            help="Seconds to sleep between full batches, to limit write load.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Keep running, sweeping again every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        ctx = {"request_id": "reclaim_leases"}
+        while True:
+            for alias in shard_aliases():
+                with use_shard(alias):
+                    total = self._sweep(options["batch_size"], options["pause"], ctx)
+                self.stdout.write(f"Reclaimed {total} expired leases on {alias}.")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
+
+    def _sweep(self, batch_size, pause, ctx):
+        total = 0
+        while True:
+            reclaimed = ActivationService.reclaim_expired_leases(batch_size, ctx)
+            total += reclaimed
+            if reclaimed < batch_size:
+                return total
+            time.sleep(pause)
@@ -0,0 +1,49 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from licenses.services.summaries import CustomerSummaryService
+from licenses.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-renders the per-customer license summaries queued by activation "
+        "and license changes, and those counting leases that have expired "
+        "since. Global lookups lag by the time between "
+        "runs. Run with --interval as a long-running worker (the "
+        "docker-compose summaries service), or from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.CUSTOMER_SUMMARY_BATCH_SIZE,
+            help="Queued keys and due summaries taken per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Keep running, refreshing again every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        ctx = {"request_id": "refresh_customer_summaries"}
+        while True:
+            for alias in shard_aliases():
+                with use_shard(alias):
+                    total = self._drain(options["batch_size"], ctx)
+                self.stdout.write(f"Refreshed {total} customer summaries on {alias}.")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def _drain(batch_size, ctx):
+        total = 0
+        while True:
+            taken = CustomerSummaryService.refresh_pending(batch_size, ctx)
+            total += taken
+            if taken < batch_size:
+                return total
@@ -0,0 +1,48 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from licenses.services.usage import UsageService
+from licenses.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Folds the usage deltas recorded by the services into the daily "
+        "rollups behind the usage report. Reports include unfolded deltas, "
+        "so this only keeps them cheap. Run from cron, or with --interval "
+        "as a long-running worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.USAGE_ROLLUP_BATCH_SIZE,
+            help="Deltas folded per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Keep running, folding again every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, **options):
+        ctx = {"request_id": "rollup_usage"}
+        while True:
+            for alias in shard_aliases():
+                with use_shard(alias):
+                    total = self._fold(options["batch_size"], ctx)
+                self.stdout.write(f"Folded {total} usage deltas on {alias}.")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def _fold(batch_size, ctx):
+        total = 0
+        while True:
+            folded = UsageService.fold(batch_size, ctx)
+            total += folded
+            if folded < batch_size:
+                return total
@@ -0,0 +1,70 @@
+import os
+import socket
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from licenses.services.jobs import JobService
+from licenses.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs on every shard. Workers claim jobs with "
+        "SKIP LOCKED, so any number of them can run side by side. With "
+        "--burst it exits once the queues are empty, for cron and tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Jobs claimed per round trip.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOB_POLL_SECONDS,
+            help="Seconds to sleep when no shard has due jobs.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no shard has due jobs.",
+        )
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"[:64]
+        ctx = {"request_id": "run_jobs", "worker": worker}
+        while True:
+            ran = 0
+            for alias in shard_aliases():
+                with use_shard(alias):
+                    ran += self._drain(worker, options["batch_size"], ctx)
+            if ran:
+                continue
+            for alias in shard_aliases():
+                with use_shard(alias):
+                    self._purge(options["batch_size"])
+            if options["burst"]:
+                return
+            time.sleep(options["poll_interval"])
+
+    def _drain(self, worker, batch_size, ctx):
+        ran = 0
+        while True:
+            jobs = JobService.claim(worker, batch_size)
+            for job in jobs:
+                status = JobService.run(job, ctx)
+                self.stdout.write(f"Job {job.id} ({job.kind}): {status}")
+            ran += len(jobs)
+            if len(jobs) < batch_size:
+                return ran
+
+    @staticmethod
+    def _purge(batch_size):
+        cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+        while JobService.purge_finished(cutoff, batch_size * 100) == batch_size * 100:
+            pass
@@ -0,0 +1,174 @@
+import multiprocessing
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from licenses.models import Brand, License, LicenseKey, Product
+from licenses.sharding import use_shard
+from licenses.stress import (
+    ACTIVATION_STRATEGIES,
+    OUTCOMES,
+    run_worker,
+    seat_violations,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Races concurrent activations from several processes against "
+        "single-seat and many-seat licenses, then checks that no seat limit "
+        "was exceeded. Reports throughput, latency, lock wait and hold time, "
+        "and deadlock or serialization failures per strategy. Seeds its own "
+        "brand and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strategies",
+            nargs="+",
+            choices=sorted(ACTIVATION_STRATEGIES),
+            default=["row_lock"],
+            help="Activation strategies to compare, each on fresh licenses.",
+        )
+        parser.add_argument("--processes", type=int, default=8)
+        parser.add_argument(
+            "--seat-limits",
+            nargs="+",
+            type=int,
+            default=[1, 50],
+            help="One license is raced per seat limit (default: 1 50).",
+        )
+        parser.add_argument(
+            "--attempts-per-license",
+            type=int,
+            default=200,
+            help="Activations fired at each license, each with a new instance.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the seeded brand and its activations for inspection.",
+        )
+
+    def handle(self, *args, **options):
+        brand = Brand(name="Activation stress", slug=f"stress-{uuid.uuid4().hex[:8]}")
+        brand.save()
+        alias = brand._state.db
+        violations = []
+        try:
+            with use_shard(alias):
+                product = Product.objects.create(
+                    brand=brand, name="Stress", slug=f"{brand.slug}-product"
+                )
+            for strategy in options["strategies"]:
+                violations += self._race(strategy, brand, product, options)
+        finally:
+            if not options["keep"]:
+                brand.delete()
+        if violations:
+            raise CommandError("\n".join(violations))
+
+    def _seed(self, strategy, brand, product, seat_limits):
+        licenses = []
+        with use_shard(brand._state.db):
+            for seat_limit in seat_limits:
+                key = LicenseKey.objects.create(
+                    brand=brand,
+                    key_string=f"STRESS-{strategy}-{uuid.uuid4().hex}".upper(),
+                    customer_email="stress@example.com",
+                )
+                licenses.append(
+                    License.objects.create(
+                        license_key=key,
+                        product=product,
+                        seat_limit=seat_limit,
+                        expiration_date=timezone.now() + timedelta(days=1),
+                    )
+                )
+        return licenses
+
+    def _race(self, strategy, brand, product, options):
+        alias = brand._state.db
+        licenses = self._seed(strategy, brand, product, options["seat_limits"])
+        targets = [(lic.license_key.key_string, product.id) for lic in licenses]
+        plan = [
+            target
+            for target in range(len(targets))
+            for _ in range(options["attempts_per_license"])
+        ]
+        random.Random(options["seed"]).shuffle(plan)
+        processes = max(1, options["processes"])
+        plans = [plan[worker::processes] for worker in range(processes)]
+
+        start_at = time.time()
+        results = []
+        if processes == 1:
+            results = run_worker(
+                strategy, alias, brand.id, targets, plans[0], 0, start_at
+            )
+        else:
+            # Forked workers must open their own connections, and get a
+            # moment to do so before the common start.
+            connections.close_all()
+            start_at += 0.5
+            with ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("fork")
+            ) as pool:
+                futures = [
+                    pool.submit(
+                        run_worker,
+                        strategy,
+                        alias,
+                        brand.id,
+                        targets,
+                        worker_plan,
+                        worker,
+                        start_at,
+                    )
+                    for worker, worker_plan in enumerate(plans)
+                ]
+                for future in futures:
+                    results += future.result()
+        elapsed = time.time() - start_at
+
+        activated = Counter(
+            licenses[target].id
+            for target, outcome, *_ in results
+            if outcome == "activated"
+        )
+        violations = seat_violations(alias, [lic.id for lic in licenses], activated)
+        seat_limits = [lic.seat_limit for lic in licenses]
+        self._report(
+            strategy, results, elapsed, processes, summarize(results, seat_limits)
+        )
+        for message in violations:
+            self.stderr.write(f"  VIOLATION {message}")
+        return [f"{strategy}: {message}" for message in violations]
+
+    def _report(self, strategy, results, elapsed, processes, summary):
+        self.stdout.write(
+            f"{strategy}: {len(results)} attempts from {processes} processes in "
+            f"{elapsed:.2f}s ({len(results) / max(elapsed, 1e-9):,.0f} attempts/s)"
+        )
+        self.stdout.write(
+            f"  {'seats':>6}{'attempts':>9}"
+            + "".join(f"{outcome:>14}" for outcome in OUTCOMES)
+            + f"{'p50 ms':>9}{'p99 ms':>9}{'wait p50':>10}{'wait p99':>10}{'wait total':>12}"
+            f"{'hold p50':>10}{'hold p99':>10}"
+        )
+        for seat_limit, row in summary.items():
+            self.stdout.write(
+                f"  {seat_limit:>6}{row['attempts']:>9}"
+                + "".join(f"{row[outcome]:>14}" for outcome in OUTCOMES)
+                + f"{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                f"{row['lock_wait_p50_ms']:>10.1f}{row['lock_wait_p99_ms']:>10.1f}"
+                f"{row['lock_wait_total_ms']:>12.0f}"
+                f"{row['lock_hold_p50_ms']:>10.1f}{row['lock_hold_p99_ms']:>10.1f}"
+            )
@@ -0,0 +1,93 @@
+# Generated by Django 6.0 on 2026-10-19 15:21
+
+import django.utils.timezone
+import uuid
+from datetime import date
+from django.db import migrations, models
+
+
+CREATE_AUDIT_TABLE = """
+CREATE TABLE licenses_auditlog (
+    id uuid NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    brand_id uuid NOT NULL,
+    license_id uuid NOT NULL,
+    action varchar(32) NOT NULL,
+    before jsonb NOT NULL,
+    after jsonb NOT NULL,
+    request_id varchar(64) NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE licenses_auditlog_default PARTITION OF licenses_auditlog DEFAULT;
+CREATE INDEX licenses_auditlog_license_created_idx
+    ON licenses_auditlog (license_id, created_at DESC);
+"""
+
+DROP_AUDIT_TABLE = "DROP TABLE IF EXISTS licenses_auditlog CASCADE;"
+
+
+def create_initial_partitions(apps, schema_editor):
+    """
+    Pre-create monthly partitions for the current and next two months.
+    Later months are added by the `create_audit_partitions` command.
+    """
+    first = date.today().replace(day=1)
+    for offset in range(3):
+        year, month = divmod(first.month - 1 + offset, 12)
+        start = date(first.year + year, month + 1, 1)
+        year, month = divmod(start.month, 12)
+        end = date(start.year + year, month + 1, 1)
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS licenses_auditlog_y{start:%Y}m{start:%m} "
+            f"PARTITION OF licenses_auditlog "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0002_alter_license_status_idempotencyrecord"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditLog",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("brand_id", models.UUIDField()),
+                ("license_id", models.UUIDField()),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("status_update", "Status Update"),
+                            ("renewal", "Renewal"),
+                            ("activation", "Activation"),
+                            ("deactivation", "Deactivation"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("before", models.JSONField(default=dict)),
+                ("after", models.JSONField(default=dict)),
+                ("request_id", models.CharField(blank=True, default="", max_length=64)),
+            ],
+            options={
+                "db_table": "licenses_auditlog",
+                "ordering": ["-created_at"],
+                "managed": False,
+            },
+        ),
+        migrations.RunSQL(CREATE_AUDIT_TABLE, DROP_AUDIT_TABLE),
+        migrations.RunPython(create_initial_partitions, migrations.RunPython.noop),
+    ]
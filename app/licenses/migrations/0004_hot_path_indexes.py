@@ -0,0 +1,78 @@
+# Generated by Django 6.0 on 2026-10-19 15:35
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so the hot tables stay writable; the
+    # single-column FK indexes they supersede are dropped afterwards.
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0003_auditlog"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="license",
+            index=models.Index(
+                fields=["license_key", "product", "status"],
+                include=("expiration_date", "seat_limit"),
+                name="license_key_product_status_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="licensekey",
+            index=models.Index(
+                fields=["brand", "key_string"],
+                include=("id", "customer_email"),
+                name="licensekey_brand_key_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="licensekey",
+            index=models.Index(fields=["customer_email"], name="licensekey_email_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="licensekey",
+            index=models.Index(
+                django.db.models.functions.text.Upper("customer_email"),
+                models.F("created_at"),
+                models.F("id"),
+                name="licensekey_email_upper_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="activation",
+            name="license",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="activations",
+                to="licenses.license",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="license",
+            name="license_key",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="licenses",
+                to="licenses.licensekey",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="licensekey",
+            name="brand",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="license_keys",
+                to="licenses.brand",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 15:37
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="licensekey",
+            index=models.Index(
+                fields=["brand", "created_at"], name="licensekey_brand_created_idx"
+            ),
+        ),
+    ]
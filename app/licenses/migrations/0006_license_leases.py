@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 15:41
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0005_licensekey_brand_created_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activation",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="license",
+            name="lease_ttl",
+            field=models.DurationField(blank=True, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name="activation",
+            index=models.Index(
+                condition=models.Q(("lease_expires_at__isnull", False)),
+                fields=["lease_expires_at"],
+                name="activation_lease_expiry_idx",
+            ),
+        ),
+    ]
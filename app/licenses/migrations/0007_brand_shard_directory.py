@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+def register_existing_brands(apps, schema_editor):
+    # Before sharding every brand lives on the default database.
+    Brand = apps.get_model("licenses", "Brand")
+    BrandShard = apps.get_model("licenses", "BrandShard")
+    db_alias = schema_editor.connection.alias
+    BrandShard.objects.using(db_alias).bulk_create(
+        BrandShard(
+            brand_id=brand.id, slug=brand.slug, api_key=brand.api_key, shard="default"
+        )
+        for brand in Brand.objects.using(db_alias).all()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0006_license_leases"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BrandShard",
+            fields=[
+                ("brand_id", models.UUIDField(primary_key=True, serialize=False)),
+                ("slug", models.SlugField(unique=True)),
+                ("api_key", models.CharField(max_length=255, unique=True)),
+                ("shard", models.CharField(max_length=64)),
+                ("read_only", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(
+            register_existing_brands,
+            migrations.RunPython.noop,
+            hints={"model_name": "brandshard"},
+        ),
+    ]
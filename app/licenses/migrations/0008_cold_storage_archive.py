@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 15:51
+
+import django.utils.timezone
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0007_brand_shard_directory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedLicenseKey",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("brand_id", models.UUIDField()),
+                ("key_string", models.CharField(max_length=255, unique=True)),
+                ("customer_email", models.EmailField(max_length=254)),
+                ("created_at", models.DateTimeField()),
+                (
+                    "archived_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("document", models.JSONField()),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name="idempotencyrecord",
+            index=models.Index(fields=["created_at"], name="idempotency_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="archivedlicensekey",
+            index=models.Index(
+                fields=["brand_id", "key_string"], name="archivedkey_brand_key_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,302 @@
+# Generated by Django 6.0 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+def _iso(column):
+    # Frozen copy of licenses.payloads._iso_datetime_sql.
+    utc = f"({column} AT TIME ZONE 'UTC')"
+    return (
+        f"CASE WHEN {column} IS NULL THEN NULL ELSE "
+        f"to_char({utc}, 'YYYY-MM-DD\"T\"HH24:MI:SS') "
+        f"|| CASE WHEN to_char({utc}, 'US') = '000000' THEN '' "
+        f"ELSE '.' || to_char({utc}, 'US') END || 'Z' END"
+    )
+
+
+# Summary rows for the given keys, rendered like GlobalLicenseKeySerializer.
+SUMMARY_ROWS_FUNCTION = f"""
+CREATE FUNCTION licenses_customer_summary_rows(key_ids uuid[])
+RETURNS TABLE (
+    license_key_id uuid, email_key text, created_at timestamptz, document text
+)
+LANGUAGE sql STABLE AS $$
+SELECT
+    k.id,
+    UPPER(k.customer_email::text),
+    k.created_at,
+    json_build_object(
+        'brand_name', b.name,
+        'key', k.key_string,
+        'customer_email', k.customer_email,
+        'created_at', {_iso("k.created_at")},
+        'entitlements', COALESCE((
+            SELECT json_agg(
+                json_build_object(
+                    'id', l.id,
+                    'product_id', p.id,
+                    'product_name', p.name,
+                    'product_slug', p.slug,
+                    'status', l.status,
+                    'expiration_date', {_iso("l.expiration_date")},
+                    'seat_limit', l.seat_limit,
+                    'seats_used', a.seats_used,
+                    'seats_remaining',
+                        GREATEST(0, COALESCE(l.seat_limit, 0) - a.seats_used)
+                )
+                ORDER BY l.created_at, l.id
+            )
+            FROM licenses_license l
+            JOIN licenses_product p ON p.id = l.product_id
+            CROSS JOIN LATERAL (
+                SELECT count(*) AS seats_used
+                FROM licenses_activation
+                WHERE license_id = l.id
+                    AND (lease_expires_at IS NULL OR lease_expires_at > now())
+            ) a
+            WHERE l.license_key_id = k.id
+        ), '[]'::json)
+    )::text
+FROM licenses_licensekey k
+JOIN licenses_brand b ON b.id = k.brand_id
+WHERE k.id = ANY(key_ids)
+$$;
+"""
+
+REFRESH_FUNCTION = """
+CREATE FUNCTION licenses_refresh_customer_summaries(key_ids uuid[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF cardinality(key_ids) = 0 THEN
+        RETURN;
+    END IF;
+    -- Concurrent writers to one key queue here. Each statement below takes
+    -- a new snapshot, so the summary is rendered from the other writer's
+    -- committed rows rather than overwritten with an older picture.
+    PERFORM 1 FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+    ORDER BY s.license_key_id
+    FOR UPDATE;
+    DELETE FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+        AND NOT EXISTS (
+            SELECT 1 FROM licenses_licensekey k WHERE k.id = s.license_key_id
+        );
+    INSERT INTO licenses_customerlicensesummary AS s
+        (license_key_id, email_key, created_at, document, updated_at)
+    SELECT r.license_key_id, r.email_key, r.created_at, r.document, now()
+    FROM licenses_customer_summary_rows(key_ids) r
+    ON CONFLICT (license_key_id) DO UPDATE SET
+        email_key = EXCLUDED.email_key,
+        created_at = EXCLUDED.created_at,
+        document = EXCLUDED.document,
+        updated_at = EXCLUDED.updated_at
+    WHERE (s.email_key, s.created_at, s.document)
+        IS DISTINCT FROM (EXCLUDED.email_key, EXCLUDED.created_at, EXCLUDED.document);
+END;
+$$;
+"""
+
+# Statement-level triggers: one refresh per statement, however many rows
+# it touched. Transition tables need one trigger per event. Updates only
+# refresh keys whose document can have changed, so lease renewals (which
+# keep a live lease live) and no-op saves cost no summary write or lock.
+TRIGGER_FUNCTIONS = """
+CREATE FUNCTION licenses_licensekey_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(SELECT id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(SELECT id FROM old_rows));
+    ELSE
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE (n.brand_id, n.key_string, n.customer_email, n.created_at)
+                IS DISTINCT FROM (o.brand_id, o.key_string, o.customer_email, o.created_at)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE FUNCTION licenses_license_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM old_rows)
+        );
+    ELSE
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT changed.key_id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (n.license_key_id), (o.license_key_id)
+            ) AS changed (key_id)
+            WHERE (n.license_key_id, n.product_id, n.status, n.expiration_date,
+                   n.seat_limit, n.created_at)
+                IS DISTINCT FROM (o.license_key_id, o.product_id, o.status,
+                   o.expiration_date, o.seat_limit, o.created_at)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE FUNCTION licenses_activation_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (SELECT license_id FROM new_rows)
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (SELECT license_id FROM old_rows)
+        ));
+    ELSE
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (
+                SELECT changed.license_id
+                FROM new_rows n
+                JOIN old_rows o ON o.id = n.id
+                CROSS JOIN LATERAL (
+                    VALUES (n.license_id), (o.license_id)
+                ) AS changed (license_id)
+                WHERE n.license_id IS DISTINCT FROM o.license_id
+                    OR (n.lease_expires_at IS NULL OR n.lease_expires_at > now())
+                    IS DISTINCT FROM
+                    (o.lease_expires_at IS NULL OR o.lease_expires_at > now())
+            )
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE FUNCTION licenses_product_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM licenses_refresh_customer_summaries(ARRAY(
+        SELECT DISTINCT l.license_key_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN licenses_license l ON l.product_id = n.id
+        WHERE (n.name, n.slug) IS DISTINCT FROM (o.name, o.slug)
+    ));
+    RETURN NULL;
+END;
+$$;
+
+CREATE FUNCTION licenses_brand_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM licenses_refresh_customer_summaries(ARRAY(
+        SELECT k.id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN licenses_licensekey k ON k.brand_id = n.id
+        WHERE n.name IS DISTINCT FROM o.name
+    ));
+    RETURN NULL;
+END;
+$$;
+"""
+
+TRIGGERED_EVENTS = {
+    "licensekey": ("INSERT", "UPDATE", "DELETE"),
+    "license": ("INSERT", "UPDATE", "DELETE"),
+    "activation": ("INSERT", "UPDATE", "DELETE"),
+    "product": ("UPDATE",),
+    "brand": ("UPDATE",),
+}
+
+TRANSITION_TABLES = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+CREATE_TRIGGERS = "\n".join(
+    f"CREATE TRIGGER {table}_summary_{event.lower()} "
+    f"AFTER {event} ON licenses_{table} "
+    f"REFERENCING {TRANSITION_TABLES[event]} "
+    f"FOR EACH STATEMENT EXECUTE FUNCTION licenses_{table}_summary_trigger();"
+    for table, events in TRIGGERED_EVENTS.items()
+    for event in events
+)
+
+DROP_FUNCTIONS = "\n".join(
+    [
+        *(
+            f"DROP FUNCTION IF EXISTS licenses_{table}_summary_trigger() CASCADE;"
+            for table in TRIGGERED_EVENTS
+        ),
+        "DROP FUNCTION IF EXISTS licenses_refresh_customer_summaries(uuid[]);",
+        "DROP FUNCTION IF EXISTS licenses_customer_summary_rows(uuid[]);",
+    ]
+)
+
+
+def backfill_summaries(apps, schema_editor):
+    """
+    Summaries for existing keys, in id order, a bounded batch per statement.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        last = None
+        while True:
+            cursor.execute(
+                "SELECT id FROM licenses_licensekey "
+                "WHERE %s::uuid IS NULL OR id > %s::uuid ORDER BY id LIMIT 5000",
+                [last, last],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return
+            cursor.execute("SELECT licenses_refresh_customer_summaries(%s)", [ids])
+            last = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0008_cold_storage_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerLicenseSummary",
+            fields=[
+                ("license_key_id", models.UUIDField(primary_key=True, serialize=False)),
+                ("email_key", models.CharField(max_length=254)),
+                ("created_at", models.DateTimeField()),
+                ("document", models.TextField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["email_key", "created_at", "license_key_id"],
+                        name="customer_summary_lookup_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            SUMMARY_ROWS_FUNCTION
+            + REFRESH_FUNCTION
+            + TRIGGER_FUNCTIONS
+            + CREATE_TRIGGERS,
+            DROP_FUNCTIONS,
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-19 15:58
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0009_customer_license_summary"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="licensekey",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("customer_email"),
+                    name="text_pattern_ops",
+                ),
+                name="licensekey_email_prefix_idx",
+            ),
+        ),
+    ]
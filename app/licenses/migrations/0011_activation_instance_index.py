@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 16:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0010_admin_search_index"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="activation",
+            index=models.Index(
+                fields=["instance_identifier"], name="activation_instance_idx"
+            ),
+        ),
+    ]
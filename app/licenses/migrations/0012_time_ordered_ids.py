@@ -0,0 +1,79 @@
+# Generated by Django 6.0 on 2026-10-19 16:08
+
+import core.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0011_activation_instance_index"),
+    ]
+
+    # The default is applied by the application, so this changes no SQL.
+    # Existing uuid4 ids stay as they are: they are referenced by foreign
+    # keys, archives and clients. New rows append at the right edge of
+    # the index; REINDEX CONCURRENTLY (archive_cold_data --reindex)
+    # compacts the part the old random inserts left half empty.
+    operations = [
+        migrations.AlterField(
+            model_name="activation",
+            name="id",
+            field=models.UUIDField(
+                default=core.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="brand",
+            name="id",
+            field=models.UUIDField(
+                default=core.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="idempotencyrecord",
+            name="id",
+            field=models.UUIDField(
+                default=core.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="license",
+            name="id",
+            field=models.UUIDField(
+                default=core.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="licensekey",
+            name="id",
+            field=models.UUIDField(
+                default=core.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="id",
+            field=models.UUIDField(
+                default=core.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
@@ -0,0 +1,149 @@
+# Generated by Django 6.0 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+# SQL twins of licenses.compact.encode_key, decode_key and instance_hash.
+# STABLE rather than IMMUTABLE only because convert_to/convert_from are.
+COMPACT_FUNCTIONS = r"""
+CREATE FUNCTION licenses_key_bytes(key_string text)
+RETURNS bytea LANGUAGE sql STABLE PARALLEL SAFE AS $$
+SELECT CASE
+    WHEN key_string ~ '^G1-[0-9A-F]{24}$'
+        THEN '\x01'::bytea || decode(substring(key_string FROM 4), 'hex')
+    ELSE '\x00'::bytea || convert_to(key_string, 'UTF8')
+END
+$$;
+
+CREATE FUNCTION licenses_key_text(key_bytes bytea)
+RETURNS text LANGUAGE sql STABLE PARALLEL SAFE AS $$
+SELECT CASE
+    WHEN get_byte(key_bytes, 0) = 1
+        THEN 'G1-' || upper(encode(substring(key_bytes FROM 2), 'hex'))
+    ELSE convert_from(substring(key_bytes FROM 2), 'UTF8')
+END
+$$;
+
+CREATE FUNCTION licenses_instance_hash(instance_identifier text)
+RETURNS bigint LANGUAGE sql STABLE PARALLEL SAFE AS $$
+SELECT ('x' || encode(
+    substring(sha256(convert_to(instance_identifier, 'UTF8')) FROM 1 FOR 8), 'hex'
+))::bit(64)::bigint
+$$;
+
+CREATE FUNCTION licenses_licensekey_compact_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.key_bytes := licenses_key_bytes(NEW.key_string);
+    RETURN NEW;
+END;
+$$;
+
+CREATE FUNCTION licenses_activation_compact_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.instance_hash := licenses_instance_hash(NEW.instance_identifier);
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER licensekey_compact BEFORE INSERT OR UPDATE ON licenses_licensekey
+FOR EACH ROW EXECUTE FUNCTION licenses_licensekey_compact_trigger();
+
+CREATE TRIGGER activation_compact BEFORE INSERT OR UPDATE ON licenses_activation
+FOR EACH ROW EXECUTE FUNCTION licenses_activation_compact_trigger();
+"""
+
+DROP_COMPACT_FUNCTIONS = """
+DROP FUNCTION IF EXISTS licenses_licensekey_compact_trigger() CASCADE;
+DROP FUNCTION IF EXISTS licenses_activation_compact_trigger() CASCADE;
+DROP FUNCTION IF EXISTS licenses_instance_hash(text);
+DROP FUNCTION IF EXISTS licenses_key_text(bytea);
+DROP FUNCTION IF EXISTS licenses_key_bytes(text);
+"""
+
+
+def set_not_null(table, column):
+    # Validating a NOT VALID check only takes a SHARE UPDATE EXCLUSIVE lock,
+    # and SET NOT NULL then trusts it instead of scanning under an
+    # ACCESS EXCLUSIVE lock.
+    check = f"{table}_{column}_not_null"
+    return migrations.RunSQL(
+        f"ALTER TABLE {table} ADD CONSTRAINT {check} "
+        f"CHECK ({column} IS NOT NULL) NOT VALID;"
+        f"ALTER TABLE {table} VALIDATE CONSTRAINT {check};"
+        f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL;"
+        f"ALTER TABLE {table} DROP CONSTRAINT {check};",
+        f"ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL;",
+    )
+
+
+def backfill(table, column):
+    def run(apps, schema_editor):
+        """
+        Fills `column` for existing rows in id order, a bounded batch per
+        statement; the compact trigger computes the value on update.
+        """
+        with schema_editor.connection.cursor() as cursor:
+            last = None
+            while True:
+                cursor.execute(
+                    f"SELECT id FROM {table} "
+                    "WHERE %s::uuid IS NULL OR id > %s::uuid ORDER BY id LIMIT 5000",
+                    [last, last],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    return
+                cursor.execute(
+                    f"UPDATE {table} SET {column} = NULL "
+                    f"WHERE id = ANY(%s::uuid[]) AND {column} IS NULL",
+                    [ids],
+                )
+                last = ids[-1]
+
+    return migrations.RunPython(run, migrations.RunPython.noop)
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0012_time_ordered_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="licensekey",
+            name="key_bytes",
+            field=models.BinaryField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="activation",
+            name="instance_hash",
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunSQL(COMPACT_FUNCTIONS, DROP_COMPACT_FUNCTIONS),
+        backfill("licenses_licensekey", "key_bytes"),
+        backfill("licenses_activation", "instance_hash"),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[set_not_null("licenses_licensekey", "key_bytes")],
+            state_operations=[
+                migrations.AlterField(
+                    model_name="licensekey",
+                    name="key_bytes",
+                    field=models.BinaryField(editable=False),
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[set_not_null("licenses_activation", "instance_hash")],
+            state_operations=[
+                migrations.AlterField(
+                    model_name="activation",
+                    name="instance_hash",
+                    field=models.BigIntegerField(editable=False),
+                ),
+            ],
+        ),
+    ]
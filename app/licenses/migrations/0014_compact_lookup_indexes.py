@@ -0,0 +1,87 @@
+# Generated by Django 6.0 on 2026-10-19 16:45
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+def add_unique_concurrently(table, name, columns, model_name, fields):
+    # Builds the index without blocking writes, then attaches it as the
+    # constraint, which only needs a brief lock.
+    return migrations.SeparateDatabaseAndState(
+        database_operations=[
+            migrations.RunSQL(
+                f"CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})",
+                f"DROP INDEX CONCURRENTLY IF EXISTS {name}",
+            ),
+            migrations.RunSQL(
+                f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}",
+                f"ALTER TABLE {table} DROP CONSTRAINT {name}",
+            ),
+        ],
+        state_operations=[
+            migrations.AddConstraint(
+                model_name=model_name,
+                constraint=models.UniqueConstraint(fields=fields, name=name),
+            ),
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("licenses", "0013_compact_lookup_columns"),
+    ]
+
+    operations = [
+        add_unique_concurrently(
+            "licenses_licensekey",
+            "licensekey_key_bytes_key",
+            "key_bytes",
+            "licensekey",
+            ("key_bytes",),
+        ),
+        AddIndexConcurrently(
+            model_name="licensekey",
+            index=models.Index(
+                fields=["brand", "key_bytes"],
+                include=("id", "customer_email"),
+                name="licensekey_brand_bytes_idx",
+            ),
+        ),
+        add_unique_concurrently(
+            "licenses_activation",
+            "activation_license_instance_key",
+            "license_id, instance_hash",
+            "activation",
+            ("license", "instance_hash"),
+        ),
+        AddIndexConcurrently(
+            model_name="activation",
+            index=models.Index(
+                fields=["instance_hash"], name="activation_instance_hash_idx"
+            ),
+        ),
+        # The text columns stay as display copies, unindexed.
+        RemoveIndexConcurrently(
+            model_name="licensekey",
+            name="licensekey_brand_key_idx",
+        ),
+        RemoveIndexConcurrently(
+            model_name="activation",
+            name="activation_instance_idx",
+        ),
+        migrations.AlterField(
+            model_name="licensekey",
+            name="key_string",
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterUniqueTogether(
+            name="activation",
+            unique_together=set(),
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 6.0 on 2026-10-19 16:34
+
+import core.ids
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# Current levels per brand and product.
+CURRENT_LEVELS_SQL = """
+SELECT k.brand_id, l.product_id,
+    coalesce(sum(a.seats), 0),
+    count(*) FILTER (WHERE l.status = 'valid'),
+    count(*) FILTER (WHERE l.status = 'suspended'),
+    count(*) FILTER (WHERE l.status = 'cancelled')
+FROM licenses_license l
+JOIN licenses_licensekey k ON k.id = l.license_key_id
+CROSS JOIN LATERAL (
+    SELECT count(*) AS seats FROM licenses_activation WHERE license_id = l.id
+) a
+GROUP BY k.brand_id, l.product_id
+"""
+
+
+def seed_rollups(apps, schema_editor):
+    """
+    Opens each product's rollups with today's levels. Earlier activations
+    and deactivations are not reconstructed.
+    """
+    now = timezone.now()
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CURRENT_LEVELS_SQL)
+        rows = [
+            (core.ids.uuid7(), now, now, now.date(), *levels)
+            for levels in cursor.fetchall()
+        ]
+        cursor.executemany(
+            "INSERT INTO licenses_usagerollup (id, created_at, updated_at, day, "
+            "brand_id, product_id, seats_used, licenses_valid, licenses_suspended, "
+            "licenses_cancelled, activations, deactivations) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 0, 0)",
+            rows,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0015_job_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UsageDelta",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=core.ids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("day", models.DateField()),
+                ("activations", models.IntegerField(default=0)),
+                ("deactivations", models.IntegerField(default=0)),
+                ("seats_used", models.IntegerField(default=0)),
+                ("licenses_valid", models.IntegerField(default=0)),
+                ("licenses_suspended", models.IntegerField(default=0)),
+                ("licenses_cancelled", models.IntegerField(default=0)),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="licenses.brand"
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="licenses.product",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="UsageRollup",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=core.ids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("day", models.DateField()),
+                ("activations", models.IntegerField(default=0)),
+                ("deactivations", models.IntegerField(default=0)),
+                ("seats_used", models.IntegerField(default=0)),
+                ("licenses_valid", models.IntegerField(default=0)),
+                ("licenses_suspended", models.IntegerField(default=0)),
+                ("licenses_cancelled", models.IntegerField(default=0)),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="licenses.brand",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="licenses.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("brand", "product", "day"),
+                        name="usagerollup_brand_product_day_key",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 16:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0016_usage_rollups"),
+    ]
+
+    operations = [
+        # Numbers cache invalidations (licenses/invalidation.py), on every
+        # database, so listeners can tell whether they missed any.
+        migrations.RunSQL(
+            "CREATE SEQUENCE IF NOT EXISTS licenses_invalidation_seq",
+            "DROP SEQUENCE IF EXISTS licenses_invalidation_seq",
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 6.0 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+CHANGE_XID = "pg_current_xact_id()::text::bigint"
+CHANGE_SEQ = "nextval('licenses_change_seq')"
+
+# Migration 0009's refresh, which also moves every key whose summary it
+# writes or deletes to the end of its brand's change feed.
+REFRESH_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION licenses_refresh_customer_summaries(key_ids uuid[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF cardinality(key_ids) = 0 THEN
+        RETURN;
+    END IF;
+    -- Concurrent writers to one key queue here. Each statement below takes
+    -- a new snapshot, so the summary is rendered from the other writer's
+    -- committed rows rather than overwritten with an older picture.
+    PERFORM 1 FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+    ORDER BY s.license_key_id
+    FOR UPDATE;
+    WITH removed AS (
+        DELETE FROM licenses_customerlicensesummary s
+        WHERE s.license_key_id = ANY(key_ids)
+            AND NOT EXISTS (
+                SELECT 1 FROM licenses_licensekey k WHERE k.id = s.license_key_id
+            )
+        RETURNING s.license_key_id
+    )
+    UPDATE licenses_licensekeychange c
+    SET deleted = true, change_xid = {CHANGE_XID}, change_seq = {CHANGE_SEQ}
+    FROM removed
+    WHERE c.license_key_id = removed.license_key_id;
+    WITH written AS (
+        INSERT INTO licenses_customerlicensesummary AS s
+            (license_key_id, email_key, created_at, document, updated_at)
+        SELECT r.license_key_id, r.email_key, r.created_at, r.document, now()
+        FROM licenses_customer_summary_rows(key_ids) r
+        ON CONFLICT (license_key_id) DO UPDATE SET
+            email_key = EXCLUDED.email_key,
+            created_at = EXCLUDED.created_at,
+            document = EXCLUDED.document,
+            updated_at = EXCLUDED.updated_at
+        WHERE (s.email_key, s.created_at, s.document)
+            IS DISTINCT FROM (EXCLUDED.email_key, EXCLUDED.created_at, EXCLUDED.document)
+        RETURNING s.license_key_id
+    )
+    INSERT INTO licenses_licensekeychange AS c
+        (license_key_id, brand_id, key_string, deleted, change_xid, change_seq)
+    SELECT k.id, k.brand_id, k.key_string, false, {CHANGE_XID}, {CHANGE_SEQ}
+    FROM written
+    JOIN licenses_licensekey k ON k.id = written.license_key_id
+    ORDER BY k.id
+    ON CONFLICT (license_key_id) DO UPDATE SET
+        brand_id = EXCLUDED.brand_id,
+        key_string = EXCLUDED.key_string,
+        deleted = false,
+        change_xid = EXCLUDED.change_xid,
+        change_seq = EXCLUDED.change_seq;
+END;
+$$;
+"""
+
+# Frozen copy of migration 0009's refresh.
+PREVIOUS_REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION licenses_refresh_customer_summaries(key_ids uuid[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF cardinality(key_ids) = 0 THEN
+        RETURN;
+    END IF;
+    PERFORM 1 FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+    ORDER BY s.license_key_id
+    FOR UPDATE;
+    DELETE FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+        AND NOT EXISTS (
+            SELECT 1 FROM licenses_licensekey k WHERE k.id = s.license_key_id
+        );
+    INSERT INTO licenses_customerlicensesummary AS s
+        (license_key_id, email_key, created_at, document, updated_at)
+    SELECT r.license_key_id, r.email_key, r.created_at, r.document, now()
+    FROM licenses_customer_summary_rows(key_ids) r
+    ON CONFLICT (license_key_id) DO UPDATE SET
+        email_key = EXCLUDED.email_key,
+        created_at = EXCLUDED.created_at,
+        document = EXCLUDED.document,
+        updated_at = EXCLUDED.updated_at
+    WHERE (s.email_key, s.created_at, s.document)
+        IS DISTINCT FROM (EXCLUDED.email_key, EXCLUDED.created_at, EXCLUDED.document);
+END;
+$$;
+"""
+
+# Every existing key enters the feed once.
+BACKFILL_SQL = f"""
+INSERT INTO licenses_licensekeychange
+    (license_key_id, brand_id, key_string, deleted, change_xid, change_seq)
+SELECT k.id, k.brand_id, k.key_string, false, {CHANGE_XID}, {CHANGE_SEQ}
+FROM licenses_licensekey k
+ORDER BY k.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0017_invalidation_sequence"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE SEQUENCE IF NOT EXISTS licenses_change_seq",
+            "DROP SEQUENCE IF EXISTS licenses_change_seq",
+        ),
+        migrations.CreateModel(
+            name="LicenseKeyChange",
+            fields=[
+                ("license_key_id", models.UUIDField(primary_key=True, serialize=False)),
+                ("brand_id", models.UUIDField()),
+                ("key_string", models.CharField(max_length=255)),
+                ("deleted", models.BooleanField(default=False)),
+                ("change_xid", models.BigIntegerField()),
+                ("change_seq", models.BigIntegerField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["brand_id", "change_xid", "change_seq"],
+                        name="keychange_brand_position_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(REFRESH_FUNCTION, PREVIOUS_REFRESH_FUNCTION),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
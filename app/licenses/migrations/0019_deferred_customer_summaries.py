@@ -0,0 +1,166 @@
+# Generated by Django 6.0 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+# Activation changes, and updates of existing licenses (status changes,
+# renewals), queue the key for licenses_refresh_customer_summaries instead
+# of re-rendering its document inside the writing transaction: the
+# refresh_customer_summaries command drains the queue. Keys, new and
+# deleted licenses, and brand and product renames still refresh in place.
+TRIGGER_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION licenses_license_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM old_rows)
+        );
+    ELSE
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT changed.key_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        CROSS JOIN LATERAL (
+            VALUES (n.license_key_id), (o.license_key_id)
+        ) AS changed (key_id)
+        WHERE (n.license_key_id, n.product_id, n.status, n.expiration_date,
+               n.seat_limit, n.created_at)
+            IS DISTINCT FROM (o.license_key_id, o.product_id, o.status,
+               o.expiration_date, o.seat_limit, o.created_at);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_activation_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT l.license_key_id FROM licenses_license l
+        WHERE l.id IN (SELECT license_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT l.license_key_id FROM licenses_license l
+        WHERE l.id IN (SELECT license_id FROM old_rows);
+    ELSE
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT l.license_key_id FROM licenses_license l
+        WHERE l.id IN (
+            SELECT changed.license_id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (n.license_id), (o.license_id)
+            ) AS changed (license_id)
+            WHERE n.license_id IS DISTINCT FROM o.license_id
+                OR (n.lease_expires_at IS NULL OR n.lease_expires_at > now())
+                IS DISTINCT FROM
+                (o.lease_expires_at IS NULL OR o.lease_expires_at > now())
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+"""
+
+# Frozen copies of migration 0009's trigger functions.
+PREVIOUS_TRIGGER_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION licenses_license_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM old_rows)
+        );
+    ELSE
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT changed.key_id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (n.license_key_id), (o.license_key_id)
+            ) AS changed (key_id)
+            WHERE (n.license_key_id, n.product_id, n.status, n.expiration_date,
+                   n.seat_limit, n.created_at)
+                IS DISTINCT FROM (o.license_key_id, o.product_id, o.status,
+                   o.expiration_date, o.seat_limit, o.created_at)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_activation_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (SELECT license_id FROM new_rows)
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (SELECT license_id FROM old_rows)
+        ));
+    ELSE
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (
+                SELECT changed.license_id
+                FROM new_rows n
+                JOIN old_rows o ON o.id = n.id
+                CROSS JOIN LATERAL (
+                    VALUES (n.license_id), (o.license_id)
+                ) AS changed (license_id)
+                WHERE n.license_id IS DISTINCT FROM o.license_id
+                    OR (n.lease_expires_at IS NULL OR n.lease_expires_at > now())
+                    IS DISTINCT FROM
+                    (o.lease_expires_at IS NULL OR o.lease_expires_at > now())
+            )
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0018_license_key_changes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerSummaryRefresh",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("license_key_id", models.UUIDField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="customerlicensesummary",
+            name="refresh_after",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="customerlicensesummary",
+            index=models.Index(
+                condition=models.Q(("refresh_after__isnull", False)),
+                fields=["refresh_after"],
+                name="customer_summary_refresh_idx",
+            ),
+        ),
+        migrations.RunSQL(TRIGGER_FUNCTIONS, PREVIOUS_TRIGGER_FUNCTIONS),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 18:45
+
+from django.db import migrations
+
+# Migration 0013's compact triggers, fired only by writes that set the
+# source column, so lease renewals and status saves skip the hashing.
+COLUMN_TRIGGERS = """
+DROP TRIGGER licensekey_compact ON licenses_licensekey;
+CREATE TRIGGER licensekey_compact
+BEFORE INSERT OR UPDATE OF key_string ON licenses_licensekey
+FOR EACH ROW EXECUTE FUNCTION licenses_licensekey_compact_trigger();
+
+DROP TRIGGER activation_compact ON licenses_activation;
+CREATE TRIGGER activation_compact
+BEFORE INSERT OR UPDATE OF instance_identifier ON licenses_activation
+FOR EACH ROW EXECUTE FUNCTION licenses_activation_compact_trigger();
+"""
+
+ROW_TRIGGERS = """
+DROP TRIGGER licensekey_compact ON licenses_licensekey;
+CREATE TRIGGER licensekey_compact BEFORE INSERT OR UPDATE ON licenses_licensekey
+FOR EACH ROW EXECUTE FUNCTION licenses_licensekey_compact_trigger();
+
+DROP TRIGGER activation_compact ON licenses_activation;
+CREATE TRIGGER activation_compact BEFORE INSERT OR UPDATE ON licenses_activation
+FOR EACH ROW EXECUTE FUNCTION licenses_activation_compact_trigger();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0019_deferred_customer_summaries"),
+    ]
+
+    operations = [
+        migrations.RunSQL(COLUMN_TRIGGERS, ROW_TRIGGERS),
+    ]
@@ -0,0 +1,393 @@
+# Generated by Django 6.0 on 2026-10-19 19:30
+
+from django.db import migrations
+
+CHANGE_XID = "pg_current_xact_id()::text::bigint"
+CHANGE_SEQ = "nextval('licenses_change_seq')"
+
+# Moves the given keys to the end of their brand's change feed, as
+# tombstones if they no longer exist. Called by the summary triggers in
+# the writing transaction, whether the summary is refreshed in place or
+# queued.
+RECORD_FUNCTION = f"""
+CREATE FUNCTION licenses_record_key_changes(key_ids uuid[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF cardinality(key_ids) = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO licenses_licensekeychange AS c
+        (license_key_id, brand_id, key_string, deleted, change_xid, change_seq)
+    SELECT k.id, k.brand_id, k.key_string, false, {CHANGE_XID}, {CHANGE_SEQ}
+    FROM licenses_licensekey k
+    WHERE k.id = ANY(key_ids)
+    ORDER BY k.id
+    ON CONFLICT (license_key_id) DO UPDATE SET
+        brand_id = EXCLUDED.brand_id,
+        key_string = EXCLUDED.key_string,
+        deleted = false,
+        change_xid = EXCLUDED.change_xid,
+        change_seq = EXCLUDED.change_seq;
+    UPDATE licenses_licensekeychange c
+    SET deleted = true, change_xid = {CHANGE_XID}, change_seq = {CHANGE_SEQ}
+    WHERE c.license_key_id = ANY(key_ids)
+        AND NOT EXISTS (
+            SELECT 1 FROM licenses_licensekey k WHERE k.id = c.license_key_id
+        );
+END;
+$$;
+"""
+
+# Migration 0009's refresh again: the triggers record feed changes now.
+REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION licenses_refresh_customer_summaries(key_ids uuid[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF cardinality(key_ids) = 0 THEN
+        RETURN;
+    END IF;
+    -- Concurrent writers to one key queue here. Each statement below takes
+    -- a new snapshot, so the summary is rendered from the other writer's
+    -- committed rows rather than overwritten with an older picture.
+    PERFORM 1 FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+    ORDER BY s.license_key_id
+    FOR UPDATE;
+    DELETE FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+        AND NOT EXISTS (
+            SELECT 1 FROM licenses_licensekey k WHERE k.id = s.license_key_id
+        );
+    INSERT INTO licenses_customerlicensesummary AS s
+        (license_key_id, email_key, created_at, document, updated_at)
+    SELECT r.license_key_id, r.email_key, r.created_at, r.document, now()
+    FROM licenses_customer_summary_rows(key_ids) r
+    ON CONFLICT (license_key_id) DO UPDATE SET
+        email_key = EXCLUDED.email_key,
+        created_at = EXCLUDED.created_at,
+        document = EXCLUDED.document,
+        updated_at = EXCLUDED.updated_at
+    WHERE (s.email_key, s.created_at, s.document)
+        IS DISTINCT FROM (EXCLUDED.email_key, EXCLUDED.created_at, EXCLUDED.document);
+END;
+$$;
+"""
+
+# The triggers of migrations 0009 and 0019, each also recording the keys
+# it refreshes or queues in the change feed.
+TRIGGER_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION licenses_licensekey_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    key_ids uuid[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        key_ids := ARRAY(SELECT id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        key_ids := ARRAY(SELECT id FROM old_rows);
+    ELSE
+        key_ids := ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE (n.brand_id, n.key_string, n.customer_email, n.created_at)
+                IS DISTINCT FROM (o.brand_id, o.key_string, o.customer_email, o.created_at)
+        );
+    END IF;
+    PERFORM licenses_record_key_changes(key_ids);
+    PERFORM licenses_refresh_customer_summaries(key_ids);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_license_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    key_ids uuid[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        key_ids := ARRAY(SELECT DISTINCT license_key_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        key_ids := ARRAY(SELECT DISTINCT license_key_id FROM old_rows);
+    ELSE
+        key_ids := ARRAY(
+            SELECT DISTINCT changed.key_id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (n.license_key_id), (o.license_key_id)
+            ) AS changed (key_id)
+            WHERE (n.license_key_id, n.product_id, n.status, n.expiration_date,
+                   n.seat_limit, n.created_at)
+                IS DISTINCT FROM (o.license_key_id, o.product_id, o.status,
+                   o.expiration_date, o.seat_limit, o.created_at)
+        );
+    END IF;
+    PERFORM licenses_record_key_changes(key_ids);
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT unnest(key_ids);
+    ELSE
+        PERFORM licenses_refresh_customer_summaries(key_ids);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_activation_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    key_ids uuid[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        key_ids := ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (SELECT license_id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        key_ids := ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (SELECT license_id FROM old_rows)
+        );
+    ELSE
+        key_ids := ARRAY(
+            SELECT DISTINCT l.license_key_id FROM licenses_license l
+            WHERE l.id IN (
+                SELECT changed.license_id
+                FROM new_rows n
+                JOIN old_rows o ON o.id = n.id
+                CROSS JOIN LATERAL (
+                    VALUES (n.license_id), (o.license_id)
+                ) AS changed (license_id)
+                WHERE n.license_id IS DISTINCT FROM o.license_id
+                    OR (n.lease_expires_at IS NULL OR n.lease_expires_at > now())
+                    IS DISTINCT FROM
+                    (o.lease_expires_at IS NULL OR o.lease_expires_at > now())
+            )
+        );
+    END IF;
+    PERFORM licenses_record_key_changes(key_ids);
+    INSERT INTO licenses_customersummaryrefresh (license_key_id)
+    SELECT unnest(key_ids);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_product_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    key_ids uuid[];
+BEGIN
+    key_ids := ARRAY(
+        SELECT DISTINCT l.license_key_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN licenses_license l ON l.product_id = n.id
+        WHERE (n.name, n.slug) IS DISTINCT FROM (o.name, o.slug)
+    );
+    PERFORM licenses_record_key_changes(key_ids);
+    PERFORM licenses_refresh_customer_summaries(key_ids);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_brand_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    key_ids uuid[];
+BEGIN
+    key_ids := ARRAY(
+        SELECT k.id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN licenses_licensekey k ON k.brand_id = n.id
+        WHERE n.name IS DISTINCT FROM o.name
+    );
+    PERFORM licenses_record_key_changes(key_ids);
+    PERFORM licenses_refresh_customer_summaries(key_ids);
+    RETURN NULL;
+END;
+$$;
+"""
+
+# Frozen copy of migration 0018's refresh.
+PREVIOUS_REFRESH_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION licenses_refresh_customer_summaries(key_ids uuid[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF cardinality(key_ids) = 0 THEN
+        RETURN;
+    END IF;
+    -- Concurrent writers to one key queue here. Each statement below takes
+    -- a new snapshot, so the summary is rendered from the other writer's
+    -- committed rows rather than overwritten with an older picture.
+    PERFORM 1 FROM licenses_customerlicensesummary s
+    WHERE s.license_key_id = ANY(key_ids)
+    ORDER BY s.license_key_id
+    FOR UPDATE;
+    WITH removed AS (
+        DELETE FROM licenses_customerlicensesummary s
+        WHERE s.license_key_id = ANY(key_ids)
+            AND NOT EXISTS (
+                SELECT 1 FROM licenses_licensekey k WHERE k.id = s.license_key_id
+            )
+        RETURNING s.license_key_id
+    )
+    UPDATE licenses_licensekeychange c
+    SET deleted = true, change_xid = {CHANGE_XID}, change_seq = {CHANGE_SEQ}
+    FROM removed
+    WHERE c.license_key_id = removed.license_key_id;
+    WITH written AS (
+        INSERT INTO licenses_customerlicensesummary AS s
+            (license_key_id, email_key, created_at, document, updated_at)
+        SELECT r.license_key_id, r.email_key, r.created_at, r.document, now()
+        FROM licenses_customer_summary_rows(key_ids) r
+        ON CONFLICT (license_key_id) DO UPDATE SET
+            email_key = EXCLUDED.email_key,
+            created_at = EXCLUDED.created_at,
+            document = EXCLUDED.document,
+            updated_at = EXCLUDED.updated_at
+        WHERE (s.email_key, s.created_at, s.document)
+            IS DISTINCT FROM (EXCLUDED.email_key, EXCLUDED.created_at, EXCLUDED.document)
+        RETURNING s.license_key_id
+    )
+    INSERT INTO licenses_licensekeychange AS c
+        (license_key_id, brand_id, key_string, deleted, change_xid, change_seq)
+    SELECT k.id, k.brand_id, k.key_string, false, {CHANGE_XID}, {CHANGE_SEQ}
+    FROM written
+    JOIN licenses_licensekey k ON k.id = written.license_key_id
+    ORDER BY k.id
+    ON CONFLICT (license_key_id) DO UPDATE SET
+        brand_id = EXCLUDED.brand_id,
+        key_string = EXCLUDED.key_string,
+        deleted = false,
+        change_xid = EXCLUDED.change_xid,
+        change_seq = EXCLUDED.change_seq;
+END;
+$$;
+"""
+
+# Frozen copies of the trigger functions of migrations 0009 (keys,
+# products, brands) and 0019 (licenses, activations).
+PREVIOUS_TRIGGER_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION licenses_licensekey_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(SELECT id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(ARRAY(SELECT id FROM old_rows));
+    ELSE
+        PERFORM licenses_refresh_customer_summaries(ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE (n.brand_id, n.key_string, n.customer_email, n.created_at)
+                IS DISTINCT FROM (o.brand_id, o.key_string, o.customer_email, o.created_at)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_license_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM new_rows)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM licenses_refresh_customer_summaries(
+            ARRAY(SELECT DISTINCT license_key_id FROM old_rows)
+        );
+    ELSE
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT changed.key_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        CROSS JOIN LATERAL (
+            VALUES (n.license_key_id), (o.license_key_id)
+        ) AS changed (key_id)
+        WHERE (n.license_key_id, n.product_id, n.status, n.expiration_date,
+               n.seat_limit, n.created_at)
+            IS DISTINCT FROM (o.license_key_id, o.product_id, o.status,
+               o.expiration_date, o.seat_limit, o.created_at);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_activation_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT l.license_key_id FROM licenses_license l
+        WHERE l.id IN (SELECT license_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT l.license_key_id FROM licenses_license l
+        WHERE l.id IN (SELECT license_id FROM old_rows);
+    ELSE
+        INSERT INTO licenses_customersummaryrefresh (license_key_id)
+        SELECT DISTINCT l.license_key_id FROM licenses_license l
+        WHERE l.id IN (
+            SELECT changed.license_id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (n.license_id), (o.license_id)
+            ) AS changed (license_id)
+            WHERE n.license_id IS DISTINCT FROM o.license_id
+                OR (n.lease_expires_at IS NULL OR n.lease_expires_at > now())
+                IS DISTINCT FROM
+                (o.lease_expires_at IS NULL OR o.lease_expires_at > now())
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_product_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM licenses_refresh_customer_summaries(ARRAY(
+        SELECT DISTINCT l.license_key_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN licenses_license l ON l.product_id = n.id
+        WHERE (n.name, n.slug) IS DISTINCT FROM (o.name, o.slug)
+    ));
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION licenses_brand_summary_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM licenses_refresh_customer_summaries(ARRAY(
+        SELECT k.id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN licenses_licensekey k ON k.brand_id = n.id
+        WHERE n.name IS DISTINCT FROM o.name
+    ));
+    RETURN NULL;
+END;
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("licenses", "0020_compact_trigger_columns"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            RECORD_FUNCTION,
+            "DROP FUNCTION IF EXISTS licenses_record_key_changes(uuid[]);",
+        ),
+        migrations.RunSQL(
+            REFRESH_FUNCTION + TRIGGER_FUNCTIONS,
+            PREVIOUS_REFRESH_FUNCTION + PREVIOUS_TRIGGER_FUNCTIONS,
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.contrib.postgres.indexes import OpClass
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models.functions import Now, Upper
+from django.utils import timezone
 from django.utils.text import slugify
+from core.ids import uuid7
+from licenses.invalidation import BRAND_TOPIC, bus
 import secrets
-import uuid
 
 
 LICENSE_STATUS_CHOICES = (
@@ -10,9 +15,29 @@ LICENSE_STATUS_CHOICES = (
     ("cancelled", "Cancelled"),
 )
 
+AUDIT_ACTION_CHOICES = (
+    ("status_update", "Status Update"),
+    ("renewal", "Renewal"),
+    ("activation", "Activation"),
+    ("deactivation", "Deactivation"),
+)
+
+JOB_KIND_CHOICES = (
+    ("provision_license_bundle", "Provision License Bundle"),
+    ("license_lifecycle", "License Lifecycle"),
+)
+
+JOB_STATUS_CHOICES = (
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("succeeded", "Succeeded"),
+    ("failed", "Failed"),
+)
+
 
 class BaseModel(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Time-ordered, so inserts append to the primary key index.
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -42,6 +67,22 @@ class Brand(BaseModel):
         if not self.api_key:
             self.api_key = f"sk_live_{secrets.token_urlsafe(32)}"
         super().save(*args, **kwargs)
+        BrandShard.objects.update_or_create(
+            brand_id=self.id,
+            defaults={
+                "slug": self.slug,
+                "api_key": self.api_key,
+                "shard": self._state.db,
+            },
+        )
+        bus.publish(BRAND_TOPIC, [self.id], using=DEFAULT_DB_ALIAS)
+
+    def delete(self, *args, **kwargs):
+        brand_id = self.id
+        result = super().delete(*args, **kwargs)
+        BrandShard.objects.filter(brand_id=brand_id).delete()
+        bus.publish(BRAND_TOPIC, [brand_id], using=DEFAULT_DB_ALIAS)
+        return result
 
     def __str__(self):
         return self.name
@@ -74,19 +115,58 @@ class Product(BaseModel):
 
 
 class LicenseKey(BaseModel):
+    # Indexed through the (brand, key_bytes) composite below.
     brand = models.ForeignKey(
-        Brand, on_delete=models.CASCADE, related_name="license_keys"
+        Brand, on_delete=models.CASCADE, related_name="license_keys", db_index=False
     )
-    key_string = models.CharField(max_length=255, unique=True)
+    # Display copy; lookups go through key_bytes.
+    key_string = models.CharField(max_length=255)
+    # licenses.compact.encode_key(key_string), set by a trigger whenever
+    # key_string is written.
+    key_bytes = models.BinaryField(editable=False)
     customer_email = models.EmailField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key_bytes"], name="licensekey_key_bytes_key"
+            ),
+        ]
+        indexes = [
+            # Status and activation lookups; covers the status document.
+            models.Index(
+                fields=["brand", "key_bytes"],
+                include=["id", "customer_email"],
+                name="licensekey_brand_bytes_idx",
+            ),
+            # Exact-email join used by provisioning.
+            models.Index(fields=["customer_email"], name="licensekey_email_idx"),
+            # Incremental refresh of the license key filter.
+            models.Index(
+                fields=["brand", "created_at"], name="licensekey_brand_created_idx"
+            ),
+            # Case-insensitive global lookup, in page order.
+            models.Index(
+                Upper("customer_email"),
+                "created_at",
+                "id",
+                name="licensekey_email_upper_idx",
+            ),
+            # Admin prefix search (UPPER(customer_email) LIKE 'PREFIX%').
+            models.Index(
+                OpClass(Upper("customer_email"), name="text_pattern_ops"),
+                name="licensekey_email_prefix_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.key_string
 
 
 class License(BaseModel):
+    # Indexed through the (license_key, product, status) composite below.
     license_key = models.ForeignKey(
-        LicenseKey, on_delete=models.CASCADE, related_name="licenses"
+        LicenseKey, on_delete=models.CASCADE, related_name="licenses", db_index=False
     )
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="licenses"
@@ -96,23 +176,100 @@ class License(BaseModel):
     )
     expiration_date = models.DateTimeField(blank=True, null=True)
     seat_limit = models.PositiveIntegerField(blank=True, null=True)
+    # Lease mode: when set, activations are floating seats that expire
+    # after this long unless renewed. Null means seats are held until
+    # explicitly deactivated.
+    lease_ttl = models.DurationField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Activation and provisioning lookups, covering the seat check.
+            models.Index(
+                fields=["license_key", "product", "status"],
+                include=["expiration_date", "seat_limit"],
+                name="license_key_product_status_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.license_key.key_string} - {self.product.name}"
 
 
+class ActivationQuerySet(models.QuerySet):
+    def live(self, now=None):
+        """
+        Activations holding a seat: permanent ones and unexpired leases.
+        Expired leases stop counting immediately, before they are reclaimed.
+        Defaults to the database clock, like the SQL document queries.
+        """
+        now = now or Now()
+        return self.filter(
+            models.Q(lease_expires_at__isnull=True) | models.Q(lease_expires_at__gt=now)
+        )
+
+    def with_liveness(self):
+        """
+        Annotates whether each activation holds a seat by the database
+        clock, for is_live().
+        """
+        return self.annotate(
+            seat_held=models.ExpressionWrapper(
+                models.Q(lease_expires_at__isnull=True)
+                | models.Q(lease_expires_at__gt=Now()),
+                output_field=models.BooleanField(),
+            )
+        )
+
+
 class Activation(BaseModel):
+    # Indexed as the prefix of the unique (license, instance_hash).
     license = models.ForeignKey(
-        License, on_delete=models.CASCADE, related_name="activations"
+        License, on_delete=models.CASCADE, related_name="activations", db_index=False
     )
     instance_identifier = models.CharField(max_length=255)
+    # licenses.compact.instance_hash(instance_identifier), set by a trigger
+    # whenever instance_identifier is written. Lookups recheck
+    # instance_identifier.
+    instance_hash = models.BigIntegerField(editable=False)
+    # Only set for licenses in lease mode.
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+
+    objects = ActivationQuerySet.as_manager()
 
     class Meta:
-        unique_together = ("license", "instance_identifier")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["license", "instance_hash"],
+                name="activation_license_instance_key",
+            ),
+        ]
+        indexes = [
+            # Reclamation sweep over expired leases.
+            models.Index(
+                fields=["lease_expires_at"],
+                condition=models.Q(lease_expires_at__isnull=False),
+                name="activation_lease_expiry_idx",
+            ),
+            # Machine-level deactivation across licenses.
+            models.Index(fields=["instance_hash"], name="activation_instance_hash_idx"),
+        ]
 
     def __str__(self):
         return self.instance_identifier
 
+    def is_live(self, now=None):
+        """
+        Whether this activation holds a seat: always for permanent
+        activations, until expiry for leases. Rows loaded through
+        with_liveness() answer by the database clock, as seat checks do;
+        others compare against `now`, defaulting to this server's clock.
+        """
+        if self.lease_expires_at is None:
+            return True
+        if now is None and hasattr(self, "seat_held"):
+            return self.seat_held
+        return self.lease_expires_at > (now or timezone.now())
+
 
 class IdempotencyRecord(BaseModel):
     brand = models.ForeignKey("Brand", on_delete=models.CASCADE)
@@ -124,4 +281,266 @@ class IdempotencyRecord(BaseModel):
         unique_together = ("brand", "idempotency_key")
         indexes = [
             models.Index(fields=["brand", "idempotency_key"]),
+            # Retention purge (licenses.services.archive).
+            models.Index(fields=["created_at"], name="idempotency_created_idx"),
+        ]
+
+
+class Job(BaseModel):
+    """
+    A service operation run by `manage.py run_jobs` instead of inside the
+    request (see licenses.services.jobs). Queued and running jobs are
+    claimed with FOR UPDATE SKIP LOCKED, highest priority first. While a
+    job runs, run_after is its visibility deadline: past it the worker is
+    presumed dead and another one claims the job again.
+    """
+
+    # Indexed through the (brand, created_at) composite below.
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, db_index=False)
+    kind = models.CharField(max_length=64, choices=JOB_KIND_CHOICES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=16, choices=JOB_STATUS_CHOICES, default="queued"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=128, blank=True, default="")
+    result = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default="")
+    request_id = models.CharField(max_length=64, blank=True, default="")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claim order; finished jobs drop out of the index.
+            models.Index(
+                models.F("priority").desc(),
+                "run_after",
+                condition=models.Q(status__in=["queued", "running"]),
+                name="job_ready_idx",
+            ),
+            # Brand deletion.
+            models.Index(fields=["brand", "created_at"], name="job_brand_created_idx"),
+            # Retention purge of finished jobs.
+            models.Index(
+                fields=["finished_at"],
+                condition=models.Q(finished_at__isnull=False),
+                name="job_finished_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
+
+
+class UsageDelta(BaseModel):
+    """
+    Change to one product's usage on one day, written by the service that
+    made it in the same transaction. Append-only: `manage.py rollup_usage`
+    folds the deltas into UsageRollup and deletes them (see
+    licenses.services.usage).
+    """
+
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False)
+    day = models.DateField()
+    activations = models.IntegerField(default=0)
+    deactivations = models.IntegerField(default=0)
+    seats_used = models.IntegerField(default=0)
+    licenses_valid = models.IntegerField(default=0)
+    licenses_suspended = models.IntegerField(default=0)
+    licenses_cancelled = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.product_id} {self.day}"
+
+
+class UsageRollup(BaseModel):
+    """
+    One product's usage on one day: the activations and deactivations of
+    that day, and the seats used and licenses by status at its end. Days
+    without changes have no row; their levels are those of the last row
+    before them.
+    """
+
+    # Indexed through the (brand, product, day) constraint below.
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, db_index=False)
+    day = models.DateField()
+    activations = models.IntegerField(default=0)
+    deactivations = models.IntegerField(default=0)
+    seats_used = models.IntegerField(default=0)
+    licenses_valid = models.IntegerField(default=0)
+    licenses_suspended = models.IntegerField(default=0)
+    licenses_cancelled = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Report range reads, and the opening level of a product.
+            models.UniqueConstraint(
+                fields=["brand", "product", "day"],
+                name="usagerollup_brand_product_day_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.day}"
+
+
+class ArchivedLicenseKey(models.Model):
+    """
+    Cold storage for a license key whose licenses were all cancelled or
+    expired past the retention period. The hot rows (key, licenses,
+    activations) are deleted; the status document as of archival is kept
+    so status checks for old keys still answer.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    brand_id = models.UUIDField()
+    key_string = models.CharField(max_length=255, unique=True)
+    customer_email = models.EmailField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    document = models.JSONField()
+
+    class Meta:
+        indexes = [
+            # Status fallback and key filter builds, per brand.
+            models.Index(
+                fields=["brand_id", "key_string"], name="archivedkey_brand_key_idx"
+            ),
         ]
+
+    def __str__(self):
+        return self.key_string
+
+
+class CustomerLicenseSummary(models.Model):
+    """
+    Denormalized global lookup document of one license key, filed under
+    the customer's email so a customer's keys are one index range read.
+    Rows are written only by licenses_refresh_customer_summaries. The
+    triggers installed in migration 0009 run it when the key, its new or
+    deleted licenses, or the brand or product names change; changes to
+    existing licenses and to activations are queued in
+    CustomerSummaryRefresh instead (migration 0019).
+    """
+
+    license_key_id = models.UUIDField(primary_key=True)
+    # UPPER(customer_email), matching the case-insensitive lookup.
+    email_key = models.CharField(max_length=254)
+    created_at = models.DateTimeField()
+    # Pre-rendered GlobalLicenseKeySerializer JSON, key order preserved.
+    document = models.TextField()
+    # When the first lease counted in the document expires.
+    refresh_after = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["email_key", "created_at", "license_key_id"],
+                name="customer_summary_lookup_idx",
+            ),
+            models.Index(
+                fields=["refresh_after"],
+                condition=models.Q(refresh_after__isnull=False),
+                name="customer_summary_refresh_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.email_key} {self.license_key_id}"
+
+
+class CustomerSummaryRefresh(models.Model):
+    """
+    License key whose CustomerLicenseSummary is out of date, queued by the
+    activation and license triggers in the writing transaction. Append-only:
+    `manage.py refresh_customer_summaries` re-renders the queued keys and
+    deletes the entries (see licenses.services.summaries).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    license_key_id = models.UUIDField()
+
+    def __str__(self):
+        return str(self.license_key_id)
+
+
+class LicenseKeyChange(models.Model):
+    """
+    Position of each license key in its brand's change feed. Written only
+    by licenses_record_key_changes (migration 0021), which the summary
+    triggers call in the writing transaction for every key whose document
+    can have changed, so a key's license, status and seat count changes
+    all move it to the end of the feed even while its summary refresh is
+    queued. Deleted (and archived) keys stay as tombstones.
+
+    The position is (change_xid, change_seq): the writing transaction's id
+    and a number from licenses_change_seq. Readers stop below the oldest
+    transaction still running, so nothing can later commit behind a
+    position already handed out.
+    """
+
+    license_key_id = models.UUIDField(primary_key=True)
+    brand_id = models.UUIDField()
+    key_string = models.CharField(max_length=255)
+    deleted = models.BooleanField(default=False)
+    change_xid = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["brand_id", "change_xid", "change_seq"],
+                name="keychange_brand_position_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.key_string} @ {self.change_xid}.{self.change_seq}"
+
+
+class BrandShard(models.Model):
+    """
+    Brand directory: which database alias (shard) holds each brand's data.
+    Lives on the default database only. Slug and API key are copied here
+    so authentication can find the shard before loading the brand.
+    """
+
+    brand_id = models.UUIDField(primary_key=True)
+    slug = models.SlugField(unique=True)
+    api_key = models.CharField(max_length=255, unique=True)
+    shard = models.CharField(max_length=64)
+    # Set while the brand is moved between shards: writes are refused.
+    read_only = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.slug} -> {self.shard}"
+
+
+class AuditLog(models.Model):
+    """
+    Append-only record of a license state change.
+    The table is range-partitioned by month on created_at (see migration
+    0003), so Django does not manage its schema. Brand and license are
+    stored as plain ids so history survives deletion of the license.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    created_at = models.DateTimeField(default=timezone.now)
+    brand_id = models.UUIDField()
+    license_id = models.UUIDField()
+    action = models.CharField(max_length=32, choices=AUDIT_ACTION_CHOICES)
+    before = models.JSONField(default=dict)
+    after = models.JSONField(default=dict)
+    request_id = models.CharField(max_length=64, blank=True, default="")
+
+    class Meta:
+        managed = False
+        db_table = "licenses_auditlog"
+        ordering = ["-created_at"]
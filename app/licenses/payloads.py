@@ -0,0 +1,267 @@
+from django.db import connections
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from licenses.models import Activation, License
+from licenses.sharding import current_alias
+
+ENTITLEMENT_FIELDS = (
+    "id",
+    "license_key_id",
+    "product_id",
+    "product__name",
+    "product__slug",
+    "status",
+    "expiration_date",
+    "seat_limit",
+    "seats_used",
+)
+
+
+def seats_used_subquery():
+    """
+    Per-license count of seat-holding activations (expired leases
+    excluded) as a correlated subquery, resolved by an index lookup on
+    activation.license_id for each row.
+    """
+    counts = (
+        Activation.objects.live()
+        .filter(license=OuterRef("pk"))
+        .order_by()
+        .values("license")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def entitlement_rows(**filters):
+    """
+    Flat entitlement rows with seat usage computed in the same query.
+    Ordered like the prefetches in StatusService and GlobalLookupService.
+    """
+    return (
+        License.objects.filter(**filters)
+        .annotate(seats_used=seats_used_subquery())
+        .order_by("created_at", "id")
+        .values(*ENTITLEMENT_FIELDS)
+    )
+
+
+class _DateTimeFormatter:
+    """
+    Mirrors DRF's DateTimeField ISO 8601 output for aware datetimes, but
+    resolves the current timezone once and memoizes repeated values
+    (licenses provisioned together share one expiration timestamp).
+    """
+
+    def __init__(self):
+        self.tz = timezone.get_current_timezone()
+        self.cache = {}
+
+    def __call__(self, value):
+        if not value:
+            return None
+        text = self.cache.get(value)
+        if text is None:
+            text = value.astimezone(self.tz).isoformat()
+            if text.endswith("+00:00"):
+                text = text[:-6] + "Z"
+            self.cache[value] = text
+        return text
+
+
+def render_entitlement(row, format_datetime):
+    seat_limit = row["seat_limit"]
+    seats_used = row["seats_used"]
+    return {
+        "id": str(row["id"]),
+        "product_id": str(row["product_id"]),
+        "product_name": row["product__name"],
+        "product_slug": row["product__slug"],
+        "status": row["status"],
+        "expiration_date": format_datetime(row["expiration_date"]),
+        "seat_limit": seat_limit,
+        "seats_used": seats_used,
+        "seats_remaining": max(0, (seat_limit or 0) - seats_used),
+    }
+
+
+def render_license_status(key_row, rows):
+    """
+    Equivalent of LicenseStatusResponseSerializer(license_key).data.
+    """
+    format_datetime = _DateTimeFormatter()
+    return {
+        "key": key_row["key_string"],
+        "customer_email": key_row["customer_email"],
+        "entitlements": [render_entitlement(row, format_datetime) for row in rows],
+    }
+
+
+def license_status_payload(license_key):
+    """
+    Renders the status document for an already loaded LicenseKey.
+    """
+    key_row = {
+        "key_string": license_key.key_string,
+        "customer_email": license_key.customer_email,
+    }
+    return render_license_status(
+        key_row, entitlement_rows(license_key_id=license_key.id)
+    )
+
+
+def _iso_datetime_sql(column):
+    """
+    SQL rendering of a timestamptz exactly as DRF outputs it in UTC
+    (microseconds only when non-zero, 'Z' suffix).
+    """
+    utc = f"({column} AT TIME ZONE 'UTC')"
+    return (
+        f"CASE WHEN {column} IS NULL THEN NULL ELSE "
+        f"to_char({utc}, 'YYYY-MM-DD\"T\"HH24:MI:SS') "
+        f"|| CASE WHEN to_char({utc}, 'US') = '000000' THEN '' "
+        f"ELSE '.' || to_char({utc}, 'US') END || 'Z' END"
+    )
+
+
+ENTITLEMENTS_JSON_SQL = f"""
+COALESCE((
+    SELECT json_agg(
+        json_build_object(
+            'id', l.id,
+            'product_id', p.id,
+            'product_name', p.name,
+            'product_slug', p.slug,
+            'status', l.status,
+            'expiration_date', {_iso_datetime_sql("l.expiration_date")},
+            'seat_limit', l.seat_limit,
+            'seats_used', a.seats_used,
+            'seats_remaining', GREATEST(0, COALESCE(l.seat_limit, 0) - a.seats_used)
+        )
+        ORDER BY l.created_at, l.id
+    )
+    FROM licenses_license l
+    JOIN licenses_product p ON p.id = l.product_id
+    CROSS JOIN LATERAL (
+        SELECT count(*) AS seats_used
+        FROM licenses_activation
+        WHERE license_id = l.id
+            AND (lease_expires_at IS NULL OR lease_expires_at > now())
+    ) a
+    WHERE l.license_key_id = k.id
+), '[]'::json)
+"""
+
+LICENSE_STATUS_OBJECT_SQL = f"""
+json_build_object(
+    'key', licenses_key_text(k.key_bytes),
+    'customer_email', k.customer_email,
+    'entitlements', {ENTITLEMENTS_JSON_SQL}
+)::text
+"""
+
+LICENSE_STATUS_JSON_SQL = f"""
+SELECT {LICENSE_STATUS_OBJECT_SQL}
+FROM licenses_licensekey k
+WHERE k.brand_id = %(brand_id)s AND k.key_bytes = %(key_bytes)s
+"""
+
+# One row per existing key: (key_string, status document). The key text is
+# decoded from key_bytes so the key table is read from its covering index.
+LICENSE_STATUS_BATCH_JSON_SQL = f"""
+SELECT licenses_key_text(k.key_bytes), {LICENSE_STATUS_OBJECT_SQL}
+FROM licenses_licensekey k
+WHERE k.brand_id = %(brand_id)s AND k.key_bytes = ANY(%(key_bytes)s)
+"""
+
+# Global lookup documents are kept per key in licenses_customerlicensesummary
+# by database triggers (migration 0009), so a customer's keys, or one page
+# of them, are one range read of customer_summary_lookup_idx.
+CUSTOMER_SUMMARY_JSON_SQL = """
+SELECT json_build_object(
+    'customer_email', %(email)s::text,
+    'total_keys_found', count(*),
+    'licenses', COALESCE(
+        json_agg(document::json ORDER BY created_at, license_key_id), '[]'::json
+    )
+)::text
+FROM licenses_customerlicensesummary
+WHERE email_key = UPPER(%(email)s)
+"""
+
+CUSTOMER_SUMMARY_PAGE_JSON_SQL = """
+WITH total AS (
+    SELECT count(*) AS n
+    FROM licenses_customerlicensesummary
+    WHERE email_key = UPPER(%(email)s)
+),
+page AS (
+    SELECT created_at, license_key_id, document
+    FROM licenses_customerlicensesummary
+    WHERE email_key = UPPER(%(email)s)
+    ORDER BY created_at, license_key_id
+    LIMIT %(limit)s OFFSET %(offset)s
+)
+SELECT json_build_object(
+    'customer_email', %(email)s::text,
+    'total_keys_found', total.n,
+    'page', %(page)s,
+    'page_size', %(limit)s,
+    'next_page', CASE WHEN total.n > %(offset)s + %(limit)s
+        THEN %(page)s + 1 END,
+    'licenses', COALESCE((
+        SELECT json_agg(s.document::json ORDER BY s.created_at, s.license_key_id)
+        FROM page s
+    ), '[]'::json)
+)::text
+FROM total
+"""
+
+# Scatter-gather variant, run on every shard: the first %(limit)s keys in
+# page order, each as (created_at, id, total matches, document), so the
+# caller can merge shards and cut the requested page.
+CUSTOMER_SUMMARY_SHARD_JSON_SQL = """
+WITH total AS (
+    SELECT count(*) AS n
+    FROM licenses_customerlicensesummary
+    WHERE email_key = UPPER(%(email)s)
+)
+SELECT s.created_at, s.license_key_id, total.n, s.document
+FROM licenses_customerlicensesummary s
+CROSS JOIN total
+WHERE s.email_key = UPPER(%(email)s)
+ORDER BY s.created_at, s.license_key_id
+LIMIT %(limit)s
+"""
+
+
+def fetch_json(sql, params):
+    """
+    Runs a document query and returns the pre-rendered JSON text, or None
+    when it matches no row.
+    """
+    with connections[current_alias()].cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def iter_json_rows(sql, params, using, chunk_size=100):
+    """
+    Runs a query returning (key, document) rows and yields them as they
+    are fetched, through a server-side cursor where the database allows it.
+    The alias is resolved by the caller because a streamed response is
+    consumed after the request's shard binding is gone.
+    """
+    with connections[using].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(chunk_size):
+            yield from rows
+
+
+def fetch_rows(sql, params):
+    with connections[current_alias()].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
@@ -0,0 +1,76 @@
+import json
+from collections.abc import Mapping
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+
+class PrerenderedJSON(Mapping):
+    """
+    JSON text produced elsewhere (e.g. assembled by PostgreSQL) that is
+    written to the response untouched. It is only parsed if something
+    inspects it as a mapping, such as tests reading `response.data`.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._parsed = None
+
+    def _data(self):
+        if self._parsed is None:
+            self._parsed = json.loads(self.text)
+        return self._parsed
+
+    def __getitem__(self, key):
+        return self._data()[key]
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __len__(self):
+        return len(self._data())
+
+
+def drf_json(data):
+    """
+    `data` as DRF's JSONRenderer writes a response body. JSON text built
+    elsewhere is parsed first: PostgreSQL spaces its output differently,
+    and pre-rendered responses must stay byte-identical to rendered ones.
+    """
+    if isinstance(data, str):
+        data = json.loads(data)
+    return JSONRenderer().render(data).decode()
+
+
+class PassthroughJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, PrerenderedJSON):
+            return data.text.encode()
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+PASSTHROUGH_RENDERER_CLASSES = [PassthroughJSONRenderer, BrowsableAPIRenderer]
+
+NOT_FOUND_MARKER = '{"error":"not_found"}'
+
+
+def _json_string(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def iter_batch_status_json(keys, documents):
+    """
+    Writes the batch status response incrementally from (key, json_text)
+    pairs, as they arrive from the database, followed by a not-found
+    marker for every requested key that produced no document.
+    """
+    found = set()
+    yield '{"results":{'
+    separator = ""
+    for key, text in documents:
+        found.add(key)
+        yield f"{separator}{_json_string(key)}:{text}"
+        separator = ","
+    for key in keys:
+        if key not in found:
+            yield f"{separator}{_json_string(key)}:{NOT_FOUND_MARKER}"
+            separator = ","
+    yield f'}},"found":{len(found)},"not_found":{len(keys) - len(found)}}}'
@@ -0,0 +1,63 @@
+from .sharding import current_shard, placement_for, sharding_enabled, shard_for_brand
+
+# Brand-scoped models: every row belongs to exactly one brand and lives on
+# that brand's shard.
+SHARDED_MODELS = {
+    "licenses.brand",
+    "licenses.product",
+    "licenses.licensekey",
+    "licenses.license",
+    "licenses.activation",
+    "licenses.idempotencyrecord",
+    "licenses.auditlog",
+    "licenses.archivedlicensekey",
+    "licenses.customerlicensesummary",
+    "licenses.customersummaryrefresh",
+    "licenses.licensekeychange",
+    "licenses.job",
+    "licenses.usagedelta",
+    "licenses.usagerollup",
+}
+
+# Lives only on the default database.
+DIRECTORY_MODELS = {"brandshard"}
+
+
+class BrandShardRouter:
+    """
+    Sends brand-scoped queries to the shard bound to the current context
+    (see licenses.sharding). Objects loaded from a shard stay there, and
+    related objects created from them follow. New brands without a
+    context are placed by their id. A no-op while sharding is off.
+    """
+
+    def _db_for(self, model, **hints):
+        if not sharding_enabled() or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        alias = current_shard()
+        if alias:
+            return alias
+        if instance is not None and model._meta.label_lower == "licenses.brand":
+            if instance._state.adding:
+                return placement_for(instance.id)
+            return shard_for_brand(instance.id)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._state.db and obj2._state.db:
+            return obj1._state.db == obj2._state.db
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == "licenses" and model_name in DIRECTORY_MODELS:
+            return db == "default"
+        return None
@@ -1,5 +1,11 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Product, LicenseKey
+from .compact import encode_key
+from .keyfilter import key_filter
+from .models import JOB_KIND_CHOICES, AuditLog, Job, Product, LicenseKey
+from .services.changes import decode_cursor
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -48,8 +54,19 @@ class LicenseInstanceActionSerializer(serializers.Serializer):
         keys.
         """
         brand = self.context["request"].user
-        if not LicenseKey.objects.filter(key_string=value, brand=brand).exists():
+        if not key_filter.might_exist(brand, value):
             raise serializers.ValidationError("Invalid license key for this brand.")
+        if not LicenseKey.objects.filter(
+            key_bytes=encode_key(value), brand=brand
+        ).exists():
+            raise serializers.ValidationError("Invalid license key for this brand.")
+        return value
+
+
+class LeaseRenewalSerializer(LicenseInstanceActionSerializer):
+    def validate_license_key(self, value):
+        # The renewal UPDATE itself checks the key against the brand; an
+        # extra lookup here would double the cost of the hottest call.
         return value
 
 
@@ -65,11 +82,12 @@ class EntitlementSerializer(serializers.Serializer):
     seats_remaining = serializers.SerializerMethodField()
 
     def get_seats_used(self, obj):
-        return obj.activations.count()
+        # Iterates the prefetched activations; expired leases hold no seat.
+        return sum(1 for activation in obj.activations.all() if activation.is_live())
 
     def get_seats_remaining(self, obj):
         seat_limit = 0 if not obj.seat_limit else obj.seat_limit
-        return max(0, seat_limit - obj.activations.count())
+        return max(0, seat_limit - self.get_seats_used(obj))
 
 
 class LicenseStatusResponseSerializer(serializers.Serializer):
@@ -78,6 +96,54 @@ class LicenseStatusResponseSerializer(serializers.Serializer):
     entitlements = EntitlementSerializer(source="licenses", many=True)
 
 
+class BatchStatusRequestSerializer(serializers.Serializer):
+    keys = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        help_text="License keys to check, up to STATUS_BATCH_MAX_KEYS.",
+    )
+
+    def validate_keys(self, value):
+        limit = settings.STATUS_BATCH_MAX_KEYS
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f"A batch may contain at most {limit} keys."
+            )
+        # Duplicates would only repeat work; keep the first occurrence.
+        return list(dict.fromkeys(value))
+
+
+class MachineDeactivationSerializer(serializers.Serializer):
+    instance_ids = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        help_text=(
+            "Instances to release on every license of the brand, up to "
+            "MACHINE_DEACTIVATION_MAX_INSTANCES."
+        ),
+    )
+
+    def validate_instance_ids(self, value):
+        limit = settings.MACHINE_DEACTIVATION_MAX_INSTANCES
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f"A request may contain at most {limit} instances."
+            )
+        return list(dict.fromkeys(value))
+
+
+class BatchStatusResponseSerializer(serializers.Serializer):
+    results = serializers.DictField(
+        child=serializers.JSONField(),
+        help_text=(
+            "Status document per requested key, or "
+            '{"error": "not_found"} for keys unknown to this brand.'
+        ),
+    )
+    found = serializers.IntegerField()
+    not_found = serializers.IntegerField()
+
+
 class GlobalLicenseKeySerializer(serializers.Serializer):
     brand_name = serializers.CharField(source="brand.name")
     key = serializers.CharField(source="key_string")
@@ -86,6 +152,23 @@ class GlobalLicenseKeySerializer(serializers.Serializer):
     entitlements = EntitlementSerializer(source="licenses", many=True)
 
 
+class GlobalLookupResponseSerializer(serializers.Serializer):
+    customer_email = serializers.EmailField()
+    total_keys_found = serializers.IntegerField()
+    page = serializers.IntegerField(
+        required=False, help_text="Only when page or page_size was requested."
+    )
+    page_size = serializers.IntegerField(
+        required=False, help_text="Only when page or page_size was requested."
+    )
+    next_page = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        help_text=("Only when page or page_size was requested; null on the last page."),
+    )
+    licenses = GlobalLicenseKeySerializer(many=True)
+
+
 class LicenseLifecycleActionSerializer(serializers.Serializer):
     action = serializers.ChoiceField(choices=["renew", "update_status"])
     status = serializers.ChoiceField(
@@ -101,3 +184,137 @@ class LicenseLifecycleActionSerializer(serializers.Serializer):
         if data["action"] == "renew" and not data.get("days"):
             data["days"] = 365  # Default extension
         return data
+
+
+class AuditLogSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditLog
+        fields = ["id", "created_at", "action", "before", "after", "request_id"]
+
+
+class LicenseLifecycleJobSerializer(LicenseLifecycleActionSerializer):
+    license_id = serializers.UUIDField()
+
+
+class JobSubmitSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=JOB_KIND_CHOICES)
+    payload = serializers.JSONField(
+        help_text=(
+            "Request body of the matching endpoint: provisioning for "
+            "provision_license_bundle, lifecycle plus license_id for "
+            "license_lifecycle."
+        )
+    )
+    priority = serializers.IntegerField(
+        required=False, default=0, min_value=-100, max_value=100
+    )
+
+    payload_serializers = {
+        "provision_license_bundle": ProvisionLicenseSerializer,
+        "license_lifecycle": LicenseLifecycleJobSerializer,
+    }
+
+    def validate(self, data):
+        payload = self.payload_serializers[data["kind"]](
+            data=data["payload"], context=self.context
+        )
+        if not payload.is_valid():
+            raise serializers.ValidationError({"payload": payload.errors})
+        data["payload"] = payload.validated_data
+        return data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "priority",
+            "attempts",
+            "max_attempts",
+            "result",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
+
+
+class UsageReportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    product_id = serializers.UUIDField(required=False)
+
+    def validate(self, data):
+        end = data.setdefault("end", timezone.now().date())
+        start = data.setdefault("start", end - timedelta(days=29))
+        if start > end:
+            raise serializers.ValidationError("start must not be after end.")
+        if (end - start).days >= settings.USAGE_REPORT_MAX_DAYS:
+            raise serializers.ValidationError(
+                f"A report covers at most {settings.USAGE_REPORT_MAX_DAYS} days."
+            )
+        return data
+
+
+class UsageDaySerializer(serializers.Serializer):
+    day = serializers.DateField()
+    activations = serializers.IntegerField()
+    deactivations = serializers.IntegerField()
+    seats_used = serializers.IntegerField(help_text="Seats held at the end of the day.")
+    licenses = serializers.DictField(
+        child=serializers.IntegerField(),
+        help_text="Licenses by status at the end of the day.",
+    )
+
+
+class ProductUsageSerializer(serializers.Serializer):
+    product_id = serializers.UUIDField()
+    product_name = serializers.CharField()
+    peak_seats_used = serializers.IntegerField()
+    days = UsageDaySerializer(many=True)
+
+
+class UsageReportSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    products = ProductUsageSerializer(many=True)
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_cursor(self, value):
+        try:
+            return decode_cursor(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate_limit(self, value):
+        return min(value, settings.CHANGE_FEED_MAX_PAGE_SIZE)
+
+
+class ChangeFeedEntrySerializer(serializers.Serializer):
+    key = serializers.CharField()
+    deleted = serializers.BooleanField(
+        help_text="The key was deleted or archived; forget it."
+    )
+    license_key = GlobalLicenseKeySerializer(
+        allow_null=True, help_text="Current state of the key; null when deleted."
+    )
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    changes = ChangeFeedEntrySerializer(many=True)
+    cursor = serializers.CharField(help_text="Pass back to read the next changes.")
+    has_more = serializers.BooleanField(
+        help_text="More changes are ready: request again without waiting."
+    )
+    reset = serializers.BooleanField(
+        help_text=(
+            "The feed started from the beginning: keys not listed again "
+            "by the time has_more is false no longer exist."
+        )
+    )
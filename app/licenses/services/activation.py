@@ -1,10 +1,101 @@
-from django.db import transaction
-from django.utils import timezone
+from django.db import connections, transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.functions import Now
+from licenses.compact import encode_key, instance_hash
+from licenses.invalidation import STATUS_TOPIC, bus, status_key
 from licenses.models import License, Activation
+from licenses.services.audit import AuditLogService
+from licenses.services.usage import UsageService
+from licenses.sharding import current_alias
 from core.logging_utils import get_logger
+from core.tracing import traced
 from rest_framework.exceptions import ValidationError
 
+# One statement per renewal, with no read round trip. It takes a shared
+# lock on the License row, so it cannot extend a lease while an activation
+# holding the seat lock may be counting that lease as expired, and it
+# checks the lease against the database clock once that lock is granted.
+# Only live leases can be renewed; once expired the seat may already be
+# taken, so the instance has to activate again.
+RENEW_LEASE_SQL = """
+WITH lease AS (
+    SELECT a.id, l.lease_ttl, l.expiration_date
+    FROM licenses_activation a
+    JOIN licenses_license l ON l.id = a.license_id
+    JOIN licenses_licensekey k ON k.id = l.license_key_id
+    WHERE k.brand_id = %(brand_id)s
+        AND k.key_bytes = %(key_bytes)s
+        AND l.product_id = %(product_id)s
+        AND a.instance_hash = %(instance_hash)s
+        AND a.instance_identifier = %(instance_id)s
+        AND l.status = 'valid'
+        AND l.lease_ttl IS NOT NULL
+    FOR SHARE OF l
+)
+UPDATE licenses_activation a
+SET lease_expires_at = clock_timestamp() + lease.lease_ttl,
+    updated_at = clock_timestamp()
+FROM lease
+WHERE a.id = lease.id
+    AND (lease.expiration_date IS NULL OR lease.expiration_date > clock_timestamp())
+    AND a.lease_expires_at > clock_timestamp()
+RETURNING a.lease_expires_at
+"""
 
+# Deletes one batch of expired leases, oldest first, skipping rows that a
+# concurrent renewal or activation holds.
+RECLAIM_LEASES_SQL = """
+WITH reclaimed AS (
+    DELETE FROM licenses_activation
+    WHERE id IN (
+        SELECT id FROM licenses_activation
+        WHERE lease_expires_at IS NOT NULL AND lease_expires_at <= statement_timestamp()
+        ORDER BY lease_expires_at
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING license_id, instance_identifier, lease_expires_at
+)
+SELECT k.brand_id, l.product_id, k.key_string, r.license_id,
+    r.instance_identifier, r.lease_expires_at
+FROM reclaimed r
+JOIN licenses_license l ON l.id = r.license_id
+JOIN licenses_licensekey k ON k.id = l.license_key_id
+"""
+
+# Releases every activation of the given instances under one brand, in id
+# order so concurrent releases lock rows in the same order. One row per
+# license: the instances released and the seats that freed (expired
+# leases are released too but held no seat).
+RELEASE_INSTANCES_SQL = """
+WITH targets AS (
+    SELECT a.id, k.key_string, l.product_id
+    FROM licenses_activation a
+    JOIN licenses_license l ON l.id = a.license_id
+    JOIN licenses_licensekey k ON k.id = l.license_key_id
+    WHERE k.brand_id = %(brand_id)s
+        AND a.instance_hash = ANY(%(instance_hashes)s)
+        AND a.instance_identifier = ANY(%(instance_ids)s)
+    ORDER BY a.id
+    FOR UPDATE OF a
+),
+released AS (
+    DELETE FROM licenses_activation a
+    USING targets t
+    WHERE a.id = t.id
+    RETURNING a.license_id, a.instance_identifier, a.lease_expires_at,
+        t.key_string, t.product_id
+)
+SELECT license_id, key_string, product_id,
+    array_agg(instance_identifier ORDER BY instance_identifier),
+    count(*) FILTER (WHERE lease_expires_at IS NULL OR lease_expires_at > statement_timestamp())
+FROM released
+GROUP BY license_id, key_string, product_id
+ORDER BY key_string, product_id
+"""
+
+
+@traced
 class ActivationService:
     @staticmethod
     def activate_instance(brand, key_string, instance_id, product_id, context):
@@ -19,14 +110,23 @@ class ActivationService:
             extra={"key": key_string, "instance": instance_id, "product": product_id},
         )
         try:
-            with transaction.atomic():
+            with transaction.atomic(using=current_alias()):
                 # Fetch license with lock
                 try:
-                    license_inst = License.objects.select_for_update().get(
-                        license_key__brand=brand,
-                        license_key__key_string=key_string,
-                        product__id=product_id,
-                        status="valid",
+                    license_inst = (
+                        License.objects.select_for_update()
+                        .annotate(
+                            expired=ExpressionWrapper(
+                                Q(expiration_date__lt=Now()),
+                                output_field=BooleanField(),
+                            )
+                        )
+                        .get(
+                            license_key__brand=brand,
+                            license_key__key_bytes=encode_key(key_string),
+                            product__id=product_id,
+                            status="valid",
+                        )
                     )
                 except License.DoesNotExist:
                     log.warning(
@@ -38,7 +138,7 @@ class ActivationService:
                     )
 
                 # Check Expiration
-                if license_inst.expiration_date < timezone.now():
+                if license_inst.expired:
                     log.warning(
                         "Activation failed: Expired",
                         extra={
@@ -48,18 +148,37 @@ class ActivationService:
                     )
                     raise ValidationError("License has expired.")
 
+                # Leases run on the database clock, like renewals and the
+                # seat count, so app servers' clock skew cannot free a seat
+                # early.
+                lease_expires_at = (
+                    Now() + license_inst.lease_ttl if license_inst.lease_ttl else None
+                )
+
                 # Check if already activated for this instance
-                if Activation.objects.filter(
-                    license=license_inst, instance_identifier=instance_id
-                ).exists():
+                existing = (
+                    Activation.objects.with_liveness()
+                    .filter(
+                        license=license_inst,
+                        instance_hash=instance_hash(instance_id),
+                        instance_identifier=instance_id,
+                    )
+                    .first()
+                )
+                if existing is not None and existing.is_live():
+                    if lease_expires_at is not None:
+                        # Re-activating a live lease renews it.
+                        Activation.objects.filter(pk=existing.pk).update(
+                            lease_expires_at=lease_expires_at, updated_at=Now()
+                        )
                     log.info(
                         "Instance already active. Activation skipped.",
                         extra={"instance": instance_id},
                     )
                     return True
 
-                # Enforce Seat Limits
-                current_seats = license_inst.activations.count()
+                # Enforce Seat Limits (expired leases hold no seat)
+                current_seats = license_inst.activations.live().count()
                 if license_inst.seat_limit and current_seats >= license_inst.seat_limit:
                     log.warning(
                         "Activation failed: Seat limit reached",
@@ -69,9 +188,32 @@ class ActivationService:
                         f"Seat limit reached ({license_inst.seat_limit})."
                     )
 
-                # Register Activation
+                # Register Activation, replacing this instance's expired
+                # lease if the reclaimer has not removed it yet.
+                if existing is not None:
+                    existing.delete()
                 Activation.objects.create(
-                    license=license_inst, instance_identifier=instance_id
+                    license=license_inst,
+                    instance_identifier=instance_id,
+                    lease_expires_at=lease_expires_at,
+                )
+                UsageService.record(
+                    brand.id,
+                    license_inst.product_id,
+                    activations=1,
+                    seats_used=0 if existing is not None else 1,
+                )
+                bus.publish(STATUS_TOPIC, [status_key(brand.id, key_string)])
+                AuditLogService.record(
+                    brand_id=brand.id,
+                    license_id=license_inst.id,
+                    action="activation",
+                    before={"seats_used": current_seats},
+                    after={
+                        "seats_used": current_seats + 1,
+                        "instance_identifier": instance_id,
+                    },
+                    context=context,
                 )
                 log.info(
                     "Activation successful",
@@ -96,19 +238,43 @@ class ActivationService:
             extra={"key": key_string, "instance": instance_id, "product": product_id},
         )
         try:
-            deleted_count, _ = Activation.objects.filter(
-                license__license_key__brand=brand,
-                license__license_key__key_string=key_string,
-                license__product__id=product_id,
-                instance_identifier=instance_id,
-            ).delete()
+            with transaction.atomic(using=current_alias()):
+                activations = Activation.objects.filter(
+                    license__license_key__brand=brand,
+                    license__license_key__key_bytes=encode_key(key_string),
+                    license__product__id=product_id,
+                    instance_hash=instance_hash(instance_id),
+                    instance_identifier=instance_id,
+                )
+                license_ids = list(activations.values_list("license_id", flat=True))
+                deleted_count, _ = activations.delete()
 
-            if deleted_count == 0:
-                log.warning(
-                    "Deactivation failed: Instance not found",
-                    extra={"instance": instance_id},
+                if deleted_count == 0:
+                    log.warning(
+                        "Deactivation failed: Instance not found",
+                        extra={"instance": instance_id},
+                    )
+                    raise ValidationError("Activation record not found.")
+                UsageService.record(
+                    brand.id,
+                    product_id,
+                    deactivations=deleted_count,
+                    seats_used=-deleted_count,
+                )
+                bus.publish(STATUS_TOPIC, [status_key(brand.id, key_string)])
+                AuditLogService.record_many(
+                    (
+                        (
+                            brand.id,
+                            license_id,
+                            "deactivation",
+                            {"instance_identifier": instance_id, "active": True},
+                            {"instance_identifier": instance_id, "active": False},
+                        )
+                        for license_id in license_ids
+                    ),
+                    context,
                 )
-                raise ValidationError("Activation record not found.")
             log.info(
                 "Deactivation successful",
                 extra={"instance": instance_id, "action": "US5_DEACTIVATE"},
@@ -120,3 +286,154 @@ class ActivationService:
                 extra={"error": str(e), "action": "US5_DEACTIVATE_FAILURE"},
             )
             raise
+
+    @staticmethod
+    def deactivate_machine(brand, instance_ids, context):
+        """
+        Releases every activation of `instance_ids` on any of the brand's
+        licenses in one statement, e.g. when a server is decommissioned.
+        Unknown instances are ignored, so retries are harmless. Customer
+        summaries follow through their activation triggers.
+        Returns one entry per license: the instances released and the
+        seats freed.
+        """
+        log = get_logger(__name__, context)
+        with transaction.atomic(using=current_alias()):
+            with connections[current_alias()].cursor() as cursor:
+                cursor.execute(
+                    RELEASE_INSTANCES_SQL,
+                    {
+                        "brand_id": brand.id,
+                        "instance_hashes": [instance_hash(i) for i in instance_ids],
+                        "instance_ids": list(instance_ids),
+                    },
+                )
+                rows = cursor.fetchall()
+            UsageService.record_many(
+                (
+                    brand.id,
+                    product_id,
+                    {"deactivations": len(instances), "seats_used": -len(instances)},
+                )
+                for _, _, product_id, instances, _ in rows
+            )
+            bus.publish(
+                STATUS_TOPIC,
+                {status_key(brand.id, key_string) for _, key_string, *_ in rows},
+            )
+            AuditLogService.record_many(
+                (
+                    (
+                        brand.id,
+                        license_id,
+                        "deactivation",
+                        {"instance_identifier": instance_id, "active": True},
+                        {
+                            "instance_identifier": instance_id,
+                            "active": False,
+                            "reason": "machine_deactivation",
+                        },
+                    )
+                    for license_id, _, _, instances, _ in rows
+                    for instance_id in instances
+                ),
+                context,
+            )
+            released = []
+            for license_id, key_string, product_id, instances, seats_freed in rows:
+                released.append(
+                    {
+                        "license_id": license_id,
+                        "license_key": key_string,
+                        "product_id": product_id,
+                        "instance_ids": instances,
+                        "seats_freed": seats_freed,
+                    }
+                )
+        log.info(
+            "Machine deactivation",
+            extra={
+                "instances": len(instance_ids),
+                "licenses": len(released),
+                "seats_freed": sum(entry["seats_freed"] for entry in released),
+                "action": "US5_DEACTIVATE_MACHINE",
+            },
+        )
+        return released
+
+    @staticmethod
+    def renew_lease(brand, key_string, instance_id, product_id, context):
+        """
+        Extends a live lease by the license's lease_ttl in one UPDATE.
+        Returns the new expiry. Renewals are the hottest write path, so
+        they are neither audited nor logged on success.
+        """
+        with connections[current_alias()].cursor() as cursor:
+            cursor.execute(
+                RENEW_LEASE_SQL,
+                {
+                    "brand_id": brand.id,
+                    "key_bytes": encode_key(key_string),
+                    "instance_hash": instance_hash(instance_id),
+                    "instance_id": instance_id,
+                    "product_id": product_id,
+                },
+            )
+            row = cursor.fetchone()
+        if row is None:
+            get_logger(__name__, context).warning(
+                "Lease renewal failed: No live lease",
+                extra={"key": key_string, "instance": instance_id},
+            )
+            raise ValidationError("No live lease for this instance. Activate it again.")
+        return row[0]
+
+    @staticmethod
+    def reclaim_expired_leases(batch_size, context):
+        """
+        Deletes up to `batch_size` expired leases and audits them.
+        Returns the number reclaimed; callers loop until it is short.
+        """
+        log = get_logger(__name__, context)
+        with transaction.atomic(using=current_alias()):
+            with connections[current_alias()].cursor() as cursor:
+                cursor.execute(
+                    RECLAIM_LEASES_SQL,
+                    {"batch_size": batch_size},
+                )
+                rows = cursor.fetchall()
+            UsageService.record_many(
+                (brand_id, product_id, {"deactivations": 1, "seats_used": -1})
+                for brand_id, product_id, *_ in rows
+            )
+            bus.publish(
+                STATUS_TOPIC,
+                {
+                    status_key(brand_id, key_string)
+                    for brand_id, _, key_string, *_ in rows
+                },
+            )
+            AuditLogService.record_many(
+                (
+                    (
+                        brand_id,
+                        license_id,
+                        "deactivation",
+                        {"instance_identifier": instance_id, "active": True},
+                        {
+                            "instance_identifier": instance_id,
+                            "active": False,
+                            "reason": "lease_expired",
+                            "lease_expires_at": expired_at.isoformat(),
+                        },
+                    )
+                    for brand_id, _, _, license_id, instance_id, expired_at in rows
+                ),
+                context,
+            )
+        if rows:
+            log.info(
+                "Expired leases reclaimed",
+                extra={"count": len(rows), "action": "LEASE_RECLAIM"},
+            )
+        return len(rows)
@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+from licenses.invalidation import STATUS_TOPIC, bus, status_key
+from licenses.models import (
+    Activation,
+    ArchivedLicenseKey,
+    IdempotencyRecord,
+    License,
+    LicenseKey,
+)
+from licenses.payloads import entitlement_rows, render_license_status
+from licenses.services.usage import UsageService
+from licenses.sharding import current_alias
+from core.logging_utils import get_logger
+from core.tracing import traced
+
+# Hot tables whose indexes archival is meant to keep small.
+HOT_TABLES = (
+    "licenses_licensekey",
+    "licenses_license",
+    "licenses_activation",
+    "licenses_idempotencyrecord",
+)
+
+
+def _retained_licenses(cutoff):
+    """
+    Licenses of the outer key that keep it hot: anything not cancelled or
+    expired since before the cutoff.
+    """
+    return License.objects.filter(license_key=OuterRef("pk")).exclude(
+        Q(status="cancelled", updated_at__lt=cutoff) | Q(expiration_date__lt=cutoff)
+    )
+
+
+@traced
+class ArchiveService:
+    @staticmethod
+    def archivable_keys(after, window, cutoff):
+        """
+        Keys among the next `window` keys (in id order, after `after`) whose
+        licenses are all cancelled or expired since before `cutoff`.
+        Walking the table by id keeps the work per batch bounded.
+        Returns (candidate ids, last id scanned or None at the end).
+        """
+        keys = LicenseKey.objects.order_by("id")
+        if after is not None:
+            keys = keys.filter(id__gt=after)
+        scanned = list(keys.values_list("id", flat=True)[:window])
+        if not scanned:
+            return [], None
+        retained = _retained_licenses(cutoff)
+        candidates = (
+            LicenseKey.objects.filter(id__in=scanned, created_at__lt=cutoff)
+            .exclude(Exists(retained))
+            .values_list("id", flat=True)
+        )
+        return list(candidates), scanned[-1]
+
+    @staticmethod
+    def archive_keys(key_ids, cutoff, context):
+        """
+        Moves keys to ArchivedLicenseKey in one short transaction: the
+        status document is rendered and stored, then the hot rows are
+        deleted. Keys or licenses locked by live traffic are skipped, not
+        waited for, and a key that came back to life meanwhile is left alone.
+        Returns a {table: rows} count of what moved.
+        """
+        log = get_logger(__name__, context)
+        alias = current_alias()
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = '1s'")
+            retained = _retained_licenses(cutoff)
+            keys = list(
+                LicenseKey.objects.select_for_update(skip_locked=True)
+                .filter(id__in=key_ids)
+                .exclude(Exists(retained))
+                .values("id", "brand_id", "key_string", "customer_email", "created_at")
+            )
+            if not keys:
+                return {}
+            # Renewals and status changes lock the license, not its key.
+            ids = [key["id"] for key in keys]
+            locked = License.objects.select_for_update(skip_locked=True).filter(
+                license_key_id__in=ids
+            )
+            in_use = set(
+                License.objects.filter(license_key_id__in=ids)
+                .exclude(id__in=list(locked.values_list("id", flat=True)))
+                .values_list("license_key_id", flat=True)
+            )
+            # Checked again now that the licenses are held: a renewal that
+            # committed after the first check brings its key back to life.
+            dead = set(
+                LicenseKey.objects.filter(id__in=ids)
+                .exclude(Exists(retained))
+                .values_list("id", flat=True)
+            )
+            keys = [key for key in keys if key["id"] in dead - in_use]
+            if not keys:
+                return {}
+            ids = [key["id"] for key in keys]
+            rows_by_key = {key_id: [] for key_id in ids}
+            for row in entitlement_rows(license_key_id__in=ids):
+                rows_by_key[row["license_key_id"]].append(row)
+
+            ArchivedLicenseKey.objects.bulk_create(
+                [
+                    ArchivedLicenseKey(
+                        id=key["id"],
+                        brand_id=key["brand_id"],
+                        key_string=key["key_string"],
+                        customer_email=key["customer_email"],
+                        created_at=key["created_at"],
+                        document=render_license_status(key, rows_by_key[key["id"]]),
+                    )
+                    for key in keys
+                ],
+                ignore_conflicts=True,
+            )
+            # Archived licenses keep their status in the usage reports; the
+            # seats they still held are gone with their activations.
+            UsageService.record_many(
+                (brand_id, product_id, {"seats_used": -seats})
+                for brand_id, product_id, seats in Activation.objects.filter(
+                    license__license_key_id__in=ids
+                )
+                .values_list("license__license_key__brand_id", "license__product_id")
+                .annotate(seats=Count("id"))
+                .order_by()
+            )
+            _, deleted = LicenseKey.objects.filter(id__in=ids).delete()
+            bus.publish(
+                STATUS_TOPIC,
+                [status_key(key["brand_id"], key["key_string"]) for key in keys],
+            )
+        moved = {
+            model_label.split(".")[-1].lower(): count
+            for model_label, count in deleted.items()
+        }
+        moved["archivedlicensekey"] = len(keys)
+        log.info("License keys archived", extra={**moved, "action": "ARCHIVE"})
+        return moved
+
+    @staticmethod
+    def purge_idempotency_records(cutoff, batch_size, context):
+        """
+        Deletes up to `batch_size` idempotency records created before
+        `cutoff`. They only exist to replay retried requests, so nothing
+        reads them past retention and they are not archived.
+        """
+        ids = list(
+            IdempotencyRecord.objects.filter(created_at__lt=cutoff)
+            .order_by("created_at")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        deleted, _ = IdempotencyRecord.objects.filter(id__in=ids).delete()
+        get_logger(__name__, context).info(
+            "Idempotency records purged", extra={"count": deleted, "action": "ARCHIVE"}
+        )
+        return deleted
+
+    @staticmethod
+    def get_document(brand, key_string):
+        """
+        Status document of an archived key, or None.
+        """
+        return (
+            ArchivedLicenseKey.objects.filter(brand_id=brand.id, key_string=key_string)
+            .values_list("document", flat=True)
+            .first()
+        )
+
+    @staticmethod
+    def get_documents(brand, key_strings, using=None):
+        """
+        {key_string: document} for the archived keys among `key_strings`.
+        """
+        if not key_strings:
+            return {}
+        return dict(
+            ArchivedLicenseKey.objects.using(using or current_alias())
+            .filter(brand_id=brand.id, key_string__in=key_strings)
+            .values_list("key_string", "document")
+        )
+
+    @staticmethod
+    def index_sizes(using=None):
+        """
+        Total on-disk index size, in bytes, of each hot table.
+        """
+        with connections[using or current_alias()].cursor() as cursor:
+            cursor.execute(
+                "SELECT relname, pg_indexes_size(oid) FROM pg_class "
+                "WHERE relname = ANY(%s)",
+                [list(HOT_TABLES)],
+            )
+            return dict(cursor.fetchall())
+
+    @staticmethod
+    def reindex(using=None):
+        """
+        Rebuilds the hot tables' indexes without blocking writes, returning
+        the space that deleted rows still occupy in them.
+        """
+        with connections[using or current_alias()].cursor() as cursor:
+            for table in HOT_TABLES:
+                cursor.execute(f"REINDEX TABLE CONCURRENTLY {table}")
+
+    @staticmethod
+    def cutoffs():
+        """
+        Retention cutoffs from ARCHIVE_*_RETENTION_DAYS.
+        """
+        now = timezone.now()
+        return {
+            "licenses": now
+            - timezone.timedelta(days=settings.ARCHIVE_LICENSE_RETENTION_DAYS),
+            "idempotency": now
+            - timezone.timedelta(days=settings.ARCHIVE_IDEMPOTENCY_RETENTION_DAYS),
+        }
@@ -0,0 +1,244 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from licenses.models import Job
+from licenses.payloads import license_status_payload
+from licenses.services.lifecycle import LicenseLifecycleService
+from licenses.services.provisioning import ProvisioningService
+from licenses.sharding import (
+    current_alias,
+    hold_brand_writes,
+    release_brand_writes,
+    sharding_enabled,
+)
+from core.logging_utils import get_logger
+from core.tracing import traced
+from rest_framework.exceptions import ValidationError
+
+# Claims up to `batch_size` due jobs: queued ones whose run_after has come
+# (new, or waiting out a retry backoff) and running ones whose visibility
+# deadline passed. Rows another worker is claiming are skipped, not
+# waited for. The attempt is counted on claim, so a job that keeps
+# killing its worker still runs out of attempts.
+CLAIM_JOBS_SQL = """
+WITH due AS (
+    SELECT id FROM licenses_job
+    WHERE status IN ('queued', 'running') AND run_after <= %(now)s
+    ORDER BY priority DESC, run_after
+    LIMIT %(batch_size)s
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE licenses_job j
+SET status = 'running',
+    attempts = j.attempts + 1,
+    run_after = %(now)s + %(visibility_timeout)s,
+    locked_by = %(worker)s,
+    updated_at = %(now)s
+FROM due
+WHERE j.id = due.id
+RETURNING j.id
+"""
+
+
+def _provision(brand, payload, context):
+    license_key = ProvisioningService.provision_license_bundle(
+        brand=brand,
+        customer_email=payload["customer_email"],
+        product_ids=payload["product_ids"],
+        existing_key=payload.get("existing_key"),
+        expiration_days=payload.get("expiration_days", 365),
+        context=context,
+    )
+    return license_status_payload(license_key)
+
+
+def _lifecycle(brand, payload, context):
+    if payload["action"] == "renew":
+        license_inst = LicenseLifecycleService.renew_license(
+            brand, payload["license_id"], payload["days"], context
+        )
+    else:
+        license_inst = LicenseLifecycleService.update_status(
+            brand, payload["license_id"], payload["status"], context
+        )
+    return {
+        "id": license_inst.id,
+        "status": license_inst.status,
+        "expiration_date": license_inst.expiration_date,
+    }
+
+
+# kind -> handler(brand, payload, context) returning the JSON result. The
+# payloads are the request bodies of the matching synchronous endpoints,
+# validated by JobSubmitSerializer.
+JOB_HANDLERS = {
+    "provision_license_bundle": _provision,
+    "license_lifecycle": _lifecycle,
+}
+
+
+class _ClaimLost(Exception):
+    pass
+
+
+@traced
+class JobService:
+    @staticmethod
+    def submit(brand, kind, payload, context, priority=0):
+        """
+        Queues a job on the brand's shard. The payload must already be
+        validated: the handler trusts it.
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValidationError(f"Unknown job kind: {kind}.")
+        job = Job.objects.create(
+            brand=brand,
+            kind=kind,
+            payload=payload,
+            priority=priority,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            request_id=str(context.get("request_id", ""))[:64],
+        )
+        get_logger(__name__, context).info(
+            "Job queued",
+            extra={"job_id": str(job.id), "kind": kind, "action": "JOB_QUEUED"},
+        )
+        return job
+
+    @staticmethod
+    def get(brand, job_id):
+        try:
+            return Job.objects.get(id=job_id, brand=brand)
+        except (Job.DoesNotExist, ValueError):
+            return None
+
+    @staticmethod
+    def claim(worker, batch_size=1):
+        """
+        Claims due jobs on the current shard for `worker`, in priority
+        order, and returns them.
+        """
+        alias = current_alias()
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    CLAIM_JOBS_SQL,
+                    {
+                        "now": timezone.now(),
+                        "batch_size": batch_size,
+                        "visibility_timeout": timedelta(
+                            seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS
+                        ),
+                        "worker": worker,
+                    },
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+        jobs = Job.objects.filter(id__in=ids).select_related("brand")
+        return sorted(jobs, key=lambda job: (-job.priority, job.run_after))
+
+    @staticmethod
+    def run(job, context):
+        """
+        Runs a claimed job and records the outcome. Business errors
+        (ValidationError) fail the job at once; anything else is retried
+        with exponential backoff until max_attempts. Returns the status.
+        A job claimed in a batch gets a fresh visibility deadline just
+        before it runs. Success is recorded in the transaction of the
+        handler's writes, so a job whose run committed is never run again
+        and a run whose claim another worker took over commits nothing.
+        """
+        if job.attempts > job.max_attempts:
+            # Claimed again after its last attempt timed out.
+            return JobService._finish(
+                job, "failed", error="Visibility timeout on the last attempt."
+            )
+        if not JobService._claimed(job).update(
+            run_after=timezone.now()
+            + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+        ):
+            return "lost"
+        context = {
+            **context,
+            "request_id": job.request_id or context.get("request_id"),
+            "brand_id": job.brand_id,
+            "brand_name": job.brand.name,
+            "job_id": str(job.id),
+        }
+        log = get_logger(__name__, context)
+        extra = {"job_id": str(job.id), "kind": job.kind, "attempt": job.attempts}
+        try:
+            with transaction.atomic(using=current_alias()):
+                if sharding_enabled():
+                    # Like write requests: a brand being moved retries later.
+                    hold_brand_writes(job.brand_id, current_alias())
+                result = JOB_HANDLERS[job.kind](job.brand, job.payload, context)
+                if JobService._finish(job, "succeeded", result=result) == "lost":
+                    raise _ClaimLost()
+        except _ClaimLost:
+            log.warning("Job claim lost, run rolled back", extra=extra)
+            return "lost"
+        except ValidationError as e:
+            log.warning("Job failed", extra={**extra, "error": str(e.detail)})
+            return JobService._finish(job, "failed", error=str(e.detail))
+        except Exception as e:
+            if job.attempts >= job.max_attempts:
+                log.error("Job failed", extra={**extra, "error": repr(e)})
+                return JobService._finish(job, "failed", error=repr(e))
+            delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            log.warning(
+                "Job attempt failed, retrying",
+                extra={**extra, "error": repr(e), "retry_in": delay},
+            )
+            return JobService._finish(
+                job,
+                "queued",
+                error=repr(e),
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+        finally:
+            release_brand_writes()
+        log.info("Job succeeded", extra={**extra, "action": "JOB_SUCCEEDED"})
+        return "succeeded"
+
+    @staticmethod
+    def _claimed(job):
+        """
+        The job's row, as long as this claim of it is the current one.
+        """
+        return Job.objects.filter(
+            id=job.id, status="running", attempts=job.attempts, locked_by=job.locked_by
+        )
+
+    @staticmethod
+    def _finish(job, status, result=None, error="", run_after=None):
+        """
+        Records the outcome unless the claim was lost: a worker past the
+        visibility deadline may have been overtaken by another claim, whose
+        outcome wins.
+        """
+        now = timezone.now()
+        updated = JobService._claimed(job).update(
+            status=status,
+            result=result,
+            error=error,
+            run_after=run_after or now,
+            locked_by="",
+            finished_at=None if status == "queued" else now,
+            updated_at=now,
+        )
+        return status if updated else "lost"
+
+    @staticmethod
+    def purge_finished(cutoff, batch_size):
+        """
+        Deletes one batch of jobs finished before `cutoff`; returns the
+        number deleted.
+        """
+        ids = list(
+            Job.objects.filter(finished_at__lt=cutoff)
+            .order_by("finished_at")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        deleted, _ = Job.objects.filter(id__in=ids).delete()
+        return deleted
@@ -1,10 +1,16 @@
 from django.db import transaction
 from django.utils import timezone
+from licenses.invalidation import STATUS_TOPIC, bus, status_key
 from licenses.models import LICENSE_STATUS_CHOICES, License
+from licenses.services.audit import AuditLogService
+from licenses.services.usage import UsageService, status_change
+from licenses.sharding import current_alias
 from core.logging_utils import get_logger
+from core.tracing import traced
 from rest_framework.exceptions import ValidationError
 
 
+@traced
 class LicenseLifecycleService:
     @staticmethod
     def update_status(brand, license_id, new_status, context):
@@ -23,7 +29,7 @@ class LicenseLifecycleService:
                     f"Invalid status. Must be one of: {valid_statuses}"
                 )
 
-            with transaction.atomic():
+            with transaction.atomic(using=current_alias()):
                 try:
                     license_inst = License.objects.select_for_update().get(
                         id=license_id, license_key__brand=brand
@@ -46,6 +52,23 @@ class LicenseLifecycleService:
 
                     license_inst.status = new_status
                     license_inst.save()
+                    UsageService.record(
+                        brand.id,
+                        license_inst.product_id,
+                        **status_change(old_status, new_status),
+                    )
+                    bus.publish(
+                        STATUS_TOPIC,
+                        [status_key(brand.id, license_inst.license_key.key_string)],
+                    )
+                    AuditLogService.record(
+                        brand_id=brand.id,
+                        license_id=license_inst.id,
+                        action="status_update",
+                        before={"status": old_status},
+                        after={"status": new_status},
+                        context=context,
+                    )
                     log.info(
                         "License status updated successfully",
                         extra={
@@ -55,13 +78,13 @@ class LicenseLifecycleService:
                             "action": "US7_STATUS_UPDATE",
                         },
                     )
-                    return license_inst
                 except License.DoesNotExist:
                     log.warning(
                         "License status update failed: License not found",
                         extra={"license_id": license_id},
                     )
                     raise ValidationError("License not found for this brand.")
+            return license_inst
         except Exception as e:
             log.error(
                 "License status update error",
@@ -80,7 +103,7 @@ class LicenseLifecycleService:
             extra={"license_id": license_id, "extension_days": extension_days},
         )
         try:
-            with transaction.atomic():
+            with transaction.atomic(using=current_alias()):
                 try:
                     license_inst = License.objects.select_for_update().get(
                         id=license_id, license_key__brand=brand
@@ -88,6 +111,7 @@ class LicenseLifecycleService:
                     # Extend from the current expiration or 'now',
                     # whichever is later
                     current_expiry = license_inst.expiration_date
+                    old_status = license_inst.status
                     base_date = max(current_expiry, timezone.now())
 
                     license_inst.expiration_date = base_date + timezone.timedelta(
@@ -95,6 +119,31 @@ class LicenseLifecycleService:
                     )
                     license_inst.status = "valid"
                     license_inst.save()
+                    UsageService.record(
+                        brand.id,
+                        license_inst.product_id,
+                        **status_change(old_status, "valid"),
+                    )
+                    bus.publish(
+                        STATUS_TOPIC,
+                        [status_key(brand.id, license_inst.license_key.key_string)],
+                    )
+                    AuditLogService.record(
+                        brand_id=brand.id,
+                        license_id=license_inst.id,
+                        action="renewal",
+                        before={
+                            "status": old_status,
+                            "expiration_date": current_expiry.isoformat(),
+                        },
+                        after={
+                            "status": license_inst.status,
+                            "expiration_date": (
+                                license_inst.expiration_date.isoformat()
+                            ),
+                        },
+                        context=context,
+                    )
 
                     log.info(
                         "License renewed successfully",
@@ -104,13 +153,13 @@ class LicenseLifecycleService:
                             "action": "US6_RENEW",
                         },
                     )
-                    return license_inst
                 except License.DoesNotExist:
                     log.warning(
                         "License renewal failed: License not found",
                         extra={"license_id": license_id},
                     )
                     raise ValidationError("License not found.")
+            return license_inst
         except Exception as e:
             log.error(
                 "License renewal error",
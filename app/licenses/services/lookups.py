@@ -1,12 +1,31 @@
-from licenses.models import LicenseKey
+import heapq
+import json
+from itertools import islice
+from operator import itemgetter
+from licenses.models import CustomerLicenseSummary, LicenseKey, License
+from licenses.payloads import (
+    CUSTOMER_SUMMARY_JSON_SQL,
+    CUSTOMER_SUMMARY_PAGE_JSON_SQL,
+    CUSTOMER_SUMMARY_SHARD_JSON_SQL,
+    fetch_json,
+    fetch_rows,
+)
+from licenses.renderers import drf_json
+from licenses.sharding import scatter, sharding_enabled
 from core.logging_utils import get_logger
+from core.tracing import traced
+from django.db.models import Prefetch, Value
+from django.db.models.functions import Upper
 
 
+@traced
 class GlobalLookupService:
     @staticmethod
     def get_all_licenses_by_email(email, context):
         """
         Lists all licenses associated with a given email across all brands.
+        Returns a queryset, so it only covers the current shard; sharded
+        deployments use the payload and page methods below.
         """
         log = get_logger(__name__, context)
         log.info("Cross-brand global lookup initiated", extra={"target_email": email})
@@ -14,8 +33,16 @@ class GlobalLookupService:
             # Fetch related brand and licenses with products
             results = (
                 LicenseKey.objects.filter(customer_email__iexact=email)
+                .order_by("created_at", "id")
                 .select_related("brand")
-                .prefetch_related("licenses__product")
+                .prefetch_related(
+                    Prefetch(
+                        "licenses",
+                        queryset=License.objects.select_related("product").order_by(
+                            "created_at", "id"
+                        ),
+                    )
+                )
             )
             log.info(
                 "Global lookup completed",
@@ -31,3 +58,206 @@ class GlobalLookupService:
                 "Global lookup failed", extra={"target_email": email, "error": str(e)}
             )
             return None
+
+    @staticmethod
+    def get_license_payloads_by_email(email, context, offset=0, limit=None):
+        """
+        Same documents as get_all_licenses_by_email + GlobalLicenseKeySerializer,
+        read from the customer's summary rows instead of model instances.
+        """
+        log = get_logger(__name__, context)
+        log.info("Cross-brand global lookup initiated", extra={"target_email": email})
+        try:
+            if sharding_enabled():
+                _, payloads = GlobalLookupService._gather(
+                    GlobalLookupService._shard_payloads, email, offset, limit
+                )
+            else:
+                payloads = GlobalLookupService._payloads(email, offset, limit)
+            log.info(
+                "Global lookup completed",
+                extra={
+                    "target_email": email,
+                    "results_count": len(payloads),
+                    "action": "US6_GLOBAL_LOOKUP",
+                },
+            )
+            return payloads
+        except Exception as e:
+            log.error(
+                "Global lookup failed", extra={"target_email": email, "error": str(e)}
+            )
+            return None
+
+    @staticmethod
+    def get_license_page(email, context, page=None, page_size=None):
+        """
+        The global lookup response, rendered in Python: every key of the
+        customer, or with `page_size` one page of them and the paging
+        fields.
+        """
+        offset = 0 if page_size is None else (page - 1) * page_size
+        if sharding_enabled():
+            gathered = GlobalLookupService._gather_or_none(
+                GlobalLookupService._shard_payloads,
+                email,
+                context,
+                offset,
+                page_size,
+            )
+            if gathered is None:
+                return None
+            total, payloads = gathered
+        else:
+            payloads = GlobalLookupService.get_license_payloads_by_email(
+                email, context, offset=offset, limit=page_size
+            )
+            if payloads is None:
+                return None
+            if page_size is None:
+                total = len(payloads)
+            else:
+                total = GlobalLookupService._summaries(email).count()
+        document = {"customer_email": email, "total_keys_found": total}
+        if page_size is not None:
+            document.update(GlobalLookupService._paging(total, page, page_size))
+        document["licenses"] = payloads
+        return document
+
+    @staticmethod
+    def get_license_page_json(email, context, page=None, page_size=None):
+        """
+        get_license_page assembled inside PostgreSQL in a single round
+        trip, returned as JSON text laid out like DRF's.
+        """
+        if sharding_enabled():
+            return GlobalLookupService._scatter_page_json(
+                email, context, page, page_size
+            )
+        log = get_logger(__name__, context)
+        log.info("Cross-brand global lookup initiated", extra={"target_email": email})
+        try:
+            if page_size is None:
+                document = fetch_json(CUSTOMER_SUMMARY_JSON_SQL, {"email": email})
+            else:
+                document = fetch_json(
+                    CUSTOMER_SUMMARY_PAGE_JSON_SQL,
+                    {
+                        "email": email,
+                        "page": page,
+                        "limit": page_size,
+                        "offset": (page - 1) * page_size,
+                    },
+                )
+            log.info(
+                "Global lookup completed",
+                extra={
+                    "target_email": email,
+                    "page": page,
+                    "action": "US6_GLOBAL_LOOKUP",
+                },
+            )
+            return drf_json(document)
+        except Exception as e:
+            log.error(
+                "Global lookup failed", extra={"target_email": email, "error": str(e)}
+            )
+            return None
+
+    @staticmethod
+    def _paging(total, page, page_size):
+        return {
+            "page": page,
+            "page_size": page_size,
+            "next_page": page + 1 if total > page * page_size else None,
+        }
+
+    @staticmethod
+    def _summaries(email):
+        return CustomerLicenseSummary.objects.filter(
+            email_key=Upper(Value(email))
+        ).order_by("created_at", "license_key_id")
+
+    @staticmethod
+    def _payloads(email, offset, limit):
+        documents = GlobalLookupService._summaries(email).values_list(
+            "document", flat=True
+        )
+        if limit is not None:
+            end = offset + limit
+            documents = documents[offset:end]
+        return [json.loads(document) for document in documents]
+
+    @staticmethod
+    def _shard_payloads(email, limit):
+        """
+        The first `limit` keys on the current shard (all if None), as
+        ((created_at, id), payload) pairs, plus the shard's match count.
+        """
+        total, documents = GlobalLookupService._shard_documents(email, limit)
+        return total, [(order, json.loads(document)) for order, document in documents]
+
+    @staticmethod
+    def _shard_documents(email, limit):
+        rows = fetch_rows(
+            CUSTOMER_SUMMARY_SHARD_JSON_SQL, {"email": email, "limit": limit}
+        )
+        total = rows[0][2] if rows else 0
+        return total, [((created_at, id_), doc) for created_at, id_, _, doc in rows]
+
+    @staticmethod
+    def _gather(fetch, email, offset, limit):
+        """
+        Scatter-gather: runs fetch(email, n) on every shard in parallel,
+        where n covers everything up to the end of the requested page, then
+        merges the shard results in (created_at, id) order and cuts the
+        page. Returns (total matches, items).
+        """
+        n = None if limit is None else offset + limit
+        results = scatter(lambda alias: fetch(email, n))
+        total = sum(shard_total for shard_total, _ in results)
+        merged = heapq.merge(*(items for _, items in results), key=itemgetter(0))
+        return total, [item for _, item in islice(merged, offset, n)]
+
+    @staticmethod
+    def _gather_or_none(fetch, email, context, offset, limit):
+        log = get_logger(__name__, context)
+        log.info(
+            "Cross-brand global lookup initiated",
+            extra={"target_email": email, "shards": "all"},
+        )
+        try:
+            total, items = GlobalLookupService._gather(fetch, email, offset, limit)
+        except Exception as e:
+            log.error(
+                "Global lookup failed", extra={"target_email": email, "error": str(e)}
+            )
+            return None
+        log.info(
+            "Global lookup completed",
+            extra={
+                "target_email": email,
+                "results_count": len(items),
+                "action": "US6_GLOBAL_LOOKUP",
+            },
+        )
+        return total, items
+
+    @staticmethod
+    def _scatter_page_json(email, context, page, page_size):
+        """
+        get_license_page_json across shards: each shard assembles its key
+        documents in PostgreSQL; only the envelope is built here.
+        """
+        offset = 0 if page_size is None else (page - 1) * page_size
+        gathered = GlobalLookupService._gather_or_none(
+            GlobalLookupService._shard_documents, email, context, offset, page_size
+        )
+        if gathered is None:
+            return None
+        total, documents = gathered
+        envelope = {"customer_email": email, "total_keys_found": total}
+        if page_size is not None:
+            envelope.update(GlobalLookupService._paging(total, page, page_size))
+        envelope = json.dumps(envelope, ensure_ascii=False)
+        return drf_json(f'{envelope[:-1]}, "licenses": [{", ".join(documents)}]}}')
@@ -1,11 +1,17 @@
 import secrets
 from django.db import transaction, IntegrityError
 from django.utils import timezone
+from licenses.compact import encode_key
+from licenses.invalidation import KEY_TOPIC, STATUS_TOPIC, bus, status_key
 from licenses.models import LicenseKey, License, Product
+from licenses.services.usage import UsageService
+from licenses.sharding import current_alias
 from core.logging_utils import get_logger
+from core.tracing import traced
 from rest_framework.exceptions import ValidationError
 
 
+@traced
 class ProvisioningService:
     @staticmethod
     def provision_license_bundle(
@@ -36,12 +42,12 @@ class ProvisioningService:
                     "One or more product IDs are invalid for this brand."
                 )
 
-            with transaction.atomic():
+            with transaction.atomic(using=current_alias()):
                 if existing_key:
                     try:
                         license_key = LicenseKey.objects.select_for_update().get(
                             brand=brand,
-                            key_string=existing_key,
+                            key_bytes=encode_key(existing_key),
                             customer_email=customer_email,
                         )
                     except LicenseKey.DoesNotExist:
@@ -81,6 +87,13 @@ class ProvisioningService:
                         for p_id in new_product_ids
                     ]
                     License.objects.bulk_create(new_license_objs)
+                    UsageService.record_many(
+                        (brand.id, p_id, {"licenses_valid": 1})
+                        for p_id in new_product_ids
+                    )
+                    bus.publish(
+                        STATUS_TOPIC, [status_key(brand.id, license_key.key_string)]
+                    )
             log.info(
                 "Provisioning successful",
                 extra={
@@ -103,11 +116,17 @@ class ProvisioningService:
         """
         for _ in range(3):
             try:
-                return LicenseKey.objects.create(
-                    brand=brand,
-                    customer_email=customer_email,
-                    key_string=f"G1-{secrets.token_hex(12).upper()}",
-                )
+                with transaction.atomic(using=current_alias()):
+                    license_key = LicenseKey.objects.create(
+                        brand=brand,
+                        customer_email=customer_email,
+                        key_string=f"G1-{secrets.token_hex(12).upper()}",
+                    )
+                    # Every worker's key filter learns the key on commit.
+                    bus.publish(
+                        KEY_TOPIC, [status_key(brand.id, license_key.key_string)]
+                    )
             except IntegrityError:
                 continue
+            return license_key
         raise ValidationError("Unable to generate a unique license key.")
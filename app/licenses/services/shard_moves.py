@@ -0,0 +1,225 @@
+import time
+from datetime import timedelta
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from licenses.models import (
+    Activation,
+    ArchivedLicenseKey,
+    AuditLog,
+    Brand,
+    BrandShard,
+    IdempotencyRecord,
+    Job,
+    License,
+    LicenseKey,
+    LicenseKeyChange,
+    Product,
+    UsageDelta,
+    UsageRollup,
+)
+from licenses.invalidation import BRAND_TOPIC, bus
+from licenses.sharding import brand_lock_id
+from core.logging_utils import get_logger
+from core.tracing import traced
+from rest_framework.exceptions import ValidationError
+
+# Parents before children, with the lookup selecting one brand's rows.
+# Customer summaries and change feed positions are not copied: the target's
+# triggers write them as the rows arrive (seat counts once the target's
+# refresh_customer_summaries catches up), and the source's drop the
+# summaries as the rows are deleted (see _delete_brand for the positions).
+MOVE_PLAN = (
+    (Brand, "id"),
+    (Product, "brand_id"),
+    (LicenseKey, "brand_id"),
+    (License, "license_key__brand_id"),
+    (Activation, "license__license_key__brand_id"),
+    (IdempotencyRecord, "brand_id"),
+    (Job, "brand_id"),
+    (UsageRollup, "brand_id"),
+    (UsageDelta, "brand_id"),
+    (AuditLog, "brand_id"),
+    (ArchivedLicenseKey, "brand_id"),
+)
+
+# Column marking a row as changed, for models without updated_at.
+CHANGED_FIELDS = {AuditLog: "created_at", ArchivedLicenseKey: "archived_at"}
+
+# Those columns are stamped by each app server's clock, so the delta copy
+# also takes rows stamped up to this long before the copy started.
+CLOCK_SKEW_MARGIN = timedelta(minutes=5)
+
+
+@traced
+class BrandMoveService:
+    @staticmethod
+    def move(brand_id, target, context, batch_size=1000, drain_seconds=2.0):
+        """
+        Moves one brand's rows to another shard while it keeps serving.
+
+        1. Bulk copy every row while the brand stays writable.
+        2. Mark the brand read-only in the directory (writes get 503) and
+           take the brand's write lock exclusively on the source, which
+           waits for in-flight writes to finish (see hold_brand_writes).
+        3. Copy rows changed since step 1 started and drop rows deleted
+           meanwhile; this delta is small, so the read-only window is short.
+        4. Point the directory at the target and reopen writes.
+        5. Wait, for workers to drop cached directory entries and stop
+           reading the source, and delete the brand's rows from it.
+
+        Copies are upserts, so a failed move can simply be run again.
+        """
+        log = get_logger(__name__, context)
+        entry = BrandShard.objects.get(brand_id=brand_id)
+        source = entry.shard
+        if source == target:
+            raise ValidationError(f"Brand is already on {target}.")
+        if target not in connections.settings:
+            raise ValidationError(f"Unknown shard {target}.")
+        log.info(
+            "Brand move started",
+            extra={"source": source, "target": target, "action": "SHARD_MOVE"},
+        )
+
+        with connections[source].cursor() as cursor:
+            cursor.execute("SELECT now()")
+            started = cursor.fetchone()[0] - CLOCK_SKEW_MARGIN
+        copied = BrandMoveService._copy(brand_id, source, target, batch_size)
+        log.info("Brand bulk copy done", extra={"rows": copied})
+
+        BrandShard.objects.filter(brand_id=brand_id).update(read_only=True)
+        bus.publish(BRAND_TOPIC, [brand_id], using=DEFAULT_DB_ALIAS)
+        try:
+            BrandMoveService._wait_for_writes(brand_id, source)
+            with transaction.atomic(using=target):
+                changed = BrandMoveService._copy(
+                    brand_id, source, target, batch_size, since=started
+                )
+                removed = BrandMoveService._drop_deleted(brand_id, source, target)
+            # Only once the target has committed the final delta.
+            BrandShard.objects.filter(brand_id=brand_id).update(
+                shard=target, read_only=False
+            )
+            bus.publish(BRAND_TOPIC, [brand_id], using=DEFAULT_DB_ALIAS)
+        finally:
+            # On failure the brand stays on the source shard, writable.
+            if BrandShard.objects.filter(brand_id=brand_id, shard=source).update(
+                read_only=False
+            ):
+                bus.publish(BRAND_TOPIC, [brand_id], using=DEFAULT_DB_ALIAS)
+        log.info(
+            "Brand switched to target shard",
+            extra={"changed": changed, "removed": removed},
+        )
+
+        # Workers that cached the directory entry drop it within moments;
+        # until then they may still read, but not write, the source.
+        time.sleep(drain_seconds)
+        BrandMoveService._delete_brand(brand_id, source)
+        log.info(
+            "Brand move completed",
+            extra={"source": source, "target": target, "action": "SHARD_MOVE"},
+        )
+        return {"copied": copied, "changed": changed, "removed": removed}
+
+    @staticmethod
+    def _wait_for_writes(brand_id, alias):
+        """
+        Returns once no write to the brand is in flight on `alias`. Writers
+        starting later see the brand read-only and refuse.
+        """
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s)", [brand_lock_id(brand_id)]
+            )
+
+    @staticmethod
+    def _rows(model, lookup, brand_id, alias):
+        return model.objects.using(alias).filter(**{lookup: brand_id}).order_by()
+
+    @staticmethod
+    def _copy(brand_id, source, target, batch_size, since=None):
+        total = 0
+        for model, lookup in MOVE_PLAN:
+            rows = BrandMoveService._rows(model, lookup, brand_id, source)
+            if since is not None:
+                changed_field = CHANGED_FIELDS.get(model, "updated_at")
+                rows = rows.filter(**{f"{changed_field}__gte": since})
+            fields = model._meta.concrete_fields
+            batch = []
+            for values in rows.values_list(*(f.attname for f in fields)).iterator(
+                chunk_size=batch_size
+            ):
+                batch.append(values)
+                if len(batch) >= batch_size:
+                    total += BrandMoveService._upsert(model, batch, target)
+                    batch = []
+            if batch:
+                total += BrandMoveService._upsert(model, batch, target)
+        return total
+
+    @staticmethod
+    def _upsert(model, rows, alias):
+        """
+        Multi-row INSERT ... ON CONFLICT. Raw SQL rather than bulk_create,
+        which would overwrite created_at/updated_at (auto_now fields).
+        """
+        connection = connections[alias]
+        fields = model._meta.concrete_fields
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(f.column) for f in fields)
+        placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        if model is AuditLog:
+            # Append-only, partitioned on (id, created_at).
+            conflict = "ON CONFLICT DO NOTHING"
+        else:
+            updates = ", ".join(
+                f"{quote(f.column)} = EXCLUDED.{quote(f.column)}"
+                for f in fields
+                if not f.primary_key
+            )
+            conflict = (
+                f"ON CONFLICT ({quote(model._meta.pk.column)}) DO UPDATE SET {updates}"
+            )
+        params = [
+            field.get_db_prep_save(value, connection)
+            for values in rows
+            for field, value in zip(fields, values)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+                f"VALUES {', '.join([placeholders] * len(rows))} {conflict}",
+                params,
+            )
+        return len(rows)
+
+    @staticmethod
+    def _drop_deleted(brand_id, source, target):
+        removed = 0
+        for model, lookup in reversed(MOVE_PLAN):
+            if model is AuditLog:
+                continue
+            source_ids = set(
+                BrandMoveService._rows(model, lookup, brand_id, source).values_list(
+                    "pk", flat=True
+                )
+            )
+            target_ids = BrandMoveService._rows(
+                model, lookup, brand_id, target
+            ).values_list("pk", flat=True)
+            stale = [pk for pk in target_ids if pk not in source_ids]
+            if stale:
+                removed += len(stale)
+                model.objects.using(target).filter(pk__in=stale)._raw_delete(target)
+        return removed
+
+    @staticmethod
+    def _delete_brand(brand_id, alias):
+        # Children first, so every delete is a plain DELETE without cascades.
+        for model, lookup in reversed(MOVE_PLAN):
+            BrandMoveService._rows(model, lookup, brand_id, alias)._raw_delete(alias)
+        # The key deletes left tombstones no feed reader will ask for here:
+        # cursors issued by this shard restart on the target.
+        LicenseKeyChange.objects.using(alias).filter(brand_id=brand_id)._raw_delete(
+            alias
+        )
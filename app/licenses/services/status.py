@@ -1,8 +1,65 @@
-from licenses.models import LicenseKey, License
+from django.conf import settings
+from licenses.coalescing import SingleFlight, shared_flight
+from licenses.compact import decode_key, encode_key
+from licenses.invalidation import STATUS_TOPIC, LocalCache, bus, status_key
+from licenses.keyfilter import key_filter
+from licenses.models import Activation, LicenseKey, License
+from licenses.payloads import (
+    LICENSE_STATUS_BATCH_JSON_SQL,
+    LICENSE_STATUS_JSON_SQL,
+    entitlement_rows,
+    fetch_json,
+    iter_json_rows,
+    render_license_status,
+)
+from licenses.renderers import drf_json
+from licenses.services.archive import ArchiveService
+from licenses.sharding import current_alias
 from core.logging_utils import get_logger
+from core.tracing import traced
 from django.db.models import Prefetch
 
+# Pre-rendered status documents by status_key(brand id, key string). The
+# services publish the key whenever its licenses or seats change.
+status_cache = LocalCache(STATUS_TOPIC, "STATUS_CACHE_SIZE", "STATUS_CACHE_SECONDS")
+# Status computations in progress, by the same key; detached on publish.
+status_flight = SingleFlight(STATUS_TOPIC)
 
+
+def get_license_status_coalesced(brand, key_string, context):
+    """
+    The status document in ENTITLEMENT_RENDER_MODE, computed once for
+    concurrent requests for the same key: within this worker, and across
+    workers through STATUS_COALESCE_CACHE when set and the invalidation
+    listener is connected. Requests that join another's computation share
+    its document or error.
+    """
+    if settings.ENTITLEMENT_RENDER_MODE == "database":
+        compute = StatusService.get_license_status_json
+    else:
+        compute = StatusService.get_license_status_payload
+
+    def load():
+        # Without the listener, writes in other workers go unnoticed.
+        if settings.STATUS_COALESCE_CACHE and bus.active():
+            # Keyed by the key's own generation, so writes to other keys
+            # do not split the flight.
+            key = status_key(brand.id, key_string)
+            generation = bus.key_generation(current_alias(), STATUS_TOPIC, key)
+            return shared_flight(
+                settings.STATUS_COALESCE_CACHE,
+                f"{key}:{generation}",
+                lambda: compute(brand, key_string, context),
+                settings.STATUS_COALESCE_LOCK_SECONDS,
+            )
+        return compute(brand, key_string, context)
+
+    if not settings.STATUS_COALESCE_ENABLED:
+        return compute(brand, key_string, context)
+    return status_flight.do(status_key(brand.id, key_string), load)
+
+
+@traced
 class StatusService:
     @staticmethod
     def get_license_status(brand, key_string, context):
@@ -12,16 +69,23 @@ class StatusService:
         """
         log = get_logger(__name__, context)
         log.info("License status check", extra={"key": key_string})
+        if not key_filter.might_exist(brand, key_string):
+            log.warning("Status check rejected: Unknown key", extra={"key": key_string})
+            return None
 
         try:
             license_key = LicenseKey.objects.prefetch_related(
                 Prefetch(
                     "licenses",
-                    queryset=License.objects.select_related("product").prefetch_related(
-                        "activations"
-                    ),
+                    queryset=License.objects.select_related("product")
+                    .prefetch_related(
+                        Prefetch(
+                            "activations", queryset=Activation.objects.with_liveness()
+                        )
+                    )
+                    .order_by("created_at", "id"),
                 )
-            ).get(brand=brand, key_string=key_string)
+            ).get(brand=brand, key_bytes=encode_key(key_string))
             log.info(
                 "Status check successful",
                 extra={"key": key_string, "action": "US4_STATUS"},
@@ -30,3 +94,163 @@ class StatusService:
         except LicenseKey.DoesNotExist:
             log.warning("Status check failed: Key not found", extra={"key": key_string})
             return None
+
+    @staticmethod
+    def get_license_status_payload(brand, key_string, context):
+        """
+        Same document as get_license_status + LicenseStatusResponseSerializer,
+        built from two flat queries with seat counts aggregated in SQL.
+        Returns None if the key does not exist for this brand.
+        """
+        log = get_logger(__name__, context)
+        log.info("License status check", extra={"key": key_string})
+        if not key_filter.might_exist(brand, key_string):
+            log.warning("Status check rejected: Unknown key", extra={"key": key_string})
+            return None
+
+        key_row = (
+            LicenseKey.objects.filter(brand=brand, key_bytes=encode_key(key_string))
+            .values("id", "customer_email")
+            .first()
+        )
+        if key_row is None:
+            return StatusService._archived(brand, key_string, log)
+        key_row["key_string"] = key_string
+
+        payload = render_license_status(
+            key_row, entitlement_rows(license_key_id=key_row["id"])
+        )
+        log.info(
+            "Status check successful",
+            extra={"key": key_string, "action": "US4_STATUS"},
+        )
+        return payload
+
+    @staticmethod
+    def get_license_status_json(brand, key_string, context):
+        """
+        Builds the status document inside PostgreSQL in one round trip,
+        without instantiating any model, and returns it as JSON text laid
+        out like DRF's (drf_json), or from status_cache. Returns None if the
+        key does not exist for this brand.
+        """
+        log = get_logger(__name__, context)
+        log.info("License status check", extra={"key": key_string})
+        if not key_filter.might_exist(brand, key_string):
+            log.warning("Status check rejected: Unknown key", extra={"key": key_string})
+            return None
+
+        cache_key = status_key(brand.id, key_string)
+        document = status_cache.get(cache_key)
+        if document is not None:
+            return document
+        token = status_cache.token(cache_key)
+        document = fetch_json(
+            LICENSE_STATUS_JSON_SQL,
+            {"brand_id": brand.id, "key_bytes": encode_key(key_string)},
+        )
+        if document is None:
+            archived = StatusService._archived(brand, key_string, log)
+            return None if archived is None else drf_json(archived)
+        document = drf_json(document)
+        status_cache.put(cache_key, document, token)
+        log.info(
+            "Status check successful",
+            extra={"key": key_string, "action": "US4_STATUS"},
+        )
+        return document
+
+    @staticmethod
+    def _archived(brand, key_string, log):
+        """
+        Fallback for keys missing from the hot tables: the document stored
+        when the key was archived, or None if the key never existed.
+        """
+        document = ArchiveService.get_document(brand, key_string)
+        if document is None:
+            log.warning("Status check failed: Key not found", extra={"key": key_string})
+            return None
+        log.info(
+            "Status check served from archive",
+            extra={"key": key_string, "action": "US4_STATUS_ARCHIVED"},
+        )
+        return document
+
+    @staticmethod
+    def _candidate_keys(brand, key_strings, log):
+        candidates = [k for k in key_strings if key_filter.might_exist(brand, k)]
+        log.info(
+            "Batch status check",
+            extra={
+                "requested": len(key_strings),
+                "candidates": len(candidates),
+                "action": "US4_STATUS_BATCH",
+            },
+        )
+        return candidates
+
+    @staticmethod
+    def get_license_statuses_payload(brand, key_strings, context):
+        """
+        Status documents for many keys of one brand in two queries,
+        regardless of batch size. Returns {key_string: payload} for the keys
+        that exist; missing keys are simply absent.
+        """
+        log = get_logger(__name__, context)
+        candidates = StatusService._candidate_keys(brand, key_strings, log)
+        if not candidates:
+            return {}
+
+        key_rows = {
+            row["id"]: {**row, "key_string": decode_key(row["key_bytes"])}
+            for row in LicenseKey.objects.filter(
+                brand=brand, key_bytes__in=[encode_key(key) for key in candidates]
+            ).values("id", "key_bytes", "customer_email")
+        }
+        rows_by_key = {key_id: [] for key_id in key_rows}
+        for row in entitlement_rows(license_key_id__in=list(key_rows)):
+            rows_by_key[row["license_key_id"]].append(row)
+        payloads = {
+            key_row["key_string"]: render_license_status(key_row, rows_by_key[key_id])
+            for key_id, key_row in key_rows.items()
+        }
+        missing = [key for key in candidates if key not in payloads]
+        payloads.update(ArchiveService.get_documents(brand, missing))
+        return payloads
+
+    @staticmethod
+    def iter_license_statuses_json(brand, key_strings, context):
+        """
+        Status documents for many keys of one brand, assembled by PostgreSQL
+        in a single query. Returns an iterator of (key_string, json_text)
+        for the keys that exist, read as rows are fetched, so large batches
+        can be streamed.
+        """
+        log = get_logger(__name__, context)
+        candidates = StatusService._candidate_keys(brand, key_strings, log)
+        if not candidates:
+            return iter(())
+        return StatusService._with_archived(
+            brand,
+            candidates,
+            iter_json_rows(
+                LICENSE_STATUS_BATCH_JSON_SQL,
+                {
+                    "brand_id": brand.id,
+                    "key_bytes": [encode_key(key) for key in candidates],
+                },
+                using=current_alias(),
+            ),
+            using=current_alias(),
+        )
+
+    @staticmethod
+    def _with_archived(brand, candidates, rows, using):
+        found = set()
+        for key_string, document in rows:
+            found.add(key_string)
+            yield key_string, drf_json(document)
+        missing = [key for key in candidates if key not in found]
+        archived = ArchiveService.get_documents(brand, missing, using=using)
+        for key_string, document in archived.items():
+            yield key_string, drf_json(document)
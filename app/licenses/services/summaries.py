@@ -0,0 +1,213 @@
+from django.db import connections, transaction
+from licenses.models import CustomerLicenseSummary, LicenseKey
+from licenses.sharding import current_alias
+from core.logging_utils import get_logger
+from core.tracing import traced
+
+# Keys of the batch whose summary is missing or differs from a fresh render,
+# other than those waiting for refresh_pending.
+STALE_SUMMARIES_SQL = """
+SELECT k.id
+FROM unnest(%(key_ids)s::uuid[]) AS k (id)
+LEFT JOIN licenses_customerlicensesummary s ON s.license_key_id = k.id
+LEFT JOIN licenses_customer_summary_rows(%(key_ids)s::uuid[]) r
+    ON r.license_key_id = k.id
+WHERE (
+        s.license_key_id IS NULL
+        OR (s.email_key, s.created_at, s.document)
+            IS DISTINCT FROM (r.email_key, r.created_at, r.document)
+    )
+    AND (s.refresh_after IS NULL OR s.refresh_after > now())
+    AND NOT EXISTS (
+        SELECT 1 FROM licenses_customersummaryrefresh q
+        WHERE q.license_key_id = k.id
+    )
+"""
+
+# When each summary's seat counts next go stale: the first expiry among
+# the leases it counts as live, NULL for none.
+SCHEDULE_SUMMARIES_SQL = """
+UPDATE licenses_customerlicensesummary s
+SET refresh_after = next.expires_at
+FROM (
+    SELECT k.id, (
+        SELECT min(a.lease_expires_at)
+        FROM licenses_license l
+        JOIN licenses_activation a ON a.license_id = l.id
+        WHERE l.license_key_id = k.id AND a.lease_expires_at > now()
+    ) AS expires_at
+    FROM unnest(%(key_ids)s::uuid[]) AS k (id)
+) next
+WHERE s.license_key_id = next.id
+    AND s.refresh_after IS DISTINCT FROM next.expires_at
+"""
+
+# Takes one batch of queued keys, oldest first, with how often each was queued.
+TAKE_REFRESHES_SQL = """
+WITH taken AS (
+    DELETE FROM licenses_customersummaryrefresh
+    WHERE id IN (
+        SELECT id FROM licenses_customersummaryrefresh
+        ORDER BY id LIMIT %(batch_size)s
+    )
+    RETURNING license_key_id
+)
+SELECT license_key_id, count(*) FROM taken GROUP BY license_key_id
+"""
+
+# Summaries counting a lease that has expired since they were written.
+DUE_SUMMARIES_SQL = """
+SELECT license_key_id FROM licenses_customerlicensesummary
+WHERE refresh_after <= now()
+ORDER BY refresh_after
+LIMIT %(batch_size)s
+"""
+
+
+@traced
+class CustomerSummaryService:
+    """
+    Maintenance of CustomerLicenseSummary. Key and license inserts and
+    deletes refresh it in their own transaction; activation and license
+    updates only queue the key, and refresh_pending catches up, along with
+    summaries whose counted leases have since expired. The rest is for
+    repair and verification.
+    """
+
+    @staticmethod
+    def refresh(key_ids):
+        """
+        Re-renders the summaries of `key_ids`, dropping those of deleted keys.
+        """
+        key_ids = list(key_ids)
+        with connections[current_alias()].cursor() as cursor:
+            cursor.execute(
+                "SELECT licenses_refresh_customer_summaries(%s::uuid[])", [key_ids]
+            )
+            cursor.execute(SCHEDULE_SUMMARIES_SQL, {"key_ids": key_ids})
+
+    @staticmethod
+    def refresh_pending(batch_size, context):
+        """
+        Refreshes up to `batch_size` queued keys of the current shard, and
+        up to `batch_size` summaries due because a lease expired. One
+        refresher runs at a time per shard: the others return 0 straight
+        away. Returns the number of queue entries and due summaries taken.
+        """
+        alias = current_alias()
+        params = {"batch_size": batch_size}
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_try_advisory_xact_lock("
+                    "hashtext('licenses_summary_refresh'))"
+                )
+                if not cursor.fetchone()[0]:
+                    return 0
+                cursor.execute(TAKE_REFRESHES_SQL, params)
+                queued = dict(cursor.fetchall())
+                cursor.execute(DUE_SUMMARIES_SQL, params)
+                due = [row[0] for row in cursor.fetchall()]
+            keys = sorted(set(queued) | set(due))
+            if keys:
+                CustomerSummaryService.refresh(keys)
+            if due:
+                # No write marked these: their seat counts changed by time.
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        "SELECT licenses_record_key_changes(%s::uuid[])", [due]
+                    )
+        if keys:
+            get_logger(__name__, context).info(
+                "Customer summaries refreshed",
+                extra={
+                    "queued": sum(queued.values()),
+                    "due": len(due),
+                    "keys": len(keys),
+                    "action": "SUMMARY_REFRESH",
+                },
+            )
+        return sum(queued.values()) + len(due)
+
+    @staticmethod
+    def key_batches(batch_size):
+        """
+        Yields every license key id on the current shard, in id order,
+        `batch_size` at a time.
+        """
+        last = None
+        while True:
+            keys = LicenseKey.objects.order_by("id")
+            if last is not None:
+                keys = keys.filter(id__gt=last)
+            ids = list(keys.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return
+            yield ids
+            last = ids[-1]
+
+    @staticmethod
+    def orphaned_keys():
+        """
+        Summary rows whose license key no longer exists.
+        """
+        return list(
+            CustomerLicenseSummary.objects.exclude(
+                license_key_id__in=LicenseKey.objects.values("id")
+            ).values_list("license_key_id", flat=True)
+        )
+
+    @staticmethod
+    def rebuild(batch_size, context):
+        """
+        Re-renders every summary on the current shard, one transaction
+        per batch. Returns the number of keys processed.
+        """
+        log = get_logger(__name__, context)
+        total = 0
+        for ids in CustomerSummaryService.key_batches(batch_size):
+            with transaction.atomic(using=current_alias()):
+                CustomerSummaryService.refresh(ids)
+            total += len(ids)
+        orphans = CustomerSummaryService.orphaned_keys()
+        if orphans:
+            CustomerSummaryService.refresh(orphans)
+        log.info(
+            "Customer summaries rebuilt",
+            extra={"keys": total, "orphans": len(orphans), "action": "SUMMARY_REBUILD"},
+        )
+        return total
+
+    @staticmethod
+    def check(batch_size, context, fix=False):
+        """
+        Compares every stored summary with a fresh render. Returns
+        {"checked": n, "stale": [key ids], "orphaned": [key ids]};
+        with `fix`, the differing summaries are refreshed as they are found.
+        """
+        log = get_logger(__name__, context)
+        alias = current_alias()
+        checked, stale = 0, []
+        for ids in CustomerSummaryService.key_batches(batch_size):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(STALE_SUMMARIES_SQL, {"key_ids": ids})
+                found = [row[0] for row in cursor.fetchall()]
+            if found and fix:
+                CustomerSummaryService.refresh(found)
+            stale.extend(found)
+            checked += len(ids)
+        orphaned = CustomerSummaryService.orphaned_keys()
+        if orphaned and fix:
+            CustomerSummaryService.refresh(orphaned)
+        if stale or orphaned:
+            log.warning(
+                "Customer summaries inconsistent",
+                extra={
+                    "checked": checked,
+                    "stale": len(stale),
+                    "orphaned": len(orphaned),
+                    "fixed": fix,
+                    "action": "SUMMARY_CHECK",
+                },
+            )
+        return {"checked": checked, "stale": stale, "orphaned": orphaned}
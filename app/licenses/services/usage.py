@@ -0,0 +1,240 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from core.ids import uuid7
+from licenses.models import LICENSE_STATUS_CHOICES, Product, UsageDelta, UsageRollup
+from licenses.sharding import current_alias
+from core.logging_utils import get_logger
+from core.tracing import traced
+
+# Counted per day.
+EVENTS = ("activations", "deactivations")
+# Running totals: a rollup row holds them as of the end of its day.
+LEVELS = ("seats_used", "licenses_valid", "licenses_suspended", "licenses_cancelled")
+COUNTERS = EVENTS + LEVELS
+
+# Takes one batch of deltas, oldest first, summed per product and day.
+TAKE_DELTAS_SQL = f"""
+WITH taken AS (
+    DELETE FROM licenses_usagedelta
+    WHERE id IN (
+        SELECT id FROM licenses_usagedelta ORDER BY id LIMIT %(batch_size)s
+    )
+    RETURNING brand_id, product_id, day, {", ".join(COUNTERS)}
+)
+SELECT brand_id, product_id, day, count(*),
+    {", ".join(f"sum({c})" for c in COUNTERS)}
+FROM taken
+GROUP BY brand_id, product_id, day
+ORDER BY brand_id, product_id, day
+"""
+
+# Starts a product's row for a day, carrying the levels over from its
+# last earlier row.
+OPEN_DAY_SQL = f"""
+INSERT INTO licenses_usagerollup (
+    id, created_at, updated_at, brand_id, product_id, day, {", ".join(COUNTERS)}
+)
+SELECT %(id)s, %(now)s, %(now)s, %(brand_id)s, %(product_id)s, %(day)s,
+    {", ".join(["0"] * len(EVENTS) + [f"COALESCE(prev.{c}, 0)" for c in LEVELS])}
+FROM (SELECT 1) AS one
+LEFT JOIN LATERAL (
+    SELECT * FROM licenses_usagerollup
+    WHERE brand_id = %(brand_id)s AND product_id = %(product_id)s
+        AND day < %(day)s
+    ORDER BY day DESC
+    LIMIT 1
+) prev ON true
+ON CONFLICT (brand_id, product_id, day) DO NOTHING
+"""
+
+# Adds the day's events to its row and the level changes to its row and
+# every later one (there are later rows only when folding lags behind).
+_APPLY_EVENTS = [
+    f"{c} = {c} + CASE WHEN day = %(day)s THEN %({c})s ELSE 0 END" for c in EVENTS
+]
+_APPLY_LEVELS = [f"{c} = {c} + %({c})s" for c in LEVELS]
+APPLY_DELTA_SQL = f"""
+UPDATE licenses_usagerollup
+SET {", ".join(_APPLY_EVENTS + _APPLY_LEVELS)}, updated_at = %(now)s
+WHERE brand_id = %(brand_id)s AND product_id = %(product_id)s AND day >= %(day)s
+"""
+
+# Each product's levels as of the end of the day before the report.
+OPENING_LEVELS_SQL = f"""
+SELECT p.id, {", ".join(f"r.{c}" for c in LEVELS)}
+FROM unnest(%(product_ids)s::uuid[]) AS p (id)
+JOIN LATERAL (
+    SELECT * FROM licenses_usagerollup
+    WHERE brand_id = %(brand_id)s AND product_id = p.id AND day < %(start)s
+    ORDER BY day DESC
+    LIMIT 1
+) r ON true
+"""
+
+
+def status_change(old_status, new_status):
+    """
+    Usage counters for a license moving from one status to another.
+    """
+    if old_status == new_status:
+        return {}
+    return {f"licenses_{old_status}": -1, f"licenses_{new_status}": 1}
+
+
+@traced
+class UsageService:
+    """
+    Activation trends and seat utilization per brand, product and day.
+    Services record changes as UsageDelta rows in their own transaction
+    (an insert, so hot products do not contend on one counter row);
+    `manage.py rollup_usage` folds them into UsageRollup. Reports read
+    the rollups plus the deltas not folded yet, so they are current and
+    never touch licenses or activations.
+    Seats used counts activation rows, like the seat check: an expired
+    lease stops counting once reclaim_leases deletes it.
+    """
+
+    @staticmethod
+    def record(brand_id, product_id, **counts):
+        UsageService.record_many([(brand_id, product_id, counts)])
+
+    @staticmethod
+    def record_many(changes):
+        """
+        Records (brand_id, product_id, {counter: change}) entries as one
+        delta per product.
+        """
+        totals = defaultdict(Counter)
+        for brand_id, product_id, counts in changes:
+            totals[(brand_id, product_id)].update(counts)
+        day = timezone.now().date()
+        deltas = [
+            UsageDelta(brand_id=brand_id, product_id=product_id, day=day, **counts)
+            for (brand_id, product_id), counts in totals.items()
+            if any(counts.values())
+        ]
+        if deltas:
+            UsageDelta.objects.bulk_create(deltas)
+
+    @staticmethod
+    def fold(batch_size, context):
+        """
+        Folds up to `batch_size` deltas of the current shard into the
+        rollups. One folder runs at a time per shard: the others return 0
+        straight away. Returns the number of deltas folded.
+        """
+        alias = current_alias()
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_try_advisory_xact_lock(hashtext('licenses_usage_fold'))"
+                )
+                if not cursor.fetchone()[0]:
+                    return 0
+                cursor.execute(TAKE_DELTAS_SQL, {"batch_size": batch_size})
+                groups = cursor.fetchall()
+                now = timezone.now()
+                for brand_id, product_id, day, _, *counts in groups:
+                    params = {
+                        "id": uuid7(),
+                        "now": now,
+                        "brand_id": brand_id,
+                        "product_id": product_id,
+                        "day": day,
+                        **dict(zip(COUNTERS, counts)),
+                    }
+                    cursor.execute(OPEN_DAY_SQL, params)
+                    cursor.execute(APPLY_DELTA_SQL, params)
+        folded = sum(group[3] for group in groups)
+        if folded:
+            get_logger(__name__, context).info(
+                "Usage deltas folded",
+                extra={
+                    "deltas": folded,
+                    "rows": len(groups),
+                    "action": "USAGE_ROLLUP",
+                },
+            )
+        return folded
+
+    @staticmethod
+    def report(brand, start, end, product_ids=None):
+        """
+        Daily usage of the brand's products from `start` to `end`
+        (inclusive): one entry per product with one row per day.
+        """
+        products = Product.objects.filter(brand=brand).order_by("name", "id")
+        if product_ids:
+            products = products.filter(id__in=product_ids)
+        products = list(products.values("id", "name"))
+        ids = [product["id"] for product in products]
+
+        opening = {}
+        with connections[current_alias()].cursor() as cursor:
+            cursor.execute(
+                OPENING_LEVELS_SQL,
+                {"product_ids": ids, "brand_id": brand.id, "start": start},
+            )
+            for product_id, *levels in cursor.fetchall():
+                opening[product_id] = dict(zip(LEVELS, levels))
+        rows = {
+            (row["product_id"], row["day"]): row
+            for row in UsageRollup.objects.filter(
+                brand=brand, product_id__in=ids, day__range=(start, end)
+            ).values("product_id", "day", *COUNTERS)
+        }
+        pending = defaultdict(dict)
+        for row in (
+            UsageDelta.objects.filter(brand=brand, product_id__in=ids, day__lte=end)
+            .values("product_id", "day")
+            .annotate(**{c: Sum(c) for c in COUNTERS})
+        ):
+            pending[row["product_id"]][row["day"]] = row
+
+        days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+        report = []
+        for product in products:
+            product_id = product["id"]
+            # Levels from the rollups, and what pending deltas add to them.
+            level = opening.get(product_id, dict.fromkeys(LEVELS, 0))
+            deltas = pending[product_id]
+            shift = Counter()
+            for day, delta in deltas.items():
+                if day < start:
+                    shift.update({c: delta[c] for c in LEVELS})
+            series = []
+            for day in days:
+                row = rows.get((product_id, day))
+                events = Counter()
+                if row is not None:
+                    level = {c: row[c] for c in LEVELS}
+                    events.update({c: row[c] for c in EVENTS})
+                delta = deltas.get(day)
+                if delta is not None:
+                    shift.update({c: delta[c] for c in LEVELS})
+                    events.update({c: delta[c] for c in EVENTS})
+                series.append(
+                    {
+                        "day": day,
+                        "activations": events["activations"],
+                        "deactivations": events["deactivations"],
+                        "seats_used": level["seats_used"] + shift["seats_used"],
+                        "licenses": {
+                            status: level[f"licenses_{status}"]
+                            + shift[f"licenses_{status}"]
+                            for status, _ in LICENSE_STATUS_CHOICES
+                        },
+                    }
+                )
+            report.append(
+                {
+                    "product_id": product_id,
+                    "product_name": product["name"],
+                    "peak_seats_used": max(day["seats_used"] for day in series),
+                    "days": series,
+                }
+            )
+        return report
@@ -0,0 +1,228 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework import exceptions, status
+from .invalidation import BRAND_TOPIC, LocalCache
+
+# Database alias holding the brand served by the current request or job.
+_current_shard = ContextVar("license_shard", default=None)
+
+# (alias, lock id) of the brand write locks held by the current request.
+_write_locks = ContextVar("license_brand_write_locks", default=())
+
+_executor = None
+
+# Resolved brands by (lookup field, value), evicted by brand id. One
+# stripe: the id is unknown until the brand is loaded.
+brand_cache = LocalCache(
+    BRAND_TOPIC, "BRAND_CACHE_SIZE", "BRAND_CACHE_SECONDS", stripes=1
+)
+
+
+class BrandReadOnly(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Brand is being moved between shards. Retry shortly."
+    default_code = "brand_read_only"
+
+
+def shard_aliases():
+    return settings.LICENSE_SHARDS
+
+
+def sharding_enabled():
+    return len(settings.LICENSE_SHARDS) > 1
+
+
+def current_shard():
+    """
+    The shard bound to the current context, or None outside of one.
+    """
+    return _current_shard.get()
+
+
+def current_alias():
+    """
+    Database alias for brand-scoped queries and transactions in the
+    current context; the default database when sharding is off.
+    """
+    return _current_shard.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Routes brand-scoped queries to `alias` for the duration of the block.
+    Management commands, jobs and tests use this; requests are bound by
+    authentication instead.
+    """
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def placement_for(brand_id):
+    """
+    Shard for a brand that has no directory entry yet (new brands).
+    """
+    aliases = shard_aliases()
+    return aliases[uuid.UUID(str(brand_id)).int % len(aliases)]
+
+
+def shard_for_brand(brand_id):
+    from .models import BrandShard
+
+    shard = (
+        BrandShard.objects.filter(brand_id=brand_id)
+        .values_list("shard", flat=True)
+        .first()
+    )
+    return shard or placement_for(brand_id)
+
+
+def resolve_brand(request, **lookup):
+    """
+    Loads the brand matching `lookup` (slug or api_key) from its shard and
+    binds the request to that shard. Writes are refused while the brand
+    is being moved. Raises Brand.DoesNotExist. Served from brand_cache
+    while the invalidation listener is connected.
+    """
+    from .models import Brand
+
+    (key,) = lookup.items()
+    entry = brand_cache.get(key)
+    if entry is None:
+        token = brand_cache.token(key)
+        entry = _load_brand(lookup)
+        brand_cache.put(key, entry, token, tag=entry["brand_id"])
+    writes = request.method not in ("GET", "HEAD", "OPTIONS")
+    if entry["read_only"] and writes:
+        raise BrandReadOnly()
+    if sharding_enabled():
+        _current_shard.set(entry["shard"])
+        if writes:
+            # Held until the response is built (ShardContextMiddleware).
+            hold_brand_writes(entry["brand_id"], entry["shard"])
+    return Brand.from_db(entry["shard"], entry["fields"], entry["values"])
+
+
+def brand_lock_id(brand_id):
+    """
+    Advisory lock key of a brand: writers hold it shared on the brand's
+    shard, a brand move takes it exclusively to wait them out.
+    """
+    return uuid.UUID(str(brand_id)).int % 2**63
+
+
+def hold_brand_writes(brand_id, alias):
+    """
+    Takes the brand's write lock on `alias` in shared mode for the rest of
+    the request, then checks against the directory itself (not the cache)
+    that the brand is still writable there. A move marks the brand
+    read-only before it waits for the lock, so once that wait is over no
+    write can reach the source shard. Raises BrandReadOnly otherwise.
+    """
+    from .models import BrandShard
+
+    lock_id = brand_lock_id(brand_id)
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock_shared(%s)", [lock_id])
+    _write_locks.set((*_write_locks.get(), (alias, lock_id)))
+    entry = (
+        BrandShard.objects.filter(brand_id=brand_id)
+        .values_list("shard", "read_only")
+        .first()
+    )
+    if entry != (alias, False):
+        raise BrandReadOnly()
+
+
+def release_brand_writes():
+    for alias, lock_id in _write_locks.get():
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock_shared(%s)", [lock_id])
+    _write_locks.set(())
+
+
+def _load_brand(lookup):
+    from .models import Brand, BrandShard
+
+    if not sharding_enabled():
+        brand, shard, read_only = Brand.objects.get(**lookup), DEFAULT_DB_ALIAS, False
+    else:
+        entry = BrandShard.objects.filter(**lookup).values(
+            "brand_id", "shard", "read_only"
+        )
+        entry = entry.first()
+        if entry is None:
+            raise Brand.DoesNotExist
+        shard, read_only = entry["shard"], entry["read_only"]
+        brand = Brand.objects.using(shard).get(id=entry["brand_id"])
+    fields = [field.attname for field in Brand._meta.concrete_fields]
+    return {
+        "brand_id": str(brand.id),
+        "shard": shard,
+        "read_only": read_only,
+        "fields": fields,
+        "values": [getattr(brand, name) for name in fields],
+    }
+
+
+def scatter(func, aliases=None):
+    """
+    Runs func(alias) on every shard in parallel, each call bound to its
+    shard, and returns the results in shard order. Runs them one after
+    another in the calling thread instead if it is inside a transaction on
+    any of the shards: worker threads could not see its writes.
+    """
+    global _executor
+    aliases = list(aliases or shard_aliases())
+    if len(aliases) == 1 or any(connections[a].in_atomic_block for a in aliases):
+        results = []
+        for alias in aliases:
+            with use_shard(alias):
+                results.append(func(alias))
+        return results
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.SHARD_SCATTER_WORKERS,
+            thread_name_prefix="shard-scatter",
+        )
+
+    def run(alias):
+        # Worker threads follow CONN_MAX_AGE like request threads do:
+        # connections persist across calls only if configured to.
+        connection = connections[alias]
+        connection.close_if_unusable_or_obsolete()
+        try:
+            with use_shard(alias):
+                return func(alias)
+        finally:
+            connection.close_if_unusable_or_obsolete()
+
+    return list(_executor.map(run, aliases))
+
+
+class ShardContextMiddleware:
+    """
+    Clears the shard binding around each request, so a binding made by
+    authentication never leaks into the next request on the same thread,
+    and releases the brand write locks the request took.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_shard.set(None)
+        locks = _write_locks.set(())
+        try:
+            return self.get_response(request)
+        finally:
+            release_brand_writes()
+            _write_locks.reset(locks)
+            _current_shard.reset(token)
@@ -0,0 +1,196 @@
+"""
+Concurrency stress harness for license activation (stress_activations
+command).
+
+Worker processes fire activations at the same few licenses at once, each
+attempt with a new instance id, and record what happened to it. Afterwards
+the live seats of every license are checked against its seat limit and
+against the number of activations that reported success.
+
+Strategies are looked up by name in ACTIVATION_STRATEGIES, so alternative
+implementations can be compared under the same load.
+"""
+
+import logging
+import statistics
+import time
+from collections import Counter, defaultdict
+from django.db import DatabaseError, connections
+from django.db.models import Count, Q
+from django.db.models.functions import Now
+from rest_framework.exceptions import ValidationError
+from licenses.models import Brand, License
+from licenses.services.activation import ActivationService
+from licenses.sharding import use_shard
+
+# Callables with the signature of ActivationService.activate_instance.
+ACTIVATION_STRATEGIES = {
+    "row_lock": ActivationService.activate_instance,
+}
+
+OUTCOMES = (
+    "activated",
+    "rejected",
+    "deadlock",
+    "serialization",
+    "lock_timeout",
+    "error",
+)
+
+# SQLSTATEs reported as their own outcome rather than "error".
+FAILURE_CODES = {
+    "40P01": "deadlock",
+    "40001": "serialization",
+    "55P03": "lock_timeout",
+}
+
+LOCKING_CLAUSES = ("FOR UPDATE", "FOR NO KEY UPDATE", "FOR SHARE", "FOR KEY SHARE")
+
+
+class _LockTimer:
+    """
+    execute_wrapper adding up the time spent in row-locking statements.
+    Those are single-row index lookups, so their time is almost all
+    waiting for the lock. Also notes when the first lock was granted, so
+    the caller can tell how long it was held: row locks last until the
+    attempt's transaction ends.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.seconds = 0.0
+        self.locked_at = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not any(clause in sql for clause in LOCKING_CLAUSES):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            finished = time.perf_counter()
+            self.seconds += finished - started
+            if self.locked_at is None:
+                self.locked_at = finished
+
+
+def _attempt(activate, brand, key_string, product_id, instance_id):
+    try:
+        activate(
+            brand,
+            key_string,
+            instance_id,
+            product_id,
+            context={"request_id": instance_id},
+        )
+    except ValidationError:
+        return "rejected"
+    except DatabaseError as e:
+        return FAILURE_CODES.get(getattr(e.__cause__, "pgcode", None), "error")
+    return "activated"
+
+
+def run_worker(strategy, alias, brand_id, targets, plan, worker, start_at):
+    """
+    Runs the attempts in `plan` (indexes into `targets`, a list of
+    (key_string, product_id)) one after another, starting at wall-clock
+    time `start_at` so all workers begin together.
+    Returns [(target, outcome, seconds, lock wait seconds, lock hold
+    seconds)].
+    """
+    # Per-attempt service logging would dominate the timings.
+    logging.disable(logging.CRITICAL)
+    activate = ACTIVATION_STRATEGIES[strategy]
+    timer = _LockTimer()
+    results = []
+    try:
+        with use_shard(alias), connections[alias].execute_wrapper(timer):
+            brand = Brand.objects.using(alias).get(id=brand_id)
+            time.sleep(max(0.0, start_at - time.time()))
+            for n, target in enumerate(plan):
+                key_string, product_id = targets[target]
+                timer.reset()
+                started = time.perf_counter()
+                outcome = _attempt(
+                    activate, brand, key_string, product_id, f"stress-{worker}-{n}"
+                )
+                finished = time.perf_counter()
+                held = finished - timer.locked_at if timer.locked_at else 0.0
+                results.append(
+                    (target, outcome, finished - started, timer.seconds, held)
+                )
+    finally:
+        logging.disable(logging.NOTSET)
+        connections.close_all()
+    return results
+
+
+def seat_violations(alias, license_ids, activated):
+    """
+    Licenses whose live seats exceed the seat limit, or differ from the
+    number of successful activations (`activated`: {license id: count}).
+    Returns a list of messages.
+    """
+    rows = (
+        License.objects.using(alias)
+        .filter(id__in=license_ids)
+        .annotate(
+            live=Count(
+                "activations",
+                filter=Q(activations__lease_expires_at__isnull=True)
+                | Q(activations__lease_expires_at__gt=Now()),
+            )
+        )
+        .values_list("id", "seat_limit", "live")
+    )
+    violations = []
+    for license_id, seat_limit, live in rows:
+        if seat_limit is not None and live > seat_limit:
+            violations.append(
+                f"License {license_id}: {live} live seats, limit {seat_limit}."
+            )
+        if live != activated.get(license_id, 0):
+            violations.append(
+                f"License {license_id}: {live} live seats, "
+                f"{activated.get(license_id, 0)} successful activations."
+            )
+    return violations
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def summarize(results, seat_limits):
+    """
+    Aggregates worker results by seat limit (`seat_limits`: seat limit of
+    each target). Returns {seat_limit: {outcome counts, latency, lock wait
+    and lock hold percentiles in ms}}.
+    """
+    groups = defaultdict(list)
+    for target, outcome, seconds, lock_wait, lock_hold in results:
+        groups[seat_limits[target]].append((outcome, seconds, lock_wait, lock_hold))
+    summary = {}
+    for seat_limit, rows in sorted(groups.items()):
+        outcomes = Counter(outcome for outcome, *_ in rows)
+        latencies = [seconds * 1000 for _, seconds, _, _ in rows]
+        waits = [lock_wait * 1000 for _, _, lock_wait, _ in rows]
+        holds = [lock_hold * 1000 for *_, lock_hold in rows]
+        summary[seat_limit] = {
+            "attempts": len(rows),
+            **{outcome: outcomes[outcome] for outcome in OUTCOMES},
+            "p50_ms": _percentile(latencies, 50),
+            "p99_ms": _percentile(latencies, 99),
+            "lock_wait_p50_ms": _percentile(waits, 50),
+            "lock_wait_p99_ms": _percentile(waits, 99),
+            "lock_wait_total_ms": sum(waits),
+            "lock_hold_p50_ms": _percentile(holds, 50),
+            "lock_hold_p99_ms": _percentile(holds, 99),
+        }
+    return summary
@@ -0,0 +1,232 @@
+"""
+Deterministic synthetic datasets for benchmarking (generate_dataset command).
+
+Customers are generated in fixed-size chunks, each from its own random
+stream derived from (seed, chunk number), so the rows do not depend on how
+many worker processes load them or in which order. Rows are written with
+COPY, one statement per table per chunk, on the shard of each row's brand.
+"""
+
+import io
+import random
+from bisect import bisect
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from django.db import connections, transaction
+from core.ids import uuid7_from
+
+COPY_COLUMNS = {
+    "licenses_licensekey": (
+        "id",
+        "created_at",
+        "updated_at",
+        "brand_id",
+        "key_string",
+        "customer_email",
+    ),
+    "licenses_license": (
+        "id",
+        "created_at",
+        "updated_at",
+        "license_key_id",
+        "product_id",
+        "status",
+        "expiration_date",
+        "seat_limit",
+        "lease_ttl",
+    ),
+    "licenses_activation": (
+        "id",
+        "created_at",
+        "updated_at",
+        "license_id",
+        "instance_identifier",
+        "lease_expires_at",
+    ),
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class Distribution:
+    """
+    Discrete distribution parsed from "value:weight,value:weight,...".
+    """
+
+    def __init__(self, spec):
+        pairs = [item.split(":") for item in spec.split(",") if item.strip()]
+        if not pairs or any(len(pair) != 2 for pair in pairs):
+            raise ValueError(f"Expected value:weight pairs, got {spec!r}.")
+        self.values = [int(value) for value, _ in pairs]
+        self.cumulative = list(accumulate(float(weight) for _, weight in pairs))
+        if self.cumulative[-1] <= 0:
+            raise ValueError(f"Weights must add up to more than zero in {spec!r}.")
+
+    def sample(self, rng):
+        return self.values[bisect(self.cumulative, rng.random() * self.cumulative[-1])]
+
+    @property
+    def mean(self):
+        weights = [b - a for a, b in zip([0.0, *self.cumulative], self.cumulative)]
+        return sum(v * w for v, w in zip(self.values, weights)) / self.cumulative[-1]
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    seed: int
+    customers: int
+    keys_per_customer: str
+    products_per_key: str
+    seats_per_license: str
+    activation_fill: float
+    expired_ratio: float
+    cancelled_ratio: float
+    history_days: int
+    chunk_size: int
+    # Anchor timestamp all generated times are relative to.
+    as_of: object
+
+    def chunks(self):
+        return range((self.customers + self.chunk_size - 1) // self.chunk_size)
+
+
+def seeded_uuid(rng, at):
+    """
+    Time-ordered id for a row created at `at`, like the models' default,
+    with the random bits drawn from `rng`.
+    """
+    ns = (at - EPOCH) // timedelta(microseconds=1) * 1000
+    return uuid7_from(ns, rng.getrandbits(62))
+
+
+def brand_weights(brand_count, skew):
+    """
+    Zipf-like popularity: brand i gets weight 1 / (i + 1) ** skew, so
+    skew 0 is uniform and larger values concentrate keys on few brands.
+    """
+    return list(accumulate(1 / (i + 1) ** skew for i in range(brand_count)))
+
+
+def _field(value):
+    if value is None:
+        return "\\N"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class _CopyBuffer:
+    def __init__(self):
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, alias, table, row):
+        buffer = self.buffers.setdefault((alias, table), io.StringIO())
+        buffer.write("\t".join(_field(value) for value in row))
+        buffer.write("\n")
+        self.counts[table] = self.counts.get(table, 0) + 1
+
+    def flush(self):
+        # One transaction per shard, parents before children.
+        aliases = sorted({alias for alias, _ in self.buffers})
+        for alias in aliases:
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                for table, columns in COPY_COLUMNS.items():
+                    buffer = self.buffers.get((alias, table))
+                    if buffer is None:
+                        continue
+                    buffer.seek(0)
+                    cursor.cursor.copy_expert(
+                        f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer
+                    )
+        return self.counts
+
+
+def generate_chunk(spec, chunk, brands, weights):
+    """
+    Generates and loads customers [chunk * chunk_size, ...). `brands` is a
+    list of (alias, brand_id, [product ids]) in popularity order and
+    `weights` their cumulative weights from brand_weights().
+    Returns row counts per table.
+    """
+    rng = random.Random(f"{spec.seed}:{chunk}")
+    keys_per_customer = Distribution(spec.keys_per_customer)
+    products_per_key = Distribution(spec.products_per_key)
+    seats_per_license = Distribution(spec.seats_per_license)
+    history = timedelta(days=spec.history_days)
+    out = _CopyBuffer()
+
+    first = chunk * spec.chunk_size
+    last = min(first + spec.chunk_size, spec.customers)
+    for customer in range(first, last):
+        email = f"customer{customer}@example{customer % 97}.com"
+        for _ in range(keys_per_customer.sample(rng)):
+            alias, brand_id, product_ids = brands[
+                bisect(weights, rng.random() * weights[-1])
+            ]
+            created_at = spec.as_of - history * rng.random()
+            key_id = seeded_uuid(rng, created_at)
+            out.add(
+                alias,
+                "licenses_licensekey",
+                (
+                    key_id,
+                    created_at,
+                    created_at,
+                    brand_id,
+                    f"G1-{rng.getrandbits(96):024X}",
+                    email,
+                ),
+            )
+            count = min(products_per_key.sample(rng), len(product_ids))
+            for product_id in rng.sample(product_ids, count):
+                seats = seats_per_license.sample(rng)
+                _license_rows(
+                    spec, rng, out, alias, key_id, product_id, created_at, seats
+                )
+    return out.flush()
+
+
+def _license_rows(spec, rng, out, alias, key_id, product_id, created_at, seats):
+    roll = rng.random()
+    if roll < spec.expired_ratio:
+        status = "valid"
+        expiration_date = spec.as_of - (spec.as_of - created_at) * rng.random()
+    elif roll < spec.expired_ratio + spec.cancelled_ratio:
+        status = "cancelled"
+        expiration_date = created_at + timedelta(days=365)
+    else:
+        status = "valid"
+        expiration_date = spec.as_of + timedelta(days=rng.randint(1, 365))
+    license_id = seeded_uuid(rng, created_at)
+    out.add(
+        alias,
+        "licenses_license",
+        (
+            license_id,
+            created_at,
+            created_at,
+            key_id,
+            product_id,
+            status,
+            expiration_date,
+            seats,
+            None,
+        ),
+    )
+    used = sum(rng.random() < spec.activation_fill for _ in range(seats))
+    for n in range(used):
+        activated_at = created_at + (spec.as_of - created_at) * rng.random()
+        out.add(
+            alias,
+            "licenses_activation",
+            (
+                seeded_uuid(rng, activated_at),
+                activated_at,
+                activated_at,
+                license_id,
+                f"host-{n}.{key_id.hex[:12]}.example",
+                None,
+            ),
+        )
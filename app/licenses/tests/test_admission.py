@@ -0,0 +1,169 @@
+import importlib
+import sys
+import threading
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APITestCase
+from core.admission import AdmissionController
+from licenses.models import Brand
+
+CLASSES = {
+    "product": {
+        "limit": 1,
+        "min_limit": 1,
+        "max_limit": 4,
+        "target_ms": 100,
+        "queue_ms": 2000,
+    },
+    "brand": {
+        "limit": 2,
+        "min_limit": 1,
+        "max_limit": 4,
+        "target_ms": 500,
+        "queue_ms": 200,
+    },
+    "admin": {
+        "limit": 1,
+        "min_limit": 1,
+        "max_limit": 4,
+        "target_ms": 2000,
+        "queue_ms": 100,
+    },
+}
+
+
+class AdmissionControlTests(APITestCase):
+    def setUp(self):
+        Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.controller = AdmissionController(CLASSES)
+        patcher = mock.patch("core.admission.controller", self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_class_sheds_quickly(self):
+        held = [self.controller.acquire("brand") for _ in range(2)]
+        started = time.monotonic()
+        resp = self.client.get(
+            "/api/v1/licenses/changes/", HTTP_X_BRAND_API_KEY="sk_rm"
+        )
+        # Two requests of the brand's 500ms target queued: over budget.
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp["Retry-After"], "1")
+        self.assertLess(time.monotonic() - started, 0.1)
+        # Product endpoints have slots of their own.
+        resp = self.client.get(
+            "/api/v1/licenses/status/UNKNOWN/", HTTP_X_BRAND_SLUG="rm"
+        )
+        self.assertEqual(resp.status_code, 404)
+
+        for started in held:
+            self.controller.release("brand", started)
+        resp = self.client.get(
+            "/api/v1/licenses/changes/", HTTP_X_BRAND_API_KEY="sk_rm"
+        )
+        self.assertEqual(resp.status_code, 200)
+        stats = self.controller.snapshot()
+        self.assertEqual((stats["brand"]["shed"], stats["brand"]["admitted"]), (1, 3))
+        self.assertEqual(stats["product"]["running"], 0)
+
+    def test_lower_classes_give_way_to_waiting_product_requests(self):
+        first = self.controller.acquire("product")
+        admitted = []
+        waiter = threading.Thread(
+            target=lambda: admitted.append(self.controller.acquire("product"))
+        )
+        waiter.start()
+        while not self.controller.snapshot()["product"]["waiting"]:
+            time.sleep(0.005)
+
+        self.assertIsNone(self.controller.acquire("brand"))
+        self.assertIsNone(self.controller.acquire("admin"))
+        self.controller.release("product", first)
+        waiter.join()
+        self.assertIsNotNone(admitted[0])
+        self.controller.release("product", admitted[0])
+        self.assertIsNotNone(self.controller.acquire("brand"))
+
+    @override_settings(ADMISSION_ADJUST_SECONDS=0)
+    def test_limits_follow_latency(self):
+        controller = AdmissionController(CLASSES)
+        limits = lambda: {  # noqa: E731
+            name: stats["limit"] for name, stats in controller.snapshot().items()
+        }
+        # Brand requests short of slots and fast: brand grows.
+        held = [controller.acquire("brand") for _ in range(2)]
+        self.assertIsNone(controller.acquire("brand"))
+        for started in held:
+            controller.release("brand", started)
+        self.assertEqual(limits(), {"product": 1, "brand": 3, "admin": 1})
+
+        # Slow product requests: brand and admin back off as well.
+        controller.release("product", controller.acquire("product") - 0.3)
+        self.assertEqual(limits(), {"product": 1, "brand": 2, "admin": 1})
+        self.assertEqual(controller.snapshot()["product"]["latency_ms"], 300.0)
+
+    def test_stats_are_for_staff(self):
+        resp = self.client.get("/api/admission/")
+        self.assertEqual(resp.status_code, 302)
+        staff = User.objects.create_user("ops", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        resp = self.client.get("/api/admission/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.json()), ["product", "brand", "admin"])
+
+
+class SingleThreadedWorkerTests(APITestCase):
+    def setUp(self):
+        Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.controller = AdmissionController(CLASSES)
+        patcher = mock.patch("core.admission.controller", self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # As the test client does: the handler must not close the test
+        # transaction's connection.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def wsgi_application(self):
+        with (
+            mock.patch.dict(sys.modules),
+            mock.patch("licenses.invalidation.start_on_startup"),
+            mock.patch("licenses.keyfilter.warm_on_startup"),
+        ):
+            sys.modules.pop("core.wsgi", None)
+            return importlib.import_module("core.wsgi").application
+
+    def call(self, application, multithread):
+        environ = (
+            RequestFactory()
+            .get("/api/v1/licenses/changes/", HTTP_X_BRAND_API_KEY="sk_rm")
+            .environ
+        )
+        environ["wsgi.multithread"] = multithread
+        statuses = []
+        response = application(environ, lambda status, headers: statuses.append(status))
+        response.close()
+        return statuses[0]
+
+    def test_single_threaded_worker_skips_admission_control(self):
+        # Both brand slots taken: an admitted request would be shed.
+        for _ in range(2):
+            self.controller.acquire("brand")
+        application = self.wsgi_application()
+        with self.assertLogs("core.admission", "WARNING") as logs:
+            self.assertEqual(self.call(application, False), "200 OK")
+            self.assertEqual(self.call(application, False), "200 OK")
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(self.controller.snapshot()["brand"]["shed"], 0)
+
+    def test_threaded_worker_is_admission_controlled(self):
+        for _ in range(2):
+            self.controller.acquire("brand")
+        application = self.wsgi_application()
+        self.assertTrue(self.call(application, True).startswith("503"))
+        self.assertFalse(self.controller.bypassed)
@@ -0,0 +1,167 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from licenses.keyfilter import key_filter
+from licenses.models import (
+    Activation,
+    ArchivedLicenseKey,
+    Brand,
+    IdempotencyRecord,
+    License,
+    LicenseKey,
+    Product,
+)
+from licenses.services.archive import ArchiveService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.status import StatusService
+
+
+class ArchiveTestMixin:
+    def setUp(self):
+        key_filter.clear()
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.cutoff = timezone.now() - timezone.timedelta(days=730)
+        long_ago = self.cutoff - timezone.timedelta(days=30)
+
+        self.dead, self.alive = [
+            ProvisioningService.provision_license_bundle(
+                brand=self.brand,
+                customer_email=f"user+{i}@example.com",
+                product_ids=[self.product.id],
+                context=self.ctx,
+            )
+            for i in range(2)
+        ]
+        LicenseKey.objects.update(created_at=long_ago)
+        License.objects.filter(license_key=self.dead).update(expiration_date=long_ago)
+        Activation.objects.create(
+            license=self.dead.licenses.get(), instance_identifier="site-1.com"
+        )
+        self.document = StatusService.get_license_status_payload(
+            self.brand, self.dead.key_string, self.ctx
+        )
+
+    def archive(self):
+        key_ids, _ = ArchiveService.archivable_keys(None, 100, self.cutoff)
+        return ArchiveService.archive_keys(key_ids, self.cutoff, self.ctx)
+
+
+class ArchiveServiceTests(ArchiveTestMixin, TestCase):
+    databases = "__all__"
+
+    def test_only_dead_keys_are_archived(self):
+        moved = self.archive()
+        self.assertEqual(
+            moved,
+            {"licensekey": 1, "license": 1, "activation": 1, "archivedlicensekey": 1},
+        )
+        self.assertFalse(LicenseKey.objects.filter(id=self.dead.id).exists())
+        self.assertTrue(LicenseKey.objects.filter(id=self.alive.id).exists())
+        archived = ArchivedLicenseKey.objects.get()
+        self.assertEqual(archived.key_string, self.dead.key_string)
+        self.assertEqual(archived.document, self.document)
+
+    def test_recently_cancelled_key_is_kept(self):
+        License.objects.filter(license_key=self.dead).update(
+            expiration_date=None, status="cancelled", updated_at=timezone.now()
+        )
+        self.assertEqual(self.archive(), {})
+        self.assertFalse(ArchivedLicenseKey.objects.exists())
+
+    def test_status_falls_back_to_archive(self):
+        self.archive()
+        key_filter.warm()
+        key = self.dead.key_string
+        self.assertEqual(
+            StatusService.get_license_status_payload(self.brand, key, self.ctx),
+            self.document,
+        )
+        self.assertEqual(
+            json.loads(
+                StatusService.get_license_status_json(self.brand, key, self.ctx)
+            ),
+            self.document,
+        )
+        keys = [key, self.alive.key_string]
+        payloads = StatusService.get_license_statuses_payload(
+            self.brand, keys, self.ctx
+        )
+        documents = dict(
+            StatusService.iter_license_statuses_json(self.brand, keys, self.ctx)
+        )
+        self.assertEqual(set(payloads), set(keys))
+        self.assertEqual(set(documents), set(keys))
+        self.assertEqual(json.loads(documents[key]), payloads[key])
+        self.assertEqual(payloads[key], self.document)
+
+    def test_purge_idempotency_records(self):
+        old, new = [
+            IdempotencyRecord.objects.create(
+                brand=self.brand,
+                idempotency_key=f"req-{i}",
+                response_data={},
+                status_code=201,
+            )
+            for i in range(2)
+        ]
+        cutoff = timezone.now() - timezone.timedelta(days=30)
+        IdempotencyRecord.objects.filter(id=old.id).update(
+            created_at=cutoff - timezone.timedelta(days=1)
+        )
+        self.assertEqual(
+            ArchiveService.purge_idempotency_records(cutoff, 10, self.ctx), 1
+        )
+        self.assertEqual(
+            list(IdempotencyRecord.objects.values_list("id", flat=True)), [new.id]
+        )
+
+
+class ArchiveRaceTests(ArchiveTestMixin, TransactionTestCase):
+    databases = "__all__"
+
+    def test_key_renewed_meanwhile_is_kept(self):
+        key_ids, _ = ArchiveService.archivable_keys(None, 100, self.cutoff)
+        self.assertEqual(key_ids, [self.dead.id])
+        # A renewal is under way: it holds the license, not the key.
+        conn = connection.Database.connect(**connection.get_connection_params())
+        self.addCleanup(conn.close)
+        with conn.cursor() as other:
+            other.execute(
+                "UPDATE licenses_license SET expiration_date = now() + '1 year' "
+                "WHERE license_key_id = %s",
+                [self.dead.id],
+            )
+        self.assertEqual(
+            ArchiveService.archive_keys(key_ids, self.cutoff, self.ctx), {}
+        )
+
+        conn.commit()
+        self.assertEqual(
+            ArchiveService.archive_keys(key_ids, self.cutoff, self.ctx), {}
+        )
+        self.assertTrue(LicenseKey.objects.filter(id=self.dead.id).exists())
+        self.assertFalse(ArchivedLicenseKey.objects.exists())
+
+
+class ArchiveApiTests(ArchiveTestMixin, APITestCase):
+    databases = "__all__"
+
+    def test_command_reports_and_status_endpoint_still_answers(self):
+        out = StringIO()
+        call_command("archive_cold_data", "--pause", "0", stdout=out)
+        self.assertIn("licensekey: 1 rows moved", out.getvalue())
+        self.assertIn("licenses_licensekey: index", out.getvalue())
+
+        resp = self.client.get(
+            f"/api/v1/licenses/status/{self.dead.key_string}/",
+            HTTP_X_BRAND_SLUG="rm",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), self.document)
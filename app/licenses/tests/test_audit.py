@@ -0,0 +1,145 @@
+import uuid
+from datetime import date
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from licenses.models import AuditLog, Brand, Product
+from licenses.services.activation import ActivationService
+from licenses.services.audit import AuditLogService
+from licenses.services.lifecycle import LicenseLifecycleService
+from licenses.services.provisioning import ProvisioningService
+
+
+class AuditLogServiceTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "audit-test", "brand_id": self.brand.id}
+        self.key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="user@example.com",
+            product_ids=[self.product.id],
+            context=self.ctx,
+        )
+        self.license = self.key.licenses.get()
+
+    def test_status_update_is_audited(self):
+        LicenseLifecycleService.update_status(
+            self.brand, self.license.id, "suspended", self.ctx
+        )
+
+        entry = AuditLog.objects.get(license_id=self.license.id)
+        self.assertEqual(entry.action, "status_update")
+        self.assertEqual(entry.before, {"status": "valid"})
+        self.assertEqual(entry.after, {"status": "suspended"})
+        self.assertEqual(entry.request_id, "audit-test")
+
+    def test_entries_are_written_by_the_last_statement(self):
+        for n in range(3):
+            ActivationService.activate_instance(
+                brand=self.brand,
+                key_string=self.key.key_string,
+                instance_id=f"host-{n}",
+                product_id=self.product.id,
+                context=self.ctx,
+            )
+        with CaptureQueriesContext(connection) as queries:
+            ActivationService.deactivate_machine(
+                self.brand, ["host-0", "host-1", "host-2"], self.ctx
+            )
+
+        # Savepoints stand in for the transaction here.
+        statements = [
+            q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]
+        ]
+        audit_inserts = [s for s in statements if "licenses_auditlog" in s]
+        self.assertEqual(len(audit_inserts), 1)
+        self.assertEqual(statements[-1], audit_inserts[0])
+        entries = AuditLog.objects.filter(
+            license_id=self.license.id, action="deactivation"
+        )
+        self.assertEqual(
+            sorted(e.before["instance_identifier"] for e in entries),
+            ["host-0", "host-1", "host-2"],
+        )
+        self.assertEqual({e.after["reason"] for e in entries}, {"machine_deactivation"})
+
+    def test_rolled_back_changes_are_not_audited(self):
+        try:
+            with transaction.atomic():
+                ActivationService.activate_instance(
+                    brand=self.brand,
+                    key_string=self.key.key_string,
+                    instance_id="site-1.com",
+                    product_id=self.product.id,
+                    context=self.ctx,
+                )
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+
+        self.assertFalse(AuditLog.objects.filter(license_id=self.license.id).exists())
+
+    def test_partitions_take_over_rows_from_the_default_partition(self):
+        first = date.today().replace(day=1)
+        year, month = divmod(first.month - 1 + 5, 12)
+        later = date(first.year + year, month + 1, 15)
+        entry_id = uuid.uuid4()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO licenses_auditlog VALUES "
+                "(%s, %s, %s, %s, 'renewal', '{}', '{}', 'early')",
+                [entry_id, later, self.brand.id, self.license.id],
+            )
+        names = AuditLogService.ensure_partitions(months_ahead=6)
+        self.assertEqual(names, AuditLogService.ensure_partitions(months_ahead=6))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM licenses_auditlog WHERE id = %s",
+                [entry_id],
+            )
+            self.assertEqual(cursor.fetchone()[0], f"licenses_auditlog_{later:y%Ym%m}")
+
+
+class AuditLogEndpointTests(APITestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(
+            name="WP Rocket", slug="wpr", api_key="sk_rocket_123"
+        )
+        self.product = Product.objects.create(
+            brand=self.brand, name="Plugin", slug="plugin"
+        )
+        ctx = {"request_id": "audit-test", "brand_id": self.brand.id}
+        key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="customer@site.com",
+            product_ids=[self.product.id],
+            context=ctx,
+        )
+        self.license = key.licenses.get()
+        LicenseLifecycleService.renew_license(self.brand, self.license.id, 30, ctx)
+        LicenseLifecycleService.update_status(
+            self.brand, self.license.id, "cancelled", ctx
+        )
+
+    def test_history_is_newest_first_and_brand_scoped(self):
+        url = f"/api/v1/licenses/audit/{self.license.id}/"
+        resp = self.client.get(url, HTTP_X_BRAND_API_KEY="sk_rocket_123")
+        self.assertEqual(resp.status_code, 200)
+        actions = [entry["action"] for entry in resp.data["entries"]]
+        self.assertEqual(actions, ["status_update", "renewal"])
+
+        Brand.objects.create(name="Other", slug="other", api_key="sk_other")
+        resp = self.client.get(url, HTTP_X_BRAND_API_KEY="sk_other")
+        self.assertEqual(resp.data["entries"], [])
+
+    def test_limit_must_be_positive(self):
+        url = f"/api/v1/licenses/audit/{self.license.id}/"
+        for limit in ("-1", "0", "many"):
+            resp = self.client.get(
+                url, {"limit": limit}, HTTP_X_BRAND_API_KEY="sk_rocket_123"
+            )
+            self.assertEqual(resp.status_code, 400)
+        resp = self.client.get(url, {"limit": 1}, HTTP_X_BRAND_API_KEY="sk_rocket_123")
+        self.assertEqual(len(resp.data["entries"]), 1)
@@ -0,0 +1,95 @@
+import json
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from licenses.keyfilter import key_filter
+from licenses.models import Activation, Brand, Product
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.status import StatusService
+
+
+class BatchStatusTests(APITestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        key_filter.clear()
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.keys = [
+            ProvisioningService.provision_license_bundle(
+                brand=self.brand,
+                customer_email=f"user+{i}@example.com",
+                product_ids=[self.product.id],
+                context=self.ctx,
+            ).key_string
+            for i in range(5)
+        ]
+        key_filter.warm()
+        lic = self.product.licenses.get(license_key__key_string=self.keys[0])
+        Activation.objects.create(license=lic, instance_identifier="site-1.com")
+        self.url = "/api/v1/licenses/status/batch/"
+        self.headers = {"HTTP_X_BRAND_SLUG": "rm"}
+
+    def test_constant_queries_and_parity(self):
+        with self.assertNumQueries(1):
+            documents = dict(
+                StatusService.iter_license_statuses_json(
+                    self.brand, self.keys, self.ctx
+                )
+            )
+        with self.assertNumQueries(2):
+            payloads = StatusService.get_license_statuses_payload(
+                self.brand, self.keys, self.ctx
+            )
+        self.assertEqual(set(documents), set(self.keys))
+        for key in self.keys:
+            self.assertEqual(json.loads(documents[key]), payloads[key])
+            self.assertEqual(
+                payloads[key],
+                StatusService.get_license_status_payload(self.brand, key, self.ctx),
+            )
+        self.assertEqual(payloads[self.keys[0]]["entitlements"][0]["seats_used"], 1)
+
+    def test_not_found_markers(self):
+        other = Brand.objects.create(name="WP Rocket", slug="wpr", api_key="sk_wpr")
+        foreign = ProvisioningService.provision_license_bundle(
+            brand=other,
+            customer_email="user@example.com",
+            product_ids=[Product.objects.create(brand=other, name="P", slug="p").id],
+            context=self.ctx,
+        ).key_string
+        requested = [self.keys[0], "G1-NOPE", foreign, self.keys[0]]
+        for mode in ("database", "python"):
+            with self.subTest(mode=mode), override_settings(
+                ENTITLEMENT_RENDER_MODE=mode
+            ):
+                resp = self.client.post(
+                    self.url, {"keys": requested}, format="json", **self.headers
+                )
+                self.assertEqual(resp.status_code, status.HTTP_200_OK)
+                self.assertEqual(resp.data["found"], 1)
+                self.assertEqual(resp.data["not_found"], 2)
+                results = resp.data["results"]
+                self.assertEqual(results[self.keys[0]]["key"], self.keys[0])
+                self.assertEqual(results["G1-NOPE"], {"error": "not_found"})
+                self.assertEqual(results[foreign], {"error": "not_found"})
+
+    @override_settings(STATUS_BATCH_STREAM_THRESHOLD=2)
+    def test_large_batches_are_streamed(self):
+        resp = self.client.post(
+            self.url, {"keys": self.keys + ["G1-NOPE"]}, format="json", **self.headers
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.streaming)
+        body = json.loads(b"".join(resp.streaming_content))
+        self.assertEqual(body["found"], 5)
+        self.assertEqual(body["results"]["G1-NOPE"], {"error": "not_found"})
+
+    @override_settings(STATUS_BATCH_MAX_KEYS=3)
+    def test_item_cap(self):
+        resp = self.client.post(
+            self.url, {"keys": self.keys}, format="json", **self.headers
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("keys", resp.data)
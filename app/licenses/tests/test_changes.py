@@ -0,0 +1,125 @@
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+from licenses.models import Brand, License, LicenseKey, Product
+from licenses.services.activation import ActivationService
+from licenses.services.changes import encode_cursor
+from licenses.services.lifecycle import LicenseLifecycleService
+from licenses.services.provisioning import ProvisioningService
+
+
+class ChangeFeedTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "test"}
+        self.keys = [self.provision(self.brand, self.product, n) for n in range(3)]
+        self.client = APIClient()
+
+    def provision(self, brand, product, n):
+        return ProvisioningService.provision_license_bundle(
+            brand=brand,
+            customer_email=f"user{n}@example.com",
+            product_ids=[product.id],
+            context=self.ctx,
+        )
+
+    def feed(self, cursor=None, **params):
+        if cursor is not None:
+            params["cursor"] = cursor
+        resp = self.client.get(
+            "/api/v1/licenses/changes/", params, HTTP_X_BRAND_API_KEY="sk_rm"
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def keys_of(self, page):
+        return [change["key"] for change in page["changes"]]
+
+    def test_pages_and_incremental_changes(self):
+        other = Brand.objects.create(name="WPR", slug="wpr", api_key="sk_wpr")
+        self.provision(
+            other, Product.objects.create(brand=other, name="Pro", slug="wpr-pro"), 9
+        )
+
+        first = self.feed(limit=2)
+        self.assertTrue(first["reset"])
+        self.assertTrue(first["has_more"])
+        second = self.feed(first["cursor"], limit=2)
+        self.assertEqual((second["reset"], second["has_more"]), (False, False))
+        self.assertEqual(
+            self.keys_of(first) + self.keys_of(second),
+            [key.key_string for key in self.keys],
+        )
+        entry = second["changes"][0]
+        self.assertFalse(entry["deleted"])
+        self.assertEqual(entry["license_key"]["customer_email"], "user2@example.com")
+        self.assertEqual(self.feed(second["cursor"])["changes"], [])
+
+        key, seated, deleted = self.keys
+        ActivationService.activate_instance(
+            self.brand, seated.key_string, "site-1", self.product.id, self.ctx
+        )
+        LicenseLifecycleService.update_status(
+            self.brand, key.licenses.get().id, "suspended", self.ctx
+        )
+        # Seat and status changes move a key as they commit, while the
+        # summary refresh is still queued.
+        self.assertEqual(
+            self.keys_of(self.feed(second["cursor"])),
+            [seated.key_string, key.key_string],
+        )
+        # No-op writes do not move a key.
+        License.objects.filter(license_key=key).update(status="suspended")
+        deleted.delete()
+
+        page = self.feed(second["cursor"])
+        self.assertEqual(
+            self.keys_of(page), [seated.key_string, key.key_string, deleted.key_string]
+        )
+        seated_entry, key_entry, deleted_entry = page["changes"]
+        self.assertEqual(
+            seated_entry["license_key"]["entitlements"][0]["seats_used"], 1
+        )
+        self.assertEqual(
+            key_entry["license_key"]["entitlements"][0]["status"], "suspended"
+        )
+        self.assertTrue(deleted_entry["deleted"])
+        self.assertIsNone(deleted_entry["license_key"])
+
+    def test_running_transaction_holds_back_later_changes(self):
+        cursor = self.feed()["cursor"]
+        first, second, _ = self.keys
+        # Another worker changes a key and has not committed yet.
+        conn = connection.Database.connect(**connection.get_connection_params())
+        self.addCleanup(conn.close)
+        with conn.cursor() as other:
+            other.execute(
+                "UPDATE licenses_licensekey SET customer_email = 'new@example.com' "
+                "WHERE id = %s",
+                [first.id],
+            )
+        LicenseKey.objects.filter(id=second.id).update(customer_email="new@example.com")
+        page = self.feed(cursor)
+        self.assertEqual(page["changes"], [])
+        self.assertEqual(page["cursor"], cursor)
+
+        conn.commit()
+        page = self.feed(cursor)
+        self.assertEqual(self.keys_of(page), [first.key_string, second.key_string])
+
+    def test_cursors(self):
+        resp = self.client.get(
+            "/api/v1/licenses/changes/",
+            {"cursor": "nope"},
+            HTTP_X_BRAND_API_KEY="sk_rm",
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("cursor", resp.json()["error"])
+
+        # A cursor from another shard (the brand moved) starts over.
+        page = self.feed(encode_cursor("elsewhere", 2**40, 1))
+        self.assertTrue(page["reset"])
+        self.assertEqual(len(page["changes"]), 3)
@@ -0,0 +1,194 @@
+import threading
+import uuid
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from licenses.coalescing import SingleFlight, shared_flight
+from licenses.invalidation import KEY_STRIPES, STATUS_TOPIC, bus, status_key
+from licenses.services.status import (
+    StatusService,
+    get_license_status_coalesced,
+    status_flight,
+)
+
+
+class Gate:
+    """
+    A computation that blocks until released and counts its runs.
+    """
+
+    def __init__(self, result="document"):
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def __call__(self, *args, **kwargs):
+        self.runs += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def run_concurrently(fn, count):
+    results = [None] * count
+
+    def call(n):
+        try:
+            results[n] = fn()
+        except Exception as e:
+            results[n] = e
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+class SingleFlightTests(SimpleTestCase):
+    def wait_for_followers(self, flight, count):
+        while flight.shared < count:
+            threading.Event().wait(0.002)
+
+    def test_concurrent_calls_share_one_run(self):
+        flight, gate = SingleFlight(), Gate()
+        threads, results = run_concurrently(lambda: flight.do("k", gate), 8)
+        gate.started.wait(5)
+        self.wait_for_followers(flight, 7)
+        gate.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(gate.runs, 1)
+        self.assertEqual(results, ["document"] * 8)
+        # Finished flights are not reused.
+        self.assertEqual(flight.do("k", lambda: "fresh"), "fresh")
+
+    def test_errors_are_shared(self):
+        flight, gate = SingleFlight(), Gate(ConnectionError("gone"))
+        threads, results = run_concurrently(lambda: flight.do("k", gate), 3)
+        gate.started.wait(5)
+        self.wait_for_followers(flight, 2)
+        gate.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(gate.runs, 1)
+        self.assertTrue(all(isinstance(r, ConnectionError) for r in results))
+
+    def test_invalidation_detaches_the_flight(self):
+        gate = Gate("before")
+        brand_id = uuid.uuid4()
+        key = status_key(brand_id, "KEY")
+        threads, results = run_concurrently(lambda: status_flight.do(key, gate), 1)
+        gate.started.wait(5)
+        with override_settings(INVALIDATION_BUS_ENABLED=False):
+            bus.publish(STATUS_TOPIC, [key])
+        # Arrives after the write: computes again instead of joining.
+        self.assertEqual(status_flight.do(key, lambda: "after"), "after")
+        gate.release.set()
+        threads[0].join()
+        self.assertEqual(results, ["before"])
+
+    @override_settings(ENTITLEMENT_RENDER_MODE="database")
+    def test_status_requests_for_one_key_coalesce(self):
+        brand = mock.Mock(id=uuid.uuid4())
+        gate = Gate('{"key": "KEY"}')
+        shared = status_flight.shared
+        with mock.patch.object(StatusService, "get_license_status_json", gate):
+            threads, results = run_concurrently(
+                lambda: get_license_status_coalesced(brand, "KEY", {}),
+                5,
+            )
+            gate.started.wait(5)
+            self.wait_for_followers(status_flight, shared + 4)
+            gate.release.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(gate.runs, 1)
+            self.assertEqual(results, ['{"key": "KEY"}'] * 5)
+
+            with override_settings(STATUS_COALESCE_ENABLED=False):
+                threads, _ = run_concurrently(
+                    lambda: get_license_status_coalesced(brand, "KEY", {}),
+                    2,
+                )
+                for thread in threads:
+                    thread.join()
+            self.assertEqual(gate.runs, 3)
+
+
+class SharedFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def follow(self, other_worker):
+        """
+        Joins a flight led by another worker, which acts on our first poll.
+        """
+        cache.add("flight:k", "other", 2)
+        gate = Gate("mine")
+        gate.release.set()
+        with mock.patch("licenses.coalescing.time.sleep", side_effect=other_worker):
+            return shared_flight("default", "k", gate, 2), gate.runs
+
+    def test_follower_takes_the_leaders_result(self):
+        def deliver(_):
+            cache.set("flight:k:other", ("theirs",), 2)
+            cache.delete("flight:k")
+
+        self.assertEqual(self.follow(deliver), ("theirs", 0))
+
+    def test_follower_computes_when_the_leader_fails(self):
+        self.assertEqual(self.follow(lambda _: cache.delete("flight:k")), ("mine", 1))
+
+    def test_follower_backs_off_while_waiting(self):
+        delays = []
+
+        def leader_fails_late(delay):
+            delays.append(delay)
+            if len(delays) == 7:
+                cache.delete("flight:k")
+
+        self.assertEqual(self.follow(leader_fails_late), ("mine", 1))
+        self.assertEqual(delays, [0.005, 0.01, 0.02, 0.04, 0.08, 0.1, 0.1])
+
+    @override_settings(
+        STATUS_COALESCE_CACHE="default", ENTITLEMENT_RENDER_MODE="database"
+    )
+    def test_status_flights_are_keyed_by_the_keys_generation(self):
+        # A fixed id, so the two keys fall in different stripes.
+        brand = mock.Mock(id=uuid.UUID(int=1))
+        prefix = status_key(brand.id, "KEY")
+        other = status_key(brand.id, "OTHER")
+        keys = []
+
+        def flight(alias, key, fn, lock_seconds):
+            keys.append(key)
+            return fn()
+
+        with mock.patch(
+            "licenses.services.status.shared_flight", side_effect=flight
+        ), mock.patch.object(
+            StatusService, "get_license_status_json", return_value="{}"
+        ), mock.patch.object(
+            bus, "generations", {"default": 7}
+        ), mock.patch.object(
+            bus, "key_generations", {"default": [7] * KEY_STRIPES}
+        ):
+            with mock.patch.object(bus, "active", return_value=True):
+                get_license_status_coalesced(brand, "KEY", {})
+                # Writes to other keys leave the flight as it is.
+                bus._receive("default", f"8 {STATUS_TOPIC}\n{other}")
+                get_license_status_coalesced(brand, "KEY", {})
+                # A write to this key committed: later callers start afresh.
+                bus._receive("default", f"9 {STATUS_TOPIC}\n{prefix}")
+                get_license_status_coalesced(brand, "KEY", {})
+            # Listener down: no cross-worker sharing.
+            get_license_status_coalesced(brand, "KEY", {})
+        self.assertEqual(keys, [f"{prefix}:7", f"{prefix}:7", f"{prefix}:9"])
+
+    def test_leader_releases_the_lock(self):
+        self.assertIsNone(shared_flight("default", "k", lambda: None, 2))
+        self.assertIsNone(cache.get("flight:k"))
+        self.assertEqual(shared_flight("default", "k", lambda: "next", 2), "next")
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from licenses.admin import LicenseKeyAdmin
+from licenses.compact import decode_key, encode_key, instance_hash, key_prefix_ranges
+from licenses.models import Activation, Brand, License, LicenseKey, Product
+
+KEYS = [
+    "G1-0123456789ABCDEF01234567",
+    "G1-FFFFFFFFFFFFFFFFFFFFFFFF",
+    # Not the issued format: stored as text, still exact.
+    "g1-0123456789abcdef01234567",
+    "G1-0123456789ABCDEF0123456",
+    "G1-BRAND-0-000042",
+    "LEGACY-KEY-ÄÖ-1",
+]
+
+
+class CompactEncodingTests(TestCase):
+    def test_python_matches_sql(self):
+        with connection.cursor() as cursor:
+            for key in KEYS:
+                cursor.execute(
+                    "SELECT licenses_key_bytes(%s), "
+                    "licenses_key_text(licenses_key_bytes(%s)), "
+                    "licenses_instance_hash(%s)",
+                    [key, key, key],
+                )
+                key_bytes, text, hashed = cursor.fetchone()
+                self.assertEqual(bytes(key_bytes), encode_key(key))
+                self.assertEqual(text, key)
+                self.assertEqual(decode_key(key_bytes), key)
+                self.assertEqual(hashed, instance_hash(key))
+        self.assertEqual(len(encode_key(KEYS[0])), 13)
+        self.assertNotEqual(encode_key(KEYS[0]), encode_key(KEYS[2]))
+
+    def test_prefix_ranges_match_exactly_the_prefixed_keys(self):
+        for prefix in (
+            "G",
+            "G1-",
+            "G1-0123",
+            "G1-0123456789ABCDEF01234567",
+            "g1-",
+            "L",
+        ):
+            ranges = key_prefix_ranges(prefix)
+            for key in KEYS:
+                inside = any(low <= encode_key(key) <= high for low, high in ranges)
+                self.assertEqual(inside, key.startswith(prefix), (prefix, key))
+
+
+class CompactColumnTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm")
+        product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.keys = LicenseKey.objects.bulk_create(
+            LicenseKey(brand=self.brand, key_string=key, customer_email="a@b.com")
+            for key in KEYS
+        )
+        self.license = License.objects.create(
+            license_key=self.keys[0],
+            product=product,
+            expiration_date=timezone.now() + timedelta(days=1),
+        )
+
+    def test_triggers_fill_compact_columns(self):
+        for key in LicenseKey.objects.all():
+            self.assertEqual(bytes(key.key_bytes), encode_key(key.key_string))
+        key = LicenseKey.objects.get(key_bytes=encode_key(KEYS[0]))
+        key.key_string = "G1-AAAAAAAAAAAAAAAAAAAAAAAA"
+        key.save()
+        key.refresh_from_db()
+        self.assertEqual(bytes(key.key_bytes), b"\x01" + b"\xaa" * 12)
+
+        Activation.objects.create(license=self.license, instance_identifier="site-1")
+        self.assertTrue(
+            Activation.objects.filter(
+                instance_hash=instance_hash("site-1"), instance_identifier="site-1"
+            ).exists()
+        )
+
+    def test_admin_prefix_search(self):
+        model_admin = LicenseKeyAdmin(LicenseKey, admin.site)
+        request = RequestFactory().get("/")
+        for term, expected in (
+            ("g1-0123", {KEYS[0], KEYS[3]}),
+            ("legacy", {KEYS[5]}),
+            ("a@b", set(KEYS)),
+        ):
+            queryset, _ = model_admin.get_search_results(
+                request, LicenseKey.objects.all(), term
+            )
+            self.assertEqual({key.key_string for key in queryset}, expected, term)
+
+    def test_triggers_only_fire_for_their_source_column(self):
+        activation = Activation.objects.create(
+            license=self.license, instance_identifier="site-1"
+        )
+        activations = Activation.objects.filter(id=activation.id)
+        # Marks the stored hash so a recomputation would show.
+        activations.update(instance_hash=0)
+        activations.update(lease_expires_at=timezone.now())
+        self.assertEqual(activations.get().instance_hash, 0)
+        activations.update(instance_identifier="site-2")
+        self.assertEqual(activations.get().instance_hash, instance_hash("site-2"))
+
+        keys = LicenseKey.objects.filter(id=self.keys[0].id)
+        keys.update(key_bytes=b"")
+        keys.update(customer_email="c@d.com")
+        self.assertEqual(bytes(keys.get().key_bytes), b"")
+        keys.update(key_string=KEYS[1] + "X")
+        self.assertEqual(bytes(keys.get().key_bytes), encode_key(KEYS[1] + "X"))
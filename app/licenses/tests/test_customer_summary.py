@@ -0,0 +1,169 @@
+import json
+import time
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from licenses.models import (
+    Activation,
+    Brand,
+    CustomerLicenseSummary,
+    CustomerSummaryRefresh,
+    LicenseKeyChange,
+    Product,
+)
+from licenses.serializers import GlobalLicenseKeySerializer
+from licenses.services.activation import ActivationService
+from licenses.services.lifecycle import LicenseLifecycleService
+from licenses.services.lookups import GlobalLookupService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.summaries import CustomerSummaryService
+from licenses.sharding import use_shard
+
+
+class CustomerSummaryMixin:
+    databases = "__all__"
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="User@Example.com",
+            product_ids=[self.product.id],
+            context=self.ctx,
+        )
+        self.license = self.key.licenses.get()
+
+    def summary(self):
+        return json.loads(
+            CustomerLicenseSummary.objects.get(license_key_id=self.key.id).document
+        )
+
+    def seats_used(self):
+        return self.summary()["entitlements"][0]["seats_used"]
+
+    def refresh(self):
+        with use_shard(self.brand._state.db):
+            return CustomerSummaryService.refresh_pending(100, self.ctx)
+
+    def expected(self):
+        return json.loads(
+            json.dumps(
+                GlobalLicenseKeySerializer(
+                    GlobalLookupService.get_all_licenses_by_email(
+                        "user@example.com", self.ctx
+                    ),
+                    many=True,
+                ).data
+            )
+        )
+
+
+class CustomerSummaryTests(CustomerSummaryMixin, TestCase):
+    def test_services_keep_summary_current(self):
+        self.assertEqual(
+            CustomerLicenseSummary.objects.get().email_key, "USER@EXAMPLE.COM"
+        )
+        self.assertEqual([self.summary()], self.expected())
+
+        ActivationService.activate_instance(
+            brand=self.brand,
+            key_string=self.key.key_string,
+            instance_id="site-1.com",
+            product_id=self.product.id,
+            context=self.ctx,
+        )
+        # Queued by the activation, rendered by the refresher.
+        self.assertEqual(self.seats_used(), 0)
+        self.assertEqual(self.refresh(), 1)
+        self.assertEqual(self.seats_used(), 1)
+        self.assertFalse(CustomerSummaryRefresh.objects.exists())
+
+        LicenseLifecycleService.update_status(
+            brand=self.brand,
+            license_id=self.license.id,
+            new_status="suspended",
+            context=self.ctx,
+        )
+        self.refresh()
+        self.assertEqual(self.summary()["entitlements"][0]["status"], "suspended")
+        self.assertEqual([self.summary()], self.expected())
+
+    def test_direct_writes_and_renames_are_tracked(self):
+        Activation.objects.create(license=self.license, instance_identifier="a.com")
+        self.product.name = "Pro Plus"
+        self.product.save()
+        self.brand.name = "Rank Math"
+        self.brand.save()
+        self.refresh()
+        summary = self.summary()
+        self.assertEqual(summary["brand_name"], "Rank Math")
+        self.assertEqual(summary["entitlements"][0]["product_name"], "Pro Plus")
+        self.assertEqual(summary["entitlements"][0]["seats_used"], 1)
+
+        self.key.delete()
+        self.assertFalse(CustomerLicenseSummary.objects.exists())
+
+    def test_check_and_rebuild_commands(self):
+        Activation.objects.create(license=self.license, instance_identifier="a.com")
+        # Queued keys are not reported until the refresher had its turn.
+        call_command("check_customer_summaries", stdout=StringIO())
+        out = StringIO()
+        call_command("refresh_customer_summaries", stdout=out)
+        self.assertIn("Refreshed 1 customer summaries", out.getvalue())
+        call_command("check_customer_summaries", stdout=StringIO())
+
+        CustomerLicenseSummary.objects.update(document="{}")
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("check_customer_summaries", stdout=out)
+        self.assertIn(f"stale {self.key.id}", out.getvalue())
+
+        call_command("check_customer_summaries", "--fix", stdout=StringIO())
+        self.assertEqual([self.summary()], self.expected())
+
+        CustomerLicenseSummary.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_customer_summaries", stdout=out)
+        self.assertIn("Rebuilt 1 customer summaries", out.getvalue())
+        self.assertEqual([self.summary()], self.expected())
+
+
+class CustomerSummaryRefreshTests(CustomerSummaryMixin, TransactionTestCase):
+    def test_expired_leases_are_refreshed_without_reclaim(self):
+        self.license.lease_ttl = timezone.timedelta(minutes=5)
+        self.license.save()
+        ActivationService.activate_instance(
+            brand=self.brand,
+            key_string=self.key.key_string,
+            instance_id="runner-1",
+            product_id=self.product.id,
+            context=self.ctx,
+        )
+        expires = timezone.now() + timezone.timedelta(milliseconds=300)
+        # Still live: the renewal queues nothing.
+        Activation.objects.update(lease_expires_at=expires)
+        self.assertEqual(CustomerSummaryRefresh.objects.count(), 1)
+
+        self.assertEqual(self.refresh(), 1)
+        self.assertEqual(self.seats_used(), 1)
+        summary = CustomerLicenseSummary.objects.get(license_key_id=self.key.id)
+        self.assertEqual(summary.refresh_after, expires)
+        self.assertEqual(self.refresh(), 0)
+
+        position = LicenseKeyChange.objects.get(license_key_id=self.key.id).change_seq
+        time.sleep(0.4)
+        self.assertEqual(self.refresh(), 1)
+        self.assertEqual(self.seats_used(), 0)
+        # No write marked the expiry, so the refresher moves the key in the
+        # change feed.
+        self.assertGreater(
+            LicenseKeyChange.objects.get(license_key_id=self.key.id).change_seq,
+            position,
+        )
+        summary.refresh_from_db()
+        self.assertIsNone(summary.refresh_after)
+        self.assertEqual(self.refresh(), 0)
@@ -0,0 +1,33 @@
+import time
+import uuid
+from django.test import TestCase
+from core.ids import uuid7, uuid7_from, uuid7_time
+from licenses.models import Brand, Product
+
+
+class TimeOrderedIdTests(TestCase):
+    def test_layout(self):
+        ns = 1_760_000_000_123_456_789
+        value = uuid7_from(ns, (1 << 64) - 1)
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+        self.assertEqual(uuid7_time(value), ns // 1_000_000)
+        # Same millisecond, later fraction: still sorts later.
+        self.assertLess(value, uuid7_from(ns + 500_000, 0))
+        self.assertEqual(uuid.UUID(str(value)), value)
+
+    def test_ids_sort_by_creation(self):
+        before = time.time_ns() // 1_000_000
+        ids = [uuid7() for _ in range(1000)]
+        self.assertEqual(len(set(ids)), 1000)
+        self.assertLessEqual(before, uuid7_time(ids[0]))
+        # Ids from different milliseconds are strictly ordered.
+        by_ms = [uuid7_time(value) for value in ids]
+        self.assertEqual(by_ms, sorted(by_ms))
+
+    def test_models_default_to_uuid7(self):
+        brand = Brand.objects.create(name="RankMath", slug="rm")
+        product = Product.objects.create(brand=brand, name="Pro", slug="pro")
+        self.assertEqual(brand.id.version, 7)
+        self.assertLess(brand.id, product.id)
+        self.assertEqual(Brand.objects.get(id=str(brand.id)), brand)
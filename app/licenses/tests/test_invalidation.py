@@ -0,0 +1,97 @@
+import time
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from licenses.invalidation import GENERATION_SQL, PUBLISH_SQL, bus, status_key
+from licenses.models import Brand, License, Product
+from licenses.services.lifecycle import LicenseLifecycleService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.status import status_cache
+from licenses.sharding import brand_cache
+
+
+# Status documents are cached in the database render mode.
+@override_settings(
+    INVALIDATION_RECONNECT_SECONDS=0.1, ENTITLEMENT_RENDER_MODE="database"
+)
+class InvalidationBusTests(TransactionTestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "test"}
+        self.key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="user@example.com",
+            product_ids=[self.product.id],
+            context=self.ctx,
+        )
+        self.client = APIClient()
+        bus.start()
+        self.addCleanup(bus.stop)
+        self.wait_for(lambda: bus.connected)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.02)
+
+    def status(self):
+        resp = self.client.get(
+            f"/api/v1/licenses/status/{self.key.key_string}/", HTTP_X_BRAND_SLUG="rm"
+        )
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()["entitlements"][0]["status"]
+
+    def other_worker(self, sql, params=None):
+        """
+        Runs `sql` on a connection of its own, like another worker would.
+        """
+        conn = connection.Database.connect(**connection.get_connection_params())
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+        finally:
+            conn.close()
+
+    def test_notify_evicts_cached_documents(self):
+        self.assertEqual(self.status(), "valid")
+        # A change that does not publish is not seen until an eviction.
+        License.objects.update(status="suspended")
+        self.assertEqual(self.status(), "valid")
+        self.assertGreater(status_cache.hits + brand_cache.hits, 0)
+
+        received = bus.received
+        self.other_worker(
+            PUBLISH_SQL, [f"status\n{status_key(self.brand.id, self.key.key_string)}"]
+        )
+        self.wait_for(lambda: bus.received > received)
+        self.assertEqual(self.status(), "suspended")
+
+    def test_service_writes_evict_at_once(self):
+        self.assertEqual(self.status(), "valid")
+        license_inst = self.key.licenses.get()
+        LicenseLifecycleService.update_status(
+            self.brand, license_inst.id, "suspended", self.ctx
+        )
+        self.assertEqual(self.status(), "suspended")
+
+        self.client.get("/api/v1/licenses/status/x/", HTTP_X_BRAND_SLUG="rm")
+        self.brand.name = "Rank Math"
+        self.brand.save()
+        self.assertEqual(len(brand_cache.entries), 0)
+
+    def test_missed_notifications_clear_caches_on_reconnect(self):
+        self.assertEqual(self.status(), "valid")
+        self.assertTrue(status_cache.entries)
+        flushes = bus.flushes
+        # A number is taken while the listener is away: its NOTIFY is lost.
+        self.other_worker(
+            "SELECT nextval('licenses_invalidation_seq'), "
+            "pg_terminate_backend(pid) FROM pg_stat_activity WHERE query = %s",
+            [GENERATION_SQL],
+        )
+        self.wait_for(lambda: bus.flushes > flushes and bus.connected)
+        self.assertFalse(status_cache.entries)
+        self.assertEqual(self.status(), "valid")
@@ -0,0 +1,172 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db.models import F
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from licenses.models import Brand, Job, License, Product
+from licenses.services.jobs import JobService
+from licenses.services.provisioning import ProvisioningService
+
+
+class JobQueueTests(APITestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "test"}
+
+    def submit(self, kind, payload, **extra):
+        return self.client.post(
+            "/api/v1/licenses/jobs/",
+            {"kind": kind, "payload": payload, **extra},
+            format="json",
+            HTTP_X_BRAND_API_KEY="sk_rm",
+        )
+
+    def poll(self, job_id):
+        resp = self.client.get(
+            f"/api/v1/licenses/jobs/{job_id}/", HTTP_X_BRAND_API_KEY="sk_rm"
+        )
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def run_jobs(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("run_jobs", "--burst", stdout=out)
+        return out.getvalue()
+
+    def test_submit_run_and_poll(self):
+        resp = self.submit(
+            "provision_license_bundle",
+            {
+                "customer_email": "user@example.com",
+                "product_ids": [str(self.product.id)],
+            },
+        )
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.data["status"], "queued")
+        self.assertFalse(License.objects.exists())
+
+        self.assertIn(": succeeded", self.run_jobs())
+        job = self.poll(resp.data["id"])
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(job["result"]["customer_email"], "user@example.com")
+        self.assertEqual(License.objects.count(), 1)
+
+        other = Brand.objects.create(name="WPR", slug="wpr", api_key="sk_wpr")
+        resp = self.client.get(
+            f"/api/v1/licenses/jobs/{job['id']}/", HTTP_X_BRAND_API_KEY=other.api_key
+        )
+        self.assertEqual(resp.status_code, 404)
+
+    def test_payload_is_validated_on_submit(self):
+        resp = self.submit("license_lifecycle", {"action": "renew"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("license_id", resp.data["error"]["payload"])
+        self.assertFalse(Job.objects.exists())
+
+    def test_business_error_fails_without_retry(self):
+        resp = self.submit(
+            "license_lifecycle", {"action": "renew", "license_id": str(uuid.uuid4())}
+        )
+        self.run_jobs()
+        job = self.poll(resp.data["id"])
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["attempts"], 1)
+        self.assertIn("not found", job["error"])
+
+    @override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_BASE_SECONDS=30)
+    def test_transient_error_is_retried_with_backoff(self):
+        key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="user@example.com",
+            product_ids=[self.product.id],
+            context=self.ctx,
+        )
+        license_id = key.licenses.get().id
+        job = JobService.submit(
+            self.brand,
+            "license_lifecycle",
+            {
+                "action": "update_status",
+                "status": "suspended",
+                "license_id": license_id,
+            },
+            self.ctx,
+        )
+        with mock.patch(
+            "licenses.services.jobs.LicenseLifecycleService.update_status",
+            side_effect=ConnectionError("replica went away"),
+        ):
+            self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+        self.assertIn("replica went away", job.error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        # Not due yet: the backoff holds it back.
+        self.assertEqual(JobService.claim("w"), [])
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            (claimed,) = JobService.claim("w")
+            self.assertEqual(JobService.run(claimed, self.ctx), "succeeded")
+        self.assertEqual(License.objects.get(id=license_id).status, "suspended")
+
+    def test_claim_order_and_visibility_timeout(self):
+        payload = {"action": "renew", "days": 30, "license_id": str(uuid.uuid4())}
+        low = JobService.submit(self.brand, "license_lifecycle", payload, self.ctx)
+        high = JobService.submit(
+            self.brand, "license_lifecycle", payload, self.ctx, priority=10
+        )
+        (first,) = JobService.claim("w1")
+        self.assertEqual(first.id, high.id)
+        (second,) = JobService.claim("w2")
+        self.assertEqual(second.id, low.id)
+        self.assertEqual(JobService.claim("w3"), [])
+
+        # w1 stalls past its visibility deadline; w3 takes the job over and
+        # w1's late outcome is discarded.
+        Job.objects.filter(id=high.id).update(run_after=timezone.now())
+        (retaken,) = JobService.claim("w3")
+        self.assertEqual((retaken.id, retaken.attempts), (high.id, 2))
+        self.assertEqual(JobService.run(first, self.ctx), "lost")
+        self.assertEqual(JobService.run(retaken, self.ctx), "failed")
+
+    def test_run_overtaken_mid_flight_commits_nothing(self):
+        job = JobService.submit(
+            self.brand,
+            "provision_license_bundle",
+            {"customer_email": "user@example.com", "product_ids": [self.product.id]},
+            self.ctx,
+        )
+        (claimed,) = JobService.claim("w1")
+        provision = ProvisioningService.provision_license_bundle
+
+        def overtaken(**kwargs):
+            # w1 stalls past its deadline and w2 claims the job meanwhile.
+            Job.objects.filter(id=job.id).update(
+                attempts=F("attempts") + 1, locked_by="w2"
+            )
+            return provision(**kwargs)
+
+        with mock.patch(
+            "licenses.services.jobs.ProvisioningService.provision_license_bundle",
+            side_effect=overtaken,
+        ):
+            self.assertEqual(JobService.run(claimed, self.ctx), "lost")
+        self.assertFalse(License.objects.exists())
+
+        job.refresh_from_db()
+        self.assertEqual(JobService.run(job, self.ctx), "succeeded")
+        self.assertEqual(License.objects.count(), 1)
+        # Delivered again after it committed: nothing left to claim or run.
+        self.assertEqual(JobService.claim("w3"), [])
+        self.assertEqual(JobService.run(job, self.ctx), "lost")
+        self.assertEqual(License.objects.count(), 1)
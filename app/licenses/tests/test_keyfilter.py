@@ -0,0 +1,130 @@
+import threading
+import time
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, override_settings
+from licenses.invalidation import KEY_TOPIC, bus, status_key
+from licenses.keyfilter import BloomFilter, key_filter
+from licenses.models import Brand, LicenseKey, Product
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.status import StatusService
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives_and_bounded_size(self):
+        bloom = BloomFilter(capacity=1000, fp_rate=0.01, max_bytes=1024)
+        keys = [f"KEY-{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertLessEqual(bloom.nbytes, 1024)
+        false_positives = sum(f"OTHER-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class KeyFilterTestMixin:
+    databases = "__all__"
+
+    def setUp(self):
+        key_filter.clear()
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="user@example.com",
+            product_ids=[self.product.id],
+            context=self.ctx,
+        )
+        key_filter.warm()
+
+    def listener(self, connected):
+        return mock.patch.object(bus, "active", return_value=connected)
+
+
+class LicenseKeyFilterTests(KeyFilterTestMixin, TestCase):
+    def test_unknown_key_is_rejected_after_one_probe(self):
+        with self.listener(True), self.assertNumQueries(1):
+            self.assertIsNone(
+                StatusService.get_license_status_json(self.brand, "G1-NOPE", self.ctx)
+            )
+        self.assertFalse(key_filter.might_exist(self.brand, "G1-NOPE"))
+
+    def test_provisioned_key_is_admitted(self):
+        new_key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="other@example.com",
+            product_ids=[self.product.id],
+            context=self.ctx,
+        )
+        for key_string in (self.key.key_string, new_key.key_string):
+            self.assertTrue(key_filter.might_exist(self.brand, key_string))
+        self.assertIsNotNone(
+            StatusService.get_license_status_json(
+                self.brand, new_key.key_string, self.ctx
+            )
+        )
+
+    def test_key_announced_by_another_worker_is_admitted(self):
+        bus._evict(KEY_TOPIC, [status_key(self.brand.id, "G1-ANNOUNCED")])
+        with self.listener(True), self.assertNumQueries(0):
+            self.assertTrue(key_filter.might_exist(self.brand, "G1-ANNOUNCED"))
+
+    def test_key_minted_elsewhere_is_picked_up_by_refresh(self):
+        LicenseKey.objects.create(
+            brand=self.brand, key_string="G1-ELSEWHERE", customer_email="x@example.com"
+        )
+        with self.listener(True), override_settings(
+            LICENSE_KEY_FILTER_REFRESH_SECONDS=0
+        ):
+            self.assertTrue(key_filter.might_exist(self.brand, "G1-ELSEWHERE"))
+        self.assertGreater(key_filter.stats()["refreshes"], 0)
+
+    @override_settings(LICENSE_KEY_FILTER_REFRESH_SECONDS=3600)
+    def test_misses_check_keys_minted_without_announcement(self):
+        # Another worker committed the key; its NOTIFY has not arrived (or
+        # the listener is down).
+        for connected, key_string in ((True, "G1-UNANNOUNCED"), (False, "G1-DOWN")):
+            LicenseKey.objects.create(
+                brand=self.brand, key_string=key_string, customer_email="x@example.com"
+            )
+            with self.listener(connected):
+                with self.assertNumQueries(1):
+                    self.assertTrue(key_filter.might_exist(self.brand, key_string))
+                with self.assertNumQueries(0):
+                    self.assertTrue(key_filter.might_exist(self.brand, key_string))
+                with self.assertNumQueries(1):
+                    self.assertFalse(key_filter.might_exist(self.brand, "G1-NOPE"))
+
+    def test_counters(self):
+        before = key_filter.stats()
+        key_filter.might_exist(self.brand, self.key.key_string)
+        with self.listener(True):
+            key_filter.might_exist(self.brand, "G1-NOPE")
+        after = key_filter.stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["brands"], 1)
+
+    @override_settings(LICENSE_KEY_FILTER_ENABLED=False)
+    def test_disabled_filter_admits_everything(self):
+        self.assertTrue(key_filter.might_exist(self.brand, "G1-NOPE"))
+
+
+class LicenseKeyFilterRebuildTests(KeyFilterTestMixin, TransactionTestCase):
+    def test_stale_filter_answers_while_rebuilt_in_background(self):
+        stale = key_filter._filters[self.brand.id]
+        stale.built_at = time.monotonic() - 3601
+        LicenseKey.objects.create(
+            brand=self.brand, key_string="G1-SCANNED", customer_email="x@example.com"
+        )
+        with self.listener(True):
+            self.assertTrue(key_filter.might_exist(self.brand, self.key.key_string))
+            # Announced while the rebuild runs: kept in the new filter.
+            key_filter.add(self.brand.id, "G1-DURING")
+            for thread in threading.enumerate():
+                if thread.name == "license-key-filter-rebuild":
+                    thread.join(5)
+            fresh = key_filter._filters[self.brand.id]
+            self.assertIsNot(fresh, stale)
+            for key_string in (self.key.key_string, "G1-SCANNED", "G1-DURING"):
+                self.assertTrue(key_filter.might_exist(self.brand, key_string))
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+from licenses.models import Activation, AuditLog, Brand, Product
+from licenses.serializers import LicenseStatusResponseSerializer
+from licenses.services.activation import ActivationService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.status import StatusService
+
+
+class LeaseTestMixin:
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="ci@example.com",
+            product_ids=[self.product.id],
+            context=self.ctx,
+        )
+        self.license = self.key.licenses.get()
+        self.license.seat_limit = 1
+        self.license.lease_ttl = timezone.timedelta(minutes=5)
+        self.license.save()
+
+    def activate(self, instance_id):
+        return ActivationService.activate_instance(
+            brand=self.brand,
+            key_string=self.key.key_string,
+            instance_id=instance_id,
+            product_id=self.product.id,
+            context=self.ctx,
+        )
+
+    def renew(self, instance_id):
+        return ActivationService.renew_lease(
+            brand=self.brand,
+            key_string=self.key.key_string,
+            instance_id=instance_id,
+            product_id=self.product.id,
+            context=self.ctx,
+        )
+
+    def expire(self, instance_id):
+        Activation.objects.filter(instance_identifier=instance_id).update(
+            lease_expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+
+
+class LeaseServiceTests(LeaseTestMixin, TestCase):
+    def test_expired_lease_frees_seat_without_sweeper(self):
+        self.activate("runner-1")
+        with self.assertRaises(ValidationError):
+            self.activate("runner-2")
+
+        self.expire("runner-1")
+        self.activate("runner-2")
+        self.assertEqual(Activation.objects.count(), 2)
+
+        payload = StatusService.get_license_status_payload(
+            self.brand, self.key.key_string, self.ctx
+        )
+        document = json.loads(
+            StatusService.get_license_status_json(
+                self.brand, self.key.key_string, self.ctx
+            )
+        )
+        legacy = LicenseStatusResponseSerializer(
+            StatusService.get_license_status(self.brand, self.key.key_string, self.ctx)
+        ).data
+        for result in (payload, document, legacy):
+            self.assertEqual(result["entitlements"][0]["seats_used"], 1)
+            self.assertEqual(result["entitlements"][0]["seats_remaining"], 0)
+
+    def test_expired_instance_can_activate_again(self):
+        self.activate("runner-1")
+        self.expire("runner-1")
+        self.activate("runner-1")
+        activation = Activation.objects.get()
+        self.assertTrue(activation.is_live())
+
+    def test_renewal_extends_only_live_leases(self):
+        self.activate("runner-1")
+        first = Activation.objects.get().lease_expires_at
+        renewed = self.renew("runner-1")
+        self.assertGreaterEqual(renewed, first)
+
+        self.expire("runner-1")
+        with self.assertRaises(ValidationError):
+            self.renew("runner-1")
+
+    def test_permanent_seats_are_not_leases(self):
+        self.license.lease_ttl = None
+        self.license.save()
+        self.activate("site-1")
+        self.assertIsNone(Activation.objects.get().lease_expires_at)
+        with self.assertRaises(ValidationError):
+            self.renew("site-1")
+
+    def test_reclaim_deletes_expired_leases_in_batches(self):
+        self.license.seat_limit = 10
+        self.license.save()
+        for i in range(5):
+            self.activate(f"runner-{i}")
+        for i in range(3):
+            self.expire(f"runner-{i}")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ActivationService.reclaim_expired_leases(2, self.ctx), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ActivationService.reclaim_expired_leases(2, self.ctx), 1)
+        self.assertEqual(ActivationService.reclaim_expired_leases(2, self.ctx), 0)
+
+        self.assertEqual(
+            set(Activation.objects.values_list("instance_identifier", flat=True)),
+            {"runner-3", "runner-4"},
+        )
+        reasons = AuditLog.objects.filter(
+            license_id=self.license.id, action="deactivation"
+        ).values_list("after__reason", flat=True)
+        self.assertEqual(list(reasons), ["lease_expired"] * 3)
+
+
+class LeaseRaceTests(LeaseTestMixin, TransactionTestCase):
+    def test_renewal_waits_for_the_seat_lock(self):
+        self.activate("runner-1")
+        Activation.objects.update(
+            lease_expires_at=timezone.now() + timezone.timedelta(milliseconds=300)
+        )
+        # An activation holds the seat lock while the lease is still live.
+        conn = connection.Database.connect(**connection.get_connection_params())
+        self.addCleanup(conn.close)
+        with conn.cursor() as other:
+            other.execute(
+                "SELECT 1 FROM licenses_license WHERE id = %s FOR UPDATE",
+                [self.license.id],
+            )
+        outcome = []
+
+        def renew():
+            try:
+                outcome.append(self.renew("runner-1"))
+            except ValidationError as e:
+                outcome.append(e)
+            finally:
+                connection.close()
+
+        renewal = threading.Thread(target=renew)
+        renewal.start()
+        # The lease expires meanwhile, and the activation takes its seat.
+        time.sleep(0.5)
+        self.assertEqual(outcome, [])
+        conn.commit()
+        renewal.join()
+        self.assertIsInstance(outcome[0], ValidationError)
+
+
+class LeaseRenewalApiTests(LeaseTestMixin, APITestCase):
+    def test_renew_endpoint(self):
+        self.activate("runner-1")
+        body = {
+            "license_key": self.key.key_string,
+            "instance_id": "runner-1",
+            "product_id": self.product.id,
+        }
+        url = "/api/v1/licenses/activate/renew/"
+        resp = self.client.post(url, body, HTTP_X_BRAND_SLUG="rm")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["status"], "renewed")
+
+        self.expire("runner-1")
+        resp = self.client.post(url, body, HTTP_X_BRAND_SLUG="rm")
+        self.assertEqual(resp.status_code, status.HTTP_409_CONFLICT)
@@ -0,0 +1,135 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from licenses.models import (
+    Activation,
+    AuditLog,
+    Brand,
+    CustomerLicenseSummary,
+    Product,
+)
+from licenses.services.activation import ActivationService
+from licenses.services.provisioning import ProvisioningService
+
+
+class MachineDeactivationTests(APITestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.products = [
+            Product.objects.create(brand=self.brand, name=name, slug=name)
+            for name in ("pro", "seo")
+        ]
+        self.keys = [
+            self.provision(self.brand, self.products, "ops@example.com"),
+            self.provision(self.brand, self.products[:1], "dev@example.com"),
+        ]
+        for key in self.keys:
+            for lic in key.licenses.all():
+                self.activate(self.brand, key, lic.product_id, "srv-1.example")
+        self.activate(self.brand, self.keys[0], self.products[0].id, "srv-2.example")
+
+        other = Brand.objects.create(name="WPRocket", slug="wpr", api_key="sk_wpr")
+        other_product = Product.objects.create(brand=other, name="Rocket", slug="rkt")
+        self.other_key = self.provision(other, [other_product], "ops@example.com")
+        self.activate(other, self.other_key, other_product.id, "srv-1.example")
+        self.url = "/api/v1/licenses/deactivate/machine/"
+
+    def provision(self, brand, products, email):
+        return ProvisioningService.provision_license_bundle(
+            brand=brand,
+            customer_email=email,
+            product_ids=[product.id for product in products],
+            context=self.ctx,
+        )
+
+    def activate(self, brand, key, product_id, instance_id):
+        ActivationService.activate_instance(
+            brand=brand,
+            key_string=key.key_string,
+            instance_id=instance_id,
+            product_id=product_id,
+            context=self.ctx,
+        )
+
+    def seats_used(self, key):
+        call_command("refresh_customer_summaries", stdout=StringIO())
+        document = json.loads(
+            CustomerLicenseSummary.objects.get(license_key_id=key.id).document
+        )
+        return sum(entry["seats_used"] for entry in document["entitlements"])
+
+    def test_releases_instance_on_every_license_of_the_brand(self):
+        self.assertEqual(self.seats_used(self.keys[0]), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                self.url,
+                {"instance_ids": ["srv-1.example", "unknown.example"]},
+                format="json",
+                HTTP_X_BRAND_API_KEY="sk_rm",
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["seats_freed"], 3)
+        self.assertEqual(len(resp.data["licenses"]), 3)
+        for entry in resp.data["licenses"]:
+            self.assertEqual(entry["instance_ids"], ["srv-1.example"])
+            self.assertEqual(entry["seats_freed"], 1)
+
+        remaining = Activation.objects.values_list(
+            "instance_identifier", "license__license_key__brand__slug"
+        )
+        self.assertCountEqual(
+            remaining, [("srv-2.example", "rm"), ("srv-1.example", "wpr")]
+        )
+        self.assertEqual(self.seats_used(self.keys[0]), 1)
+        self.assertEqual(self.seats_used(self.keys[1]), 0)
+
+        # Retrying is harmless (and flushes the queued audit entries).
+        again = self.client.post(
+            self.url,
+            {"instance_ids": ["srv-1.example"]},
+            format="json",
+            HTTP_X_BRAND_API_KEY="sk_rm",
+        )
+        self.assertEqual(again.data["seats_freed"], 0)
+        self.assertEqual(again.data["licenses"], [])
+        self.assertEqual(
+            AuditLog.objects.filter(
+                brand_id=self.brand.id,
+                action="deactivation",
+                after__reason="machine_deactivation",
+            ).count(),
+            3,
+        )
+
+    def test_expired_leases_are_released_without_freeing_seats(self):
+        Activation.objects.filter(instance_identifier="srv-2.example").update(
+            lease_expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+        released = ActivationService.deactivate_machine(
+            self.brand, ["srv-2.example"], self.ctx
+        )
+        self.assertEqual(
+            [(e["instance_ids"], e["seats_freed"]) for e in released],
+            [(["srv-2.example"], 0)],
+        )
+
+    def test_requires_brand_api_key_and_limits_instances(self):
+        resp = self.client.post(
+            self.url, {"instance_ids": ["srv-1.example"]}, format="json"
+        )
+        self.assertIn(resp.status_code, (401, 403))
+        with self.settings(MACHINE_DEACTIVATION_MAX_INSTANCES=1):
+            resp = self.client.post(
+                self.url,
+                {"instance_ids": ["a", "b"]},
+                format="json",
+                HTTP_X_BRAND_API_KEY="sk_rm",
+            )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Activation.objects.count(), 5)
@@ -0,0 +1,46 @@
+import json
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from core.openapi import load_schema
+
+
+class OpenApiSchemaTests(TestCase):
+    def setUp(self):
+        load_schema.cache_clear()
+        self.addCleanup(load_schema.cache_clear)
+
+    def test_serves_prebuilt_file_with_etag(self):
+        with tempfile.NamedTemporaryFile("wb", suffix=".json", delete=False) as f:
+            f.write(b'{"openapi": "3.0.3"}')
+        self.addCleanup(os.unlink, f.name)
+
+        with override_settings(API_SCHEMA_FILE=f.name):
+            response = self.client.get("/api/schema/")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response["Content-Type"], "application/vnd.oai.openapi+json"
+            )
+            self.assertEqual(response.content, b'{"openapi": "3.0.3"}')
+            etag = response["ETag"]
+
+            cached = self.client.get("/api/schema/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(cached.status_code, 304)
+            self.assertEqual(cached.content, b"")
+
+            # Read once per process: later edits to the file are not seen.
+            with open(f.name, "wb") as changed:
+                changed.write(b"{}")
+            self.assertEqual(self.client.get("/api/schema/")["ETag"], etag)
+
+    def test_generates_once_without_prebuilt_file(self):
+        with override_settings(API_SCHEMA_FILE="/nonexistent/openapi.json"):
+            response = self.client.get("/api/schema/")
+        self.assertEqual(response.status_code, 200)
+        schema = json.loads(response.content)
+        self.assertIn("/api/v1/licenses/status/{key_string}/", schema["paths"])
+
+    def test_docs_routes_use_schema(self):
+        response = self.client.get("/api/doc/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "/api/schema/")
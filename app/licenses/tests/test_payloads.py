@@ -0,0 +1,197 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from licenses.models import Activation, Brand, LicenseKey, Product
+from licenses.serializers import (
+    GlobalLicenseKeySerializer,
+    LicenseStatusResponseSerializer,
+)
+from licenses.services.lookups import GlobalLookupService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.status import StatusService
+
+
+class FastPayloadParityTests(TestCase):
+    """The fast payload path must render the same JSON as the serializers."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product_a = Product.objects.create(
+            brand=self.brand, name="Pro", slug="pro"
+        )
+        self.product_b = Product.objects.create(
+            brand=self.brand, name="Content AI", slug="ai"
+        )
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="user@example.com",
+            product_ids=[self.product_a.id, self.product_b.id],
+            context=self.ctx,
+        )
+        lic = self.key.licenses.get(product=self.product_a)
+        lic.seat_limit = 3
+        lic.save()
+        Activation.objects.create(license=lic, instance_identifier="site-1.com")
+        # Null expiration and seat limit must render as null on both paths.
+        self.key.licenses.filter(product=self.product_b).update(expiration_date=None)
+        call_command("refresh_customer_summaries", stdout=StringIO())
+        self.render = JSONRenderer().render
+
+    def test_status_payload_matches_serializer(self):
+        expected = LicenseStatusResponseSerializer(
+            StatusService.get_license_status(self.brand, self.key.key_string, self.ctx)
+        ).data
+        payload = StatusService.get_license_status_payload(
+            self.brand, self.key.key_string, self.ctx
+        )
+        self.assertEqual(self.render(payload), self.render(expected))
+        self.assertEqual(payload["entitlements"][0]["seats_remaining"], 2)
+
+    def test_global_payloads_match_serializer(self):
+        other = Brand.objects.create(name="WP Rocket", slug="wpr", api_key="sk_wpr")
+        LicenseKey.objects.create(
+            brand=other, key_string="G1-OTHER", customer_email="USER@example.com"
+        )
+        expected = GlobalLicenseKeySerializer(
+            GlobalLookupService.get_all_licenses_by_email("user@example.com", self.ctx),
+            many=True,
+        ).data
+        payloads = GlobalLookupService.get_license_payloads_by_email(
+            "user@example.com", self.ctx
+        )
+        self.assertEqual(len(payloads), 2)
+        self.assertEqual(self.render(payloads), self.render(expected))
+
+    def test_unknown_key_returns_none(self):
+        self.assertIsNone(
+            StatusService.get_license_status_payload(self.brand, "G1-NOPE", self.ctx)
+        )
+
+
+class DatabaseDocumentTests(TestCase):
+    """Documents assembled in PostgreSQL must match the Python renderers."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_test")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.ctx = {"request_id": "unit-test-id", "brand_id": self.brand.id}
+        self.keys = [
+            ProvisioningService.provision_license_bundle(
+                brand=self.brand,
+                customer_email=f"user+{i}@example.com",
+                product_ids=[self.product.id],
+                context=self.ctx,
+            )
+            for i in range(3)
+        ]
+        # Provisioning rejects a second valid license per email and product,
+        # so share one email across keys afterwards.
+        LicenseKey.objects.update(customer_email="user@example.com")
+        lic = self.keys[0].licenses.get()
+        lic.seat_limit = 2
+        lic.expiration_date = lic.expiration_date.replace(microsecond=0)
+        lic.save()
+        Activation.objects.create(license=lic, instance_identifier="site-1.com")
+
+    def test_status_document_matches_python_payload(self):
+        key_string = self.keys[0].key_string
+        document = StatusService.get_license_status_json(
+            self.brand, key_string, self.ctx
+        )
+        payload = StatusService.get_license_status_payload(
+            self.brand, key_string, self.ctx
+        )
+        self.assertEqual(json.loads(document), payload)
+        self.assertIsNone(
+            StatusService.get_license_status_json(self.brand, "G1-NOPE", self.ctx)
+        )
+
+    def test_global_pages_match_python_pages(self):
+        for page in (1, 2, 3):
+            document = GlobalLookupService.get_license_page_json(
+                "USER@example.com", self.ctx, page, 2
+            )
+            expected = GlobalLookupService.get_license_page(
+                "USER@example.com", self.ctx, page, 2
+            )
+            self.assertEqual(json.loads(document), expected)
+        first = json.loads(
+            GlobalLookupService.get_license_page_json(
+                "user@example.com", self.ctx, 1, 2
+            )
+        )
+        self.assertEqual(first["total_keys_found"], 3)
+        self.assertEqual(first["next_page"], 2)
+        self.assertEqual(len(first["licenses"]), 2)
+
+    def test_global_lookup_lists_every_key_unless_paged(self):
+        for mode in ("python", "database"):
+            with self.settings(ENTITLEMENT_RENDER_MODE=mode):
+                full = self.client.get(
+                    "/api/v1/licenses/global-customer-lookup/",
+                    {"email": "user@example.com"},
+                    HTTP_X_BRAND_API_KEY="sk_test",
+                ).json()
+                paged = self.client.get(
+                    "/api/v1/licenses/global-customer-lookup/",
+                    {"email": "user@example.com", "page_size": 2},
+                    HTTP_X_BRAND_API_KEY="sk_test",
+                ).json()
+            self.assertEqual(
+                list(full), ["customer_email", "total_keys_found", "licenses"]
+            )
+            self.assertEqual((full["total_keys_found"], len(full["licenses"])), (3, 3))
+            self.assertEqual(
+                (paged["page"], paged["page_size"], paged["next_page"]), (1, 2, 2)
+            )
+            self.assertEqual(paged["licenses"], full["licenses"][:2])
+
+    def test_responses_are_byte_identical_in_both_modes(self):
+        # Non-ASCII text, a line separator (escaped by DRF only) and
+        # microseconds exercise the renderers' differences.
+        Product.objects.filter(id=self.product.id).update(name="Pro – Édition ")
+        lic = self.keys[1].licenses.get()
+        lic.expiration_date = timezone.now().replace(microsecond=120)
+        lic.save()
+        call_command("refresh_customer_summaries", stdout=StringIO())
+        bodies = {}
+        for mode in ("python", "database"):
+            with self.settings(ENTITLEMENT_RENDER_MODE=mode):
+                status = self.client.get(
+                    f"/api/v1/licenses/status/{self.keys[1].key_string}/",
+                    HTTP_X_BRAND_SLUG="rm",
+                )
+                lookup = self.client.get(
+                    "/api/v1/licenses/global-customer-lookup/",
+                    {"email": "user@example.com"},
+                    HTTP_X_BRAND_API_KEY="sk_test",
+                )
+            self.assertEqual((status.status_code, lookup.status_code), (200, 200))
+            bodies[mode] = (status.content, lookup.content)
+        self.assertEqual(bodies["database"], bodies["python"])
+        self.assertIn("\\u2028".encode(), bodies["database"][0])
+
+    def test_timestamps_render_like_drf(self):
+        lic = self.keys[1].licenses.get()
+        lic.expiration_date = timezone.now().replace(microsecond=120)
+        lic.save()
+        document = json.loads(
+            StatusService.get_license_status_json(
+                self.brand, self.keys[1].key_string, self.ctx
+            )
+        )
+        payload = StatusService.get_license_status_payload(
+            self.brand, self.keys[1].key_string, self.ctx
+        )
+        self.assertEqual(
+            document["entitlements"][0]["expiration_date"],
+            payload["entitlements"][0]["expiration_date"],
+        )
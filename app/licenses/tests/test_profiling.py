@@ -0,0 +1,101 @@
+import glob
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from core.profiling import collector, rule_switch
+from licenses.models import Brand, Product
+from licenses.services.provisioning import ProvisioningService
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+        settings = override_settings(
+            PROFILE_DIR=self.dir,
+            PROFILE_CONTROL_FILE=os.path.join(self.dir, "rules.json"),
+            PROFILE_CONTROL_CHECK_SECONDS=0,
+            PROFILE_FLUSH_REQUESTS=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Re-read the rules on the next request, now and after this test.
+        rule_switch.next_check = 0.0
+        self.addCleanup(setattr, rule_switch, "next_check", 0.0)
+        self.addCleanup(setattr, rule_switch, "rules", ())
+
+        self.keys = {}
+        for slug in ("rm", "wpr"):
+            brand = Brand.objects.create(name=slug, slug=slug, api_key=f"sk_{slug}")
+            product = Product.objects.create(
+                brand=brand, name="Pro", slug=f"{slug}-pro"
+            )
+            self.keys[slug] = ProvisioningService.provision_license_bundle(
+                brand=brand,
+                customer_email=f"user@{slug}.example",
+                product_ids=[product.id],
+                context={"request_id": "setup"},
+            )
+
+    def command(self, *args):
+        out = StringIO()
+        call_command("profile_requests", *args, stdout=out)
+        return out.getvalue()
+
+    def status(self, slug):
+        resp = self.client.get(
+            f"/api/v1/licenses/status/{self.keys[slug].key_string}/",
+            HTTP_X_BRAND_SLUG=slug,
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    def profiles(self):
+        return glob.glob(os.path.join(self.dir, "*.prof"))
+
+    def test_profiles_matching_requests_and_reports(self):
+        self.status("rm")
+        self.assertEqual(self.profiles(), [])
+
+        self.command("start", "license-status", "--brand", "rm", "--rate", "1")
+        self.assertIn("license-status (rm): 100%", self.command("list"))
+        self.status("wpr")
+        self.status("rm")
+        self.status("rm")
+        (profile,) = self.profiles()
+        self.assertTrue(os.path.basename(profile).startswith("license-status."))
+        self.assertTrue(profile.endswith(".2.prof"))
+
+        merged = os.path.join(self.dir, "merged.out")
+        report = self.command("report", "--limit", "200", "--output", merged, "--clear")
+        self.assertIn("license-status: 2 requests in 1 profiles", report)
+        self.assertIn("get_license_status", report)
+        self.assertTrue(os.path.exists(merged))
+        self.assertEqual(self.profiles(), [])
+
+        self.assertEqual(self.command("stop"), "Stopped 1 rule(s).\n")
+        self.status("rm")
+        self.status("rm")
+        collector.flush()
+        self.assertEqual(self.profiles(), [])
+        self.assertEqual(self.command("list"), "Profiling is off.\n")
+
+    def test_partial_batch_is_dumped_when_its_rule_stops(self):
+        self.command("start", "license-status", "--rate", "1")
+        self.status("rm")
+        self.assertEqual(self.profiles(), [])
+        self.command("stop")
+        # The next request notices the rule is gone.
+        self.status("rm")
+        (profile,) = self.profiles()
+        self.assertTrue(profile.endswith(".1.prof"))
+
+    def test_rejects_unknown_endpoint_and_brand(self):
+        with self.assertRaisesMessage(CommandError, "No URL is named 'activate'"):
+            self.command("start", "activate")
+        with self.assertRaisesMessage(CommandError, "No brand with slug 'nope'"):
+            self.command("start", "license-activation", "--brand", "nope")
@@ -0,0 +1,259 @@
+import json
+import re
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from licenses.admin import LicenseAdmin, LicenseKeyAdmin
+from licenses.models import (
+    Activation,
+    Brand,
+    CustomerLicenseSummary,
+    License,
+    LicenseKey,
+    Product,
+)
+from licenses.services.activation import ActivationService
+from licenses.services.lifecycle import LicenseLifecycleService
+from licenses.services.lookups import GlobalLookupService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.status import StatusService
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+PLANNER_OVERRIDES = ("enable_seqscan", "enable_hashjoin", "enable_mergejoin")
+# Server-side cursors wrap the query in DECLARE ... FOR <query>.
+DECLARE_CURSOR = re.compile(r"^DECLARE\s.*?\sCURSOR\s.*?\sHOLD\sFOR\s", re.DOTALL)
+
+
+class QueryPlanRegressionTests(TestCase):
+    """
+    Runs EXPLAIN on every statement the services emit and fails if any
+    of them needs a full table scan. Sequential scans, hash joins and merge
+    joins are disabled for the EXPLAIN, so the planner only falls back to a
+    full scan when no index can serve a filter or join key, which keeps the
+    check meaningful on a small dataset. An index scan without an index
+    condition is a full scan in disguise, so it fails too.
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        expiration_date = timezone.now() + timezone.timedelta(days=365)
+        cls.brands = [
+            Brand.objects.create(name=f"Brand {b}", slug=f"brand-{b}") for b in range(3)
+        ]
+        for brand in cls.brands:
+            products = Product.objects.bulk_create(
+                Product(brand=brand, name=f"P{p}", slug=f"{brand.slug}-p{p}")
+                for p in range(4)
+            )
+            keys = LicenseKey.objects.bulk_create(
+                LicenseKey(
+                    brand=brand,
+                    key_string=f"G1-{brand.slug.upper()}-{k:06d}",
+                    customer_email=f"customer{k}@example.com",
+                )
+                for k in range(400)
+            )
+            licenses = License.objects.bulk_create(
+                License(
+                    license_key=key,
+                    product=product,
+                    expiration_date=expiration_date,
+                    seat_limit=10,
+                )
+                for key in keys
+                for product in products[:2]
+            )
+            Activation.objects.bulk_create(
+                Activation(license=lic, instance_identifier=f"site-{i}.example")
+                for lic in licenses
+                for i in range(2)
+            )
+        with connection.cursor() as cursor:
+            for model in (
+                Brand,
+                Product,
+                LicenseKey,
+                License,
+                Activation,
+                CustomerLicenseSummary,
+            ):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+        cls.brand = cls.brands[0]
+        cls.key = LicenseKey.objects.filter(brand=cls.brand).first()
+        cls.license = cls.key.licenses.first()
+        cls.product = cls.license.product
+        cls.spare_product = Product.objects.filter(brand=cls.brand).last()
+
+    def setUp(self):
+        self.ctx = {"request_id": "plan-test", "brand_id": self.brand.id}
+
+    def assertNoSeqScans(self, func):
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        statements = [
+            sql
+            for sql in (
+                DECLARE_CURSOR.sub("", q["sql"].strip())
+                for q in captured.captured_queries
+            )
+            if sql.lstrip().startswith(EXPLAINABLE)
+        ]
+        self.assertTrue(statements, "No queries were captured.")
+        with connection.cursor() as cursor:
+            for setting in PLANNER_OVERRIDES:
+                cursor.execute(f"SET LOCAL {setting} = off")
+            for sql in statements:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = list(self._full_scans(plan[0]["Plan"]))
+                self.assertFalse(
+                    scans, f"Full table scan on {', '.join(scans)} in:\n{sql}"
+                )
+            for setting in PLANNER_OVERRIDES:
+                cursor.execute(f"SET LOCAL {setting} = on")
+
+    def _full_scans(self, node):
+        node_type = node["Node Type"]
+        if node_type == "Seq Scan":
+            yield node["Relation Name"]
+        elif node_type in ("Index Scan", "Index Only Scan") and (
+            "Index Cond" not in node
+        ):
+            yield f"{node['Relation Name']} (full scan of {node['Index Name']})"
+        for child in node.get("Plans", []):
+            yield from self._full_scans(child)
+
+    def test_activation_service(self):
+        self.assertNoSeqScans(
+            lambda: ActivationService.activate_instance(
+                brand=self.brand,
+                key_string=self.key.key_string,
+                instance_id="plan-site.example",
+                product_id=self.product.id,
+                context=self.ctx,
+            )
+        )
+        self.assertNoSeqScans(
+            lambda: ActivationService.deactivate_instance(
+                brand=self.brand,
+                key_string=self.key.key_string,
+                instance_id="plan-site.example",
+                product_id=self.product.id,
+                context=self.ctx,
+            )
+        )
+        self.assertNoSeqScans(
+            lambda: ActivationService.deactivate_machine(
+                brand=self.brand,
+                instance_ids=["plan-site.example", "site-9.example"],
+                context=self.ctx,
+            )
+        )
+
+    def test_lease_service(self):
+        License.objects.filter(pk=self.license.pk).update(
+            lease_ttl=timezone.timedelta(minutes=5)
+        )
+        ActivationService.activate_instance(
+            brand=self.brand,
+            key_string=self.key.key_string,
+            instance_id="plan-runner",
+            product_id=self.product.id,
+            context=self.ctx,
+        )
+        self.assertNoSeqScans(
+            lambda: ActivationService.renew_lease(
+                brand=self.brand,
+                key_string=self.key.key_string,
+                instance_id="plan-runner",
+                product_id=self.product.id,
+                context=self.ctx,
+            )
+        )
+        self.assertNoSeqScans(
+            lambda: ActivationService.reclaim_expired_leases(100, self.ctx)
+        )
+
+    def test_status_service(self):
+        for method in (
+            StatusService.get_license_status,
+            StatusService.get_license_status_payload,
+            StatusService.get_license_status_json,
+        ):
+            self.assertNoSeqScans(
+                lambda: method(self.brand, self.key.key_string, self.ctx)
+            )
+        batch = list(
+            LicenseKey.objects.filter(brand=self.brand).values_list(
+                "key_string", flat=True
+            )[:10]
+        )
+        self.assertNoSeqScans(
+            lambda: list(
+                StatusService.iter_license_statuses_json(self.brand, batch, self.ctx)
+            )
+        )
+        self.assertNoSeqScans(
+            lambda: StatusService.get_license_statuses_payload(
+                self.brand, batch, self.ctx
+            )
+        )
+
+    def test_global_lookup_service(self):
+        email = self.key.customer_email.upper()
+        self.assertNoSeqScans(
+            lambda: GlobalLookupService.get_license_page(email, self.ctx, 1, 50)
+        )
+        self.assertNoSeqScans(
+            lambda: GlobalLookupService.get_license_page_json(email, self.ctx, 1, 50)
+        )
+
+    def test_admin_search(self):
+        request = RequestFactory().get("/")
+        for model, model_admin in (
+            (LicenseKey, LicenseKeyAdmin),
+            (License, LicenseAdmin),
+        ):
+            for term in (self.key.key_string[:-1].lower(), "customer7@"):
+                queryset, _ = model_admin(model, admin.site).get_search_results(
+                    request, model.objects.order_by("-pk"), term
+                )
+                self.assertNoSeqScans(lambda: list(queryset[:50]))
+
+    def test_provisioning_service(self):
+        self.assertNoSeqScans(
+            lambda: ProvisioningService.provision_license_bundle(
+                brand=self.brand,
+                customer_email="new-customer@example.com",
+                product_ids=[self.product.id],
+                context=self.ctx,
+            )
+        )
+        self.assertNoSeqScans(
+            lambda: ProvisioningService.provision_license_bundle(
+                brand=self.brand,
+                customer_email=self.key.customer_email,
+                product_ids=[self.spare_product.id],
+                existing_key=self.key.key_string,
+                context=self.ctx,
+            )
+        )
+
+    def test_lifecycle_service(self):
+        self.assertNoSeqScans(
+            lambda: LicenseLifecycleService.update_status(
+                self.brand, self.license.id, "suspended", self.ctx
+            )
+        )
+        self.assertNoSeqScans(
+            lambda: LicenseLifecycleService.renew_license(
+                self.brand, self.license.id, 30, self.ctx
+            )
+        )
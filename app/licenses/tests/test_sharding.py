@@ -0,0 +1,189 @@
+import json
+import threading
+from io import StringIO
+from unittest import skipUnless
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from licenses.keyfilter import key_filter
+from licenses.models import Brand, BrandShard, LicenseKey, LicenseKeyChange, Product
+from licenses.services.lookups import GlobalLookupService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.shard_moves import BrandMoveService
+from licenses.sharding import (
+    BrandReadOnly,
+    hold_brand_writes,
+    release_brand_writes,
+    shard_aliases,
+    sharding_enabled,
+    use_shard,
+)
+
+
+@skipUnless(
+    sharding_enabled() and len(shard_aliases()) >= 3,
+    "Set LICENSE_SHARDS=shard1,shard2 to run against several local databases.",
+)
+class BrandShardingTests(APITransactionTestCase):
+    # Transactional: scatter-gather reads each shard from worker threads,
+    # which cannot see data inside a test transaction.
+    databases = "__all__"
+
+    def setUp(self):
+        key_filter.clear()
+        self.ctx = {"request_id": "unit-test-id"}
+        self.brands = {}
+        for i, alias in enumerate(shard_aliases()[:3]):
+            with use_shard(alias):
+                brand = Brand.objects.create(
+                    name=f"Brand {i}", slug=f"brand-{i}", api_key=f"sk_{i}"
+                )
+                product = Product.objects.create(
+                    brand=brand, name="Pro", slug=f"pro-{i}"
+                )
+                for n in range(2):
+                    ProvisioningService.provision_license_bundle(
+                        brand=brand,
+                        customer_email=f"user+{n}@example.com",
+                        product_ids=[product.id],
+                        context=self.ctx,
+                    )
+            self.brands[alias] = (brand, product)
+        # Same customer in every brand, on every shard.
+        for alias in shard_aliases()[:3]:
+            LicenseKey.objects.using(alias).update(customer_email="user@example.com")
+
+    def test_rows_live_on_the_brand_shard(self):
+        brand, product = self.brands["shard1"]
+        self.assertEqual(BrandShard.objects.get(brand_id=brand.id).shard, "shard1")
+        resp = self.client.post(
+            "/api/v1/licenses/provision/",
+            {"customer_email": "new@example.com", "product_ids": [product.id]},
+            format="json",
+            HTTP_X_BRAND_API_KEY="sk_1",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        key = resp.data["key"]
+        self.assertTrue(LicenseKey.objects.using("shard1").filter(key_string=key))
+        self.assertFalse(LicenseKey.objects.using("default").filter(key_string=key))
+
+        resp = self.client.get(
+            f"/api/v1/licenses/status/{key}/", HTTP_X_BRAND_SLUG="brand-1"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["key"], key)
+
+    def test_scatter_gather_global_lookup(self):
+        all_keys = sorted(
+            (
+                row
+                for alias in shard_aliases()[:3]
+                for row in LicenseKey.objects.using(alias).values_list(
+                    "created_at", "id", "key_string"
+                )
+            )
+        )
+        expected = [key_string for _, _, key_string in all_keys]
+        for page in (1, 2, 3, 4):
+            document = json.loads(
+                GlobalLookupService.get_license_page_json(
+                    "USER@example.com", self.ctx, page, 2
+                )
+            )
+            python_page = GlobalLookupService.get_license_page(
+                "USER@example.com", self.ctx, page, 2
+            )
+            self.assertEqual(document, python_page)
+            self.assertEqual(document["total_keys_found"], 6)
+            self.assertEqual(
+                [item["key"] for item in document["licenses"]],
+                expected[(page - 1) * 2 : page * 2],  # noqa: E203
+            )
+        self.assertIsNone(document["next_page"])
+        full = json.loads(
+            GlobalLookupService.get_license_page_json("USER@example.com", self.ctx)
+        )
+        self.assertEqual(
+            full, GlobalLookupService.get_license_page("USER@example.com", self.ctx)
+        )
+        self.assertNotIn("page", full)
+        self.assertEqual([item["key"] for item in full["licenses"]], expected)
+
+    def test_move_brand_online(self):
+        brand, _ = self.brands["shard1"]
+        key = LicenseKey.objects.using("shard1").filter(brand_id=brand.id).first()
+        feed = self.client.get(
+            "/api/v1/licenses/changes/", HTTP_X_BRAND_API_KEY=brand.api_key
+        )
+        call_command(
+            "move_brand", str(brand.id), "shard2", drain_seconds=0, stdout=StringIO()
+        )
+
+        entry = BrandShard.objects.get(brand_id=brand.id)
+        self.assertEqual((entry.shard, entry.read_only), ("shard2", False))
+        self.assertFalse(LicenseKey.objects.using("shard1").filter(brand_id=brand.id))
+        moved = LicenseKey.objects.using("shard2").get(pk=key.pk)
+        self.assertEqual(moved.created_at, key.created_at)
+
+        resp = self.client.get(
+            f"/api/v1/licenses/status/{key.key_string}/", HTTP_X_BRAND_SLUG="brand-1"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.data["entitlements"]), 1)
+
+        # The feed cursor was issued by shard1: the client resyncs.
+        resp = self.client.get(
+            "/api/v1/licenses/changes/",
+            {"cursor": feed.data["cursor"]},
+            HTTP_X_BRAND_API_KEY=brand.api_key,
+        )
+        self.assertTrue(resp.data["reset"])
+        self.assertEqual(len(resp.data["changes"]), 2)
+        self.assertFalse(
+            LicenseKeyChange.objects.using("shard1").filter(brand_id=brand.id)
+        )
+
+    def test_read_only_brand_refuses_writes(self):
+        brand, product = self.brands["shard2"]
+        BrandShard.objects.filter(brand_id=brand.id).update(read_only=True)
+        key = LicenseKey.objects.using("shard2").filter(brand_id=brand.id).first()
+        resp = self.client.get(
+            f"/api/v1/licenses/status/{key.key_string}/", HTTP_X_BRAND_SLUG="brand-2"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resp = self.client.post(
+            "/api/v1/licenses/activate/",
+            {
+                "license_key": key.key_string,
+                "instance_id": "site.example",
+                "product_id": product.id,
+            },
+            format="json",
+            HTTP_X_BRAND_SLUG="brand-2",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_move_waits_for_writes_in_flight(self):
+        brand, _ = self.brands["shard1"]
+        hold_brand_writes(brand.id, "shard1")
+        self.addCleanup(release_brand_writes)
+        waiter = threading.Thread(
+            target=BrandMoveService._wait_for_writes, args=(brand.id, "shard1")
+        )
+        waiter.start()
+        waiter.join(0.3)
+        self.assertTrue(waiter.is_alive())
+        release_brand_writes()
+        waiter.join(5)
+        self.assertFalse(waiter.is_alive())
+
+        # Writers arriving once the move started see it in the directory,
+        # even if their cached entry is stale.
+        BrandShard.objects.filter(brand_id=brand.id).update(read_only=True)
+        with self.assertRaises(BrandReadOnly):
+            hold_brand_writes(brand.id, "shard1")
+        BrandShard.objects.filter(brand_id=brand.id).update(
+            shard="shard2", read_only=False
+        )
+        with self.assertRaises(BrandReadOnly):
+            hold_brand_writes(brand.id, "shard1")
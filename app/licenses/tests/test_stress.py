@@ -0,0 +1,53 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+from licenses.models import Activation, Brand, License
+from licenses.stress import ACTIVATION_STRATEGIES
+
+
+def _unlocked_activation(brand, key_string, instance_id, product_id, context):
+    license_inst = License.objects.get(
+        license_key__brand=brand,
+        license_key__key_string=key_string,
+        product_id=product_id,
+    )
+    Activation.objects.create(license=license_inst, instance_identifier=instance_id)
+
+
+class StressActivationsTests(TransactionTestCase):
+    databases = "__all__"
+
+    def stress(self, *args):
+        out = StringIO()
+        call_command(
+            "stress_activations",
+            "--seat-limits",
+            "1",
+            "3",
+            "--attempts-per-license=12",
+            *args,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def test_row_lock_never_oversells(self):
+        output = self.stress("--processes=4")
+        self.assertIn("row_lock: 24 attempts from 4 processes", output)
+        rows = {
+            line.split()[0]: line.split()[1:]
+            for line in output.splitlines()[2:]
+            if line.strip()
+        }
+        # attempts, activated, rejected
+        self.assertEqual(rows["1"][:3], ["12", "1", "11"])
+        self.assertEqual(rows["3"][:3], ["12", "3", "9"])
+        self.assertFalse(Brand.objects.exists())
+
+    def test_detects_oversold_seats(self):
+        with mock.patch.dict(ACTIVATION_STRATEGIES, unlocked=_unlocked_activation):
+            with self.assertRaisesMessage(CommandError, "12 live seats, limit 1"):
+                self.stress("--processes=1", "--strategies", "unlocked")
+        self.assertFalse(Brand.objects.exists())
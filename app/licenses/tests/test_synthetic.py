@@ -0,0 +1,77 @@
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+from licenses.models import (
+    Activation,
+    Brand,
+    CustomerLicenseSummary,
+    License,
+    LicenseKey,
+)
+from licenses.sharding import shard_aliases
+
+
+class GenerateDatasetTests(TransactionTestCase):
+    databases = "__all__"
+
+    def generate(self, *args):
+        out = StringIO()
+        call_command(
+            "generate_dataset",
+            "--seed=7",
+            "--customers=60",
+            "--chunk-size=25",
+            "--brands=3",
+            "--products-per-brand=4",
+            "--as-of=2026-01-01",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def rows(self, model, *fields):
+        return sorted(
+            row
+            for alias in shard_aliases()
+            for row in model.objects.using(alias).values_list(*fields)
+        )
+
+    def brands(self):
+        return [
+            brand for alias in shard_aliases() for brand in Brand.objects.using(alias)
+        ]
+
+    def fingerprint(self):
+        return (
+            self.rows(LicenseKey, "id", "key_string", "brand_id"),
+            self.rows(License, "id", "status", "seat_limit"),
+            self.rows(Activation, "id", "license_id"),
+        )
+
+    def test_same_seed_same_rows_regardless_of_workers(self):
+        output = self.generate("--workers=1")
+        self.assertIn("Loaded", output)
+        first = self.fingerprint()
+        self.assertGreaterEqual(len(first[0]), 60)
+        self.assertTrue(first[2])
+        self.assertEqual(len(self.rows(CustomerLicenseSummary, "pk")), len(first[0]))
+
+        with self.assertRaises(CommandError):
+            self.generate("--workers=1")
+
+        for brand in self.brands():
+            brand.delete()
+        self.generate("--workers=2")
+        self.assertEqual(self.fingerprint(), first)
+
+    def test_brand_skew(self):
+        self.generate("--workers=1", "--brand-skew=3")
+        per_brand = sorted(
+            (
+                LicenseKey.objects.using(brand._state.db).filter(brand=brand).count()
+                for brand in self.brands()
+            ),
+            reverse=True,
+        )
+        self.assertGreater(per_brand[0], per_brand[1] + per_brand[2])
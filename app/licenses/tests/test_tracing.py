@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from core.tracing import REQUEST_ID_HEADER
+from licenses.models import AuditLog, Brand, Product
+from licenses.services.provisioning import ProvisioningService
+
+
+def _walk(node):
+    yield node
+    for child in node.get("children", []):
+        yield from _walk(child)
+
+
+class TracingTests(APITestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.product = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.key = ProvisioningService.provision_license_bundle(
+            brand=self.brand,
+            customer_email="user@example.com",
+            product_ids=[self.product.id],
+            context={"request_id": "setup"},
+        )
+        handle, self.export_file = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+        self.addCleanup(os.remove, self.export_file)
+
+    def status(self, **headers):
+        return self.client.get(
+            f"/api/v1/licenses/status/{self.key.key_string}/",
+            HTTP_X_BRAND_SLUG="rm",
+            **headers,
+        )
+
+    def traces(self):
+        with open(self.export_file) as exported:
+            return [json.loads(line) for line in exported]
+
+    def test_request_id_is_propagated_or_assigned(self):
+        with override_settings(TRACE_SAMPLE_RATE=0):
+            resp = self.status(HTTP_X_REQUEST_ID="edge-42.a")
+            self.assertEqual(resp[REQUEST_ID_HEADER], "edge-42.a")
+            resp = self.status(HTTP_X_REQUEST_ID="not allowed\n" + "x" * 80)
+            self.assertRegex(resp[REQUEST_ID_HEADER], r"^[0-9a-f]{32}$")
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    "/api/v1/licenses/activate/",
+                    {
+                        "license_key": self.key.key_string,
+                        "instance_id": "site-1",
+                        "product_id": str(self.product.id),
+                    },
+                    format="json",
+                    HTTP_X_BRAND_SLUG="rm",
+                    HTTP_X_REQUEST_ID="activation-7",
+                )
+        self.assertTrue(AuditLog.objects.filter(request_id="activation-7").exists())
+        self.assertEqual(self.traces(), [])
+
+    def test_sampled_request_exports_span_tree(self):
+        with override_settings(TRACE_SAMPLE_RATE=1, TRACE_EXPORT_FILE=self.export_file):
+            resp = self.status(HTTP_X_REQUEST_ID="trace-me")
+        self.assertEqual(resp.status_code, 200)
+        (trace,) = self.traces()
+        self.assertEqual(trace["request_id"], "trace-me")
+        root = trace["root"]
+        self.assertEqual(root["name"], "GET api/v1/licenses/status/<str:key_string>/")
+        self.assertEqual(root["attrs"], {"status": 200})
+
+        spans = list(_walk(root))
+        self.assertEqual(trace["spans"], len(spans))
+        (service,) = [s for s in spans if s["name"].startswith("StatusService.")]
+        self.assertTrue(
+            any(child["name"] == "sql" for child in service.get("children", []))
+        )
+        for node in spans:
+            self.assertLessEqual(node["at_ms"] + node["ms"], root["ms"] + 0.01)
+
+    def test_span_limit(self):
+        with override_settings(
+            TRACE_SAMPLE_RATE=1, TRACE_EXPORT_FILE=self.export_file, TRACE_MAX_SPANS=2
+        ):
+            self.status()
+        (trace,) = self.traces()
+        self.assertEqual(trace["spans"], 2)
+        self.assertGreater(trace["dropped"], 0)
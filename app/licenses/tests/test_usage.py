@@ -0,0 +1,121 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from licenses.models import Brand, Product, UsageDelta, UsageRollup
+from licenses.services.activation import ActivationService
+from licenses.services.lifecycle import LicenseLifecycleService
+from licenses.services.provisioning import ProvisioningService
+from licenses.services.usage import UsageService
+
+
+class UsageReportTests(APITestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="RankMath", slug="rm", api_key="sk_rm")
+        self.pro = Product.objects.create(brand=self.brand, name="Pro", slug="pro")
+        self.agency = Product.objects.create(
+            brand=self.brand, name="Agency", slug="agency"
+        )
+        self.ctx = {"request_id": "test"}
+        self.today = timezone.now().date()
+
+    def report(self, **params):
+        resp = self.client.get(
+            "/api/v1/licenses/reports/usage/", params, HTTP_X_BRAND_API_KEY="sk_rm"
+        )
+        self.assertEqual(resp.status_code, 200, resp.data)
+        return {entry["product_name"]: entry for entry in resp.data["products"]}
+
+    def rollup(self):
+        call_command("rollup_usage", stdout=StringIO())
+
+    def test_service_changes_are_reported_before_and_after_folding(self):
+        keys = [
+            ProvisioningService.provision_license_bundle(
+                brand=self.brand,
+                customer_email=f"user{n}@example.com",
+                product_ids=[self.pro.id, self.agency.id],
+                context=self.ctx,
+            )
+            for n in range(2)
+        ]
+        for key, instance in ((keys[0], "site-1"), (keys[0], "site-2"), (keys[1], "a")):
+            ActivationService.activate_instance(
+                self.brand, key.key_string, instance, self.pro.id, self.ctx
+            )
+        ActivationService.deactivate_instance(
+            self.brand, keys[0].key_string, "site-2", self.pro.id, self.ctx
+        )
+        agency_license = keys[1].licenses.get(product=self.agency)
+        LicenseLifecycleService.update_status(
+            self.brand, agency_license.id, "suspended", self.ctx
+        )
+
+        before = self.report()
+        self.assertTrue(UsageDelta.objects.exists())
+        self.rollup()
+        self.assertFalse(UsageDelta.objects.exists())
+        self.assertEqual(UsageRollup.objects.count(), 2)
+        self.assertEqual(self.report(), before)
+
+        pro, agency = before["Pro"], before["Agency"]
+        self.assertEqual(len(pro["days"]), 30)
+        self.assertEqual(pro["days"][-1]["day"], self.today.isoformat())
+        self.assertEqual(
+            pro["days"][-1],
+            {
+                "day": self.today.isoformat(),
+                "activations": 3,
+                "deactivations": 1,
+                "seats_used": 2,
+                "licenses": {"valid": 2, "suspended": 0, "cancelled": 0},
+            },
+        )
+        self.assertEqual(pro["peak_seats_used"], 2)
+        self.assertEqual(pro["days"][0]["seats_used"], 0)
+        self.assertEqual(
+            agency["days"][-1]["licenses"], {"valid": 1, "suspended": 1, "cancelled": 0}
+        )
+
+        only = self.report(product_id=str(self.agency.id))
+        self.assertEqual(list(only), ["Agency"])
+
+    def test_levels_carry_over_and_late_deltas_fold_forward(self):
+        two_days_ago = self.today - timedelta(days=2)
+        UsageDelta.objects.create(
+            brand=self.brand, product=self.pro, day=two_days_ago, seats_used=5
+        )
+        self.rollup()
+        UsageService.record(self.brand.id, self.pro.id, activations=1, seats_used=1)
+        self.rollup()
+        # A delta of an earlier day folded after today's row exists.
+        UsageDelta.objects.create(
+            brand=self.brand,
+            product=self.pro,
+            day=self.today - timedelta(days=1),
+            deactivations=2,
+            seats_used=-2,
+        )
+        self.rollup()
+
+        days = self.report(start=str(two_days_ago - timedelta(days=1)))["Pro"]["days"]
+        self.assertEqual([day["seats_used"] for day in days], [0, 5, 3, 4])
+        self.assertEqual([day["deactivations"] for day in days], [0, 0, 2, 0])
+        self.assertEqual([day["activations"] for day in days], [0, 0, 0, 1])
+        # The opening level comes from the last row before the range.
+        days = self.report(start=str(self.today))["Pro"]["days"]
+        self.assertEqual(days[0]["seats_used"], 4)
+
+    def test_rejects_bad_ranges(self):
+        for params in (
+            {"start": "2026-02-01", "end": "2026-01-01"},
+            {"start": "2020-01-01", "end": "2026-01-01"},
+            {"start": "yesterday"},
+        ):
+            resp = self.client.get(
+                "/api/v1/licenses/reports/usage/", params, HTTP_X_BRAND_API_KEY="sk_rm"
+            )
+            self.assertEqual(resp.status_code, 400)
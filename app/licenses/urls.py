@@ -3,11 +3,19 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     LicenseProvisioningView,
     ActivationView,
+    LeaseRenewalView,
     DeactivationView,
+    MachineDeactivationView,
     LicenseStatusView,
+    BatchLicenseStatusView,
     GlobalCustomerLookupView,
     LicenseLifecycleView,
     ProductViewSet,
+    LicenseAuditLogView,
+    JobSubmitView,
+    JobDetailView,
+    UsageReportView,
+    ChangeFeedView,
 )
 
 router = DefaultRouter()
@@ -18,7 +26,19 @@ urlpatterns = [
     path("", include(router.urls)),
     path("provision/", LicenseProvisioningView.as_view(), name="license-provisioning"),
     path("activate/", ActivationView.as_view(), name="license-activation"),
+    path("activate/renew/", LeaseRenewalView.as_view(), name="lease-renewal"),
     path("deactivate/", DeactivationView.as_view(), name="license-deactivation"),
+    path(
+        "deactivate/machine/",
+        MachineDeactivationView.as_view(),
+        name="machine-deactivation",
+    ),
+    # Must precede status/<key_string>/, which would otherwise match "batch".
+    path(
+        "status/batch/",
+        BatchLicenseStatusView.as_view(),
+        name="license-status-batch",
+    ),
     path(
         "status/<str:key_string>/", LicenseStatusView.as_view(), name="license-status"
     ),
@@ -30,4 +50,9 @@ urlpatterns = [
     path(
         "lifecycle/<str:pk>/", LicenseLifecycleView.as_view(), name="license-lifecycle"
     ),
+    path("audit/<str:pk>/", LicenseAuditLogView.as_view(), name="license-audit-log"),
+    path("jobs/", JobSubmitView.as_view(), name="job-submit"),
+    path("jobs/<str:pk>/", JobDetailView.as_view(), name="job-detail"),
+    path("reports/usage/", UsageReportView.as_view(), name="usage-report"),
+    path("changes/", ChangeFeedView.as_view(), name="change-feed"),
 ]
@@ -1,9 +1,13 @@
+import uuid
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
-from drf_spectacular.utils import (
+from core.openapi import (
     extend_schema,
     extend_schema_view,
     OpenApiParameter,
@@ -12,22 +16,44 @@ from drf_spectacular.utils import (
 from .serializers import (
     ProvisionLicenseSerializer,
     LicenseInstanceActionSerializer,
+    LeaseRenewalSerializer,
     LicenseStatusResponseSerializer,
-    GlobalLicenseKeySerializer,
+    BatchStatusRequestSerializer,
+    BatchStatusResponseSerializer,
+    GlobalLookupResponseSerializer,
     LicenseLifecycleActionSerializer,
+    MachineDeactivationSerializer,
+    JobSerializer,
+    JobSubmitSerializer,
     ProductSerializer,
+    AuditLogSerializer,
+    UsageReportQuerySerializer,
+    UsageReportSerializer,
+    ChangeFeedQuerySerializer,
+    ChangeFeedSerializer,
 )
 from .authentication import (
     BrandApiKeyAuthentication,
     ProductPublicAuthentication,
 )
 from .models import Product
+from .payloads import license_status_payload
+from .renderers import (
+    PASSTHROUGH_RENDERER_CLASSES,
+    PrerenderedJSON,
+    drf_json,
+    iter_batch_status_json,
+)
 from .permissions import IsAuthenticatedBrandSystem
 from .services.provisioning import ProvisioningService
 from .services.activation import ActivationService
-from .services.status import StatusService
+from .services.status import StatusService, get_license_status_coalesced
 from .services.lookups import GlobalLookupService
 from .services.lifecycle import LicenseLifecycleService
+from .services.audit import AuditLogService
+from .services.jobs import JobService
+from .services.usage import UsageService
+from .services.changes import ChangeFeedService
 from .decorators import idempotent_request
 
 
@@ -105,8 +131,9 @@ class LicenseProvisioningView(APIView):
                 context=ctx,
             )
 
-            response_serializer = LicenseStatusResponseSerializer(license_key)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+            return Response(
+                license_status_payload(license_key), status=status.HTTP_201_CREATED
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -151,6 +178,47 @@ class ActivationView(APIView):
             return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class LeaseRenewalView(APIView):
+    authentication_classes = [ProductPublicAuthentication]
+
+    @extend_schema(
+        summary="Renew a floating seat lease",
+        description=(
+            "Extends the lease of an active instance on a license in lease "
+            "mode. Expired leases cannot be renewed; activate again instead."
+        ),
+        request=LeaseRenewalSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        tags=["Product Integration"],
+    )
+    def post(self, request):
+        serializer = LeaseRenewalSerializer(
+            data=request.data, context={"request": request}
+        )
+        if not serializer.is_valid():
+            return Response(
+                {"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        data = serializer.validated_data
+        ctx = {
+            "request_id": getattr(request, "request_id", "N/A"),
+            "brand_id": request.user.id,
+            "brand_name": request.user.name,
+        }
+
+        try:
+            lease_expires_at = ActivationService.renew_lease(
+                brand=request.user,
+                key_string=data["license_key"],
+                instance_id=data["instance_id"],
+                product_id=data["product_id"],
+                context=ctx,
+            )
+            return Response({"status": "renewed", "lease_expires_at": lease_expires_at})
+        except ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_409_CONFLICT)
+
+
 class DeactivationView(APIView):
     authentication_classes = [ProductPublicAuthentication]
 
@@ -189,12 +257,55 @@ class DeactivationView(APIView):
             return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class MachineDeactivationView(APIView):
+    authentication_classes = [BrandApiKeyAuthentication]
+    permission_classes = [IsAuthenticatedBrandSystem]
+
+    @extend_schema(
+        summary="Deactivate a machine on every license",
+        description=(
+            "Releases all activations of the given instance ids across every "
+            "license key and product of the brand, e.g. when a customer "
+            "decommissions a server. Returns the seats freed per license; "
+            "unknown instances are ignored."
+        ),
+        request=MachineDeactivationSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        tags=["Brand Management"],
+    )
+    @idempotent_request()
+    def post(self, request):
+        serializer = MachineDeactivationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        ctx = {
+            "request_id": getattr(request, "request_id", "N/A"),
+            "brand_id": request.user.id,
+            "brand_name": request.user.name,
+        }
+        released = ActivationService.deactivate_machine(
+            brand=request.user,
+            instance_ids=serializer.validated_data["instance_ids"],
+            context=ctx,
+        )
+        return Response(
+            {
+                "status": "deactivated",
+                "seats_freed": sum(entry["seats_freed"] for entry in released),
+                "licenses": released,
+            }
+        )
+
+
 class LicenseStatusView(APIView):
     """
     End-user product or customer can check the status and entitlements.
     """
 
     authentication_classes = [ProductPublicAuthentication]
+    renderer_classes = PASSTHROUGH_RENDERER_CLASSES
 
     @extend_schema(
         summary="US4: Check license status and entitlements",
@@ -218,18 +329,65 @@ class LicenseStatusView(APIView):
             "brand_id": request.user.id,
             "brand_name": request.user.name,
         }
-        license_key_obj = StatusService.get_license_status(
+        document = get_license_status_coalesced(
             brand=request.user, key_string=key_string, context=ctx
         )
 
-        if not license_key_obj:
+        if document is None:
             return Response(
                 {"error": "License key not found for this brand."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        if isinstance(document, str):
+            document = PrerenderedJSON(document)
+        return Response(document, status=status.HTTP_200_OK)
+
+
+class BatchLicenseStatusView(APIView):
+    """
+    Status of many license keys of the calling brand in one request, for
+    dashboards that would otherwise call status/<key>/ per key.
+    """
+
+    authentication_classes = [ProductPublicAuthentication]
+    renderer_classes = PASSTHROUGH_RENDERER_CLASSES
+
+    @extend_schema(
+        summary="US4: Check the status of many license keys",
+        description=(
+            "Resolves up to STATUS_BATCH_MAX_KEYS keys with a constant number "
+            "of queries. Keys unknown to the brand map to a not-found marker. "
+            "Large batches are streamed."
+        ),
+        request=BatchStatusRequestSerializer,
+        responses={200: BatchStatusResponseSerializer},
+        tags=["Product Integration"],
+    )
+    def post(self, request):
+        ctx = {
+            "request_id": getattr(request, "request_id", "N/A"),
+            "brand_id": request.user.id,
+            "brand_name": request.user.name,
+        }
+        serializer = BatchStatusRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        keys = serializer.validated_data["keys"]
+
+        if settings.ENTITLEMENT_RENDER_MODE == "database":
+            documents = StatusService.iter_license_statuses_json(
+                brand=request.user, key_strings=keys, context=ctx
+            )
+        else:
+            payloads = StatusService.get_license_statuses_payload(
+                brand=request.user, key_strings=keys, context=ctx
+            )
+            documents = ((key, drf_json(payload)) for key, payload in payloads.items())
 
-        serializer = LicenseStatusResponseSerializer(license_key_obj)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        body = iter_batch_status_json(keys, documents)
+        if len(keys) > settings.STATUS_BATCH_STREAM_THRESHOLD:
+            return StreamingHttpResponse(body, content_type="application/json")
+        return Response(PrerenderedJSON("".join(body)), status=status.HTTP_200_OK)
 
 
 class GlobalCustomerLookupView(APIView):
@@ -239,6 +397,7 @@ class GlobalCustomerLookupView(APIView):
 
     authentication_classes = [BrandApiKeyAuthentication]
     permission_classes = [IsAuthenticatedBrandSystem]
+    renderer_classes = PASSTHROUGH_RENDERER_CLASSES
 
     @extend_schema(
         summary="US6: List licenses by customer email",
@@ -253,9 +412,27 @@ class GlobalCustomerLookupView(APIView):
                 location=OpenApiParameter.QUERY,
                 required=True,
                 description="Customer email address.",
-            )
+            ),
+            OpenApiParameter(
+                name="page",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description=(
+                    "1-based page number (default 1). Given this or page_size, "
+                    "the response is paginated; otherwise it lists every key."
+                ),
+            ),
+            OpenApiParameter(
+                name="page_size",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description=(
+                    "License keys per page (default GLOBAL_LOOKUP_PAGE_SIZE, "
+                    "at most GLOBAL_LOOKUP_MAX_PAGE_SIZE)."
+                ),
+            ),
         ],
-        responses={200: GlobalLicenseKeySerializer(many=True)},
+        responses={200: GlobalLookupResponseSerializer},
         tags=["Brand Management"],
     )
     def get(self, request):
@@ -267,17 +444,37 @@ class GlobalCustomerLookupView(APIView):
         }
         if not email:
             return Response({"error": "Email parameter is required."}, status=400)
+        page = page_size = None
+        # Paging is opt-in: without page or page_size, every key is listed.
+        if "page" in request.query_params or "page_size" in request.query_params:
+            try:
+                page = max(1, int(request.query_params.get("page", 1)))
+                page_size = int(
+                    request.query_params.get(
+                        "page_size", settings.GLOBAL_LOOKUP_PAGE_SIZE
+                    )
+                )
+            except ValueError:
+                return Response(
+                    {"error": "page and page_size must be integers."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            page_size = min(max(1, page_size), settings.GLOBAL_LOOKUP_MAX_PAGE_SIZE)
 
-        results = GlobalLookupService.get_all_licenses_by_email(email, ctx)
-
-        serializer = GlobalLicenseKeySerializer(results, many=True)
-        return Response(
-            {
-                "customer_email": email,
-                "total_keys_found": results.count(),
-                "licenses": serializer.data,
-            }
-        )
+        if settings.ENTITLEMENT_RENDER_MODE == "database":
+            document = GlobalLookupService.get_license_page_json(
+                email, ctx, page, page_size
+            )
+        else:
+            document = GlobalLookupService.get_license_page(email, ctx, page, page_size)
+        if document is None:
+            return Response(
+                {"error": "Global lookup failed."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        if isinstance(document, str):
+            document = PrerenderedJSON(document)
+        return Response(document)
 
 
 class LicenseLifecycleView(APIView):
@@ -328,3 +525,231 @@ class LicenseLifecycleView(APIView):
             )
         except ValidationError as e:
             return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class LicenseAuditLogView(APIView):
+    authentication_classes = [BrandApiKeyAuthentication]
+    permission_classes = [IsAuthenticatedBrandSystem]
+
+    @extend_schema(
+        summary="List the audit trail of a license",
+        description=(
+            "Returns the newest lifecycle and activation changes for a "
+            "license, with before and after state."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="limit",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description="Maximum number of entries (default 50, max 500).",
+            ),
+            OpenApiParameter(
+                name="before",
+                type=OpenApiTypes.DATETIME,
+                location=OpenApiParameter.QUERY,
+                description="Only entries created before this timestamp.",
+            ),
+        ],
+        responses={200: AuditLogSerializer(many=True)},
+        tags=["Brand Management"],
+    )
+    def get(self, request, pk):
+        ctx = {
+            "request_id": getattr(request, "request_id", "N/A"),
+            "brand_id": request.user.id,
+            "brand_name": request.user.name,
+        }
+        try:
+            limit = int(request.query_params.get("limit", 50))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response(
+                {"error": "limit must be a positive integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = min(limit, 500)
+        try:
+            license_id = uuid.UUID(pk)
+        except ValueError:
+            return Response(
+                {"error": "License not found for this brand."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        before = request.query_params.get("before")
+        if before:
+            before = parse_datetime(before)
+            if before is None:
+                return Response(
+                    {"error": "before must be an ISO 8601 timestamp."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        entries = AuditLogService.get_license_history(
+            request.user, license_id, ctx, limit=limit, before=before
+        )
+        serializer = AuditLogSerializer(entries, many=True)
+        return Response({"license_id": license_id, "entries": serializer.data})
+
+
+class JobSubmitView(APIView):
+    authentication_classes = [BrandApiKeyAuthentication]
+    permission_classes = [IsAuthenticatedBrandSystem]
+
+    @extend_schema(
+        summary="Queue a provisioning or lifecycle operation",
+        description=(
+            "Runs the operation in a background worker instead of the request. "
+            "The payload is the body the synchronous endpoint takes and is "
+            "validated now; poll the returned job for the outcome."
+        ),
+        request=JobSubmitSerializer,
+        responses={202: JobSerializer},
+        tags=["Brand Management"],
+    )
+    @idempotent_request()
+    def post(self, request):
+        serializer = JobSubmitSerializer(
+            data=request.data, context={"request": request}
+        )
+        if not serializer.is_valid():
+            return Response(
+                {"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        ctx = {
+            "request_id": getattr(request, "request_id", "N/A"),
+            "brand_id": request.user.id,
+            "brand_name": request.user.name,
+        }
+        data = serializer.validated_data
+        job = JobService.submit(
+            request.user, data["kind"], data["payload"], ctx, data["priority"]
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class JobDetailView(APIView):
+    authentication_classes = [BrandApiKeyAuthentication]
+    permission_classes = [IsAuthenticatedBrandSystem]
+
+    @extend_schema(
+        summary="Poll a queued operation",
+        description=(
+            "Status of a job: queued, running, succeeded (with the result the "
+            "synchronous endpoint would have returned) or failed (with the "
+            "error)."
+        ),
+        responses={200: JobSerializer},
+        tags=["Brand Management"],
+    )
+    def get(self, request, pk):
+        job = JobService.get(request.user, pk)
+        if job is None:
+            return Response(
+                {"error": "Job not found for this brand."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(JobSerializer(job).data)
+
+
+class UsageReportView(APIView):
+    authentication_classes = [BrandApiKeyAuthentication]
+    permission_classes = [IsAuthenticatedBrandSystem]
+
+    @extend_schema(
+        summary="Daily activation and seat usage per product",
+        description=(
+            "Per product and day: activations, deactivations, and the seats "
+            "used and licenses by status at the end of the day. Served from "
+            "daily rollups, so the cost depends on the range, not on the "
+            "number of licenses."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="start",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="First day (default: 29 days before end).",
+            ),
+            OpenApiParameter(
+                name="end",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Last day, inclusive (default: today, UTC).",
+            ),
+            OpenApiParameter(
+                name="product_id",
+                type=OpenApiTypes.UUID,
+                location=OpenApiParameter.QUERY,
+                description="Only this product.",
+            ),
+        ],
+        responses={200: UsageReportSerializer},
+        tags=["Brand Management"],
+    )
+    def get(self, request):
+        query = UsageReportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({"error": query.errors}, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        product_id = params.get("product_id")
+        products = UsageService.report(
+            request.user,
+            params["start"],
+            params["end"],
+            product_ids=[product_id] if product_id else None,
+        )
+        report = {"start": params["start"], "end": params["end"], "products": products}
+        return Response(UsageReportSerializer(report).data)
+
+
+class ChangeFeedView(APIView):
+    authentication_classes = [BrandApiKeyAuthentication]
+    permission_classes = [IsAuthenticatedBrandSystem]
+    renderer_classes = PASSTHROUGH_RENDERER_CLASSES
+
+    @extend_schema(
+        summary="License keys changed since a cursor",
+        description=(
+            "Every license key of the brand whose licenses, statuses or seat "
+            "counts changed since the cursor, with its current state, oldest "
+            "change first. Start without a cursor and keep passing back the "
+            "returned one; each key appears once per page, at its latest "
+            "change, so the cost depends on what changed, not on the number "
+            "of keys."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="Cursor from the previous page (default: the beginning).",
+            ),
+            OpenApiParameter(
+                name="limit",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description="Changes per page.",
+            ),
+        ],
+        responses={200: ChangeFeedSerializer},
+        tags=["Brand Management"],
+    )
+    def get(self, request):
+        query = ChangeFeedQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({"error": query.errors}, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+        ctx = {
+            "request_id": getattr(request, "request_id", "N/A"),
+            "brand_id": request.user.id,
+            "brand_name": request.user.name,
+        }
+        document = ChangeFeedService.page(
+            request.user,
+            params.get("cursor"),
+            params.get("limit", settings.CHANGE_FEED_PAGE_SIZE),
+            ctx,
+        )
+        return Response(PrerenderedJSON(document))
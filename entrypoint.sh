@@ -9,8 +9,13 @@ done
 
 echo "PostgreSQL started"
 
-# Apply database migrations
-python manage.py makemigrations
-python manage.py migrate
+if [ "${RUN_MIGRATIONS:-True}" = "True" ]; then
+  # Apply database migrations
+  python manage.py makemigrations
+  python manage.py migrate
+
+  # Build the OpenAPI schema once; workers serve the file (core.openapi)
+  API_DOCS_ENABLED=True python manage.py spectacular --format openapi-json --file "${API_SCHEMA_FILE:-openapi.json}"
+fi
 
 exec "$@"
\ No newline at end of file